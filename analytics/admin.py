@@ -1,9 +1,19 @@
 from django.contrib import admin
 
-from .models import Customer, Product, Purchase, PurchaseItem
+from .models import (
+    Customer, CustomerCategoryFeature, CustomerFeatures, DailyCategorySales, DailyCustomerSales, DailyProductSales,
+    Product, Purchase, PurchaseItem, RollupWatermark, SalesSketch, SegmentationJob
+)
 
 admin.site.register(Customer)
 admin.site.register(Product)
 admin.site.register(Purchase)
 admin.site.register(PurchaseItem)
-
+admin.site.register(CustomerFeatures)
+admin.site.register(CustomerCategoryFeature)
+admin.site.register(SegmentationJob)
+admin.site.register(DailyProductSales)
+admin.site.register(DailyCategorySales)
+admin.site.register(DailyCustomerSales)
+admin.site.register(RollupWatermark)
+admin.site.register(SalesSketch)
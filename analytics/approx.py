@@ -0,0 +1,327 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max
+
+from .buckets import UNSPECIFIED_GENDER
+from .features import REBUILD_BATCH_SIZE
+from .models import Customer, Product, Purchase, PurchaseItem, SalesSketch
+from .response_cache import bump_data_version
+from .sketches import CountMinSketch, HyperLogLog, MisraGries, TDigest, dumps, loads
+
+
+# approx=true mode: all-time overview, top products and category preferences
+# answered from streaming sketches instead of scanning the fact tables.
+#   customers        HyperLogLog of purchasing customers
+#   product_*        Count-Min of units / revenue cents per product
+#   segment_*        Count-Min of units / revenue cents per (age, gender, category)
+#   top_*            Misra-Gries heavy hitters for products, categories, customer spend
+#   order_values     t-digest of purchase totals
+# The sketches are persisted in one SalesSketch row with id watermarks, like
+# the rollups: new purchases and items are folded in incrementally by
+# seed_data, CSV imports and the refresh_sketches command (run it on a
+# schedule for rows written through the API). Reads never refresh; they serve
+# the stored sketches and report when those were last refreshed as `as_of`.
+# Sketches cannot subtract, so edits or deletes of already-sketched rows need
+# a full refresh. Every approx response carries the error bounds of what it used.
+
+SKETCH_NAME = 'sales'
+CMS_WIDTH = 4096
+CMS_DEPTH = 5
+PRODUCT_CAPACITY = 1000
+CATEGORY_CAPACITY = 200
+CUSTOMER_CAPACITY = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+# Ages are sketched individually; open-ended buckets stop here
+MAX_AGE = 150
+APPROX_WINDOW_ERROR = '"approx=true" covers all time; it cannot be combined with start, end or granularity.'
+
+_loaded = {'key': None, 'sketches': None}
+_loaded_lock = threading.Lock()
+
+
+class SalesSketches:
+    COUNT_MINS = ('product_units', 'product_revenue', 'segment_units', 'segment_revenue')
+    HEAVY_HITTERS = {'top_products': PRODUCT_CAPACITY, 'top_categories': CATEGORY_CAPACITY,
+                     'top_customers': CUSTOMER_CAPACITY}
+
+    def __init__(self, arrays=None):
+        arrays = arrays or {}
+        self.customers = HyperLogLog(registers=arrays.get('customers'))
+        for name in self.COUNT_MINS:
+            setattr(self, name, CountMinSketch(
+                CMS_WIDTH, CMS_DEPTH, table=arrays.get(name), total=arrays.get(f'{name}_total', 0)
+            ))
+        for name, capacity in self.HEAVY_HITTERS.items():
+            setattr(self, name, MisraGries(
+                capacity, keys=arrays.get(f'{name}_keys'), counts=arrays.get(f'{name}_counts'),
+                decremented=arrays.get(f'{name}_decremented', 0),
+            ))
+        self.order_values = TDigest(means=arrays.get('order_means'), weights=arrays.get('order_weights'))
+        self.purchases = int(arrays.get('purchases', 0))
+        self.revenue_cents = int(arrays.get('revenue_cents', 0))
+
+    def to_blob(self):
+        arrays = {
+            'customers': self.customers.registers,
+            'order_means': self.order_values.means,
+            'order_weights': self.order_values.weights,
+            'purchases': np.array(self.purchases),
+            'revenue_cents': np.array(self.revenue_cents),
+        }
+        for name in self.COUNT_MINS:
+            sketch = getattr(self, name)
+            arrays[name] = sketch.table
+            arrays[f'{name}_total'] = np.array(sketch.total)
+        for name in self.HEAVY_HITTERS:
+            sketch = getattr(self, name)
+            # Keys are stored as text: ids for products/customers, names for categories
+            arrays[f'{name}_keys'] = sketch.counters.index.to_numpy(dtype=str)
+            arrays[f'{name}_counts'] = sketch.counters.to_numpy(dtype=np.int64)
+            arrays[f'{name}_decremented'] = np.array(sketch.decremented)
+        return dumps(arrays)
+
+    @classmethod
+    def from_blob(cls, blob):
+        return cls(loads(blob)) if blob else cls()
+
+    def add_purchases(self, df):
+        # df: customer_id, total_amount
+        cents = np.round(df['total_amount'].astype(float).to_numpy() * 100).astype(np.int64)
+        self.customers.add(df['customer_id'].to_numpy())
+        spend = pd.Series(cents).groupby(df['customer_id'].astype(str).to_numpy()).sum()
+        self.top_customers.add(spend.index.to_numpy(), spend.to_numpy())
+        self.order_values.add(cents / 100)
+        self.purchases += len(df)
+        self.revenue_cents += int(cents.sum())
+
+    def add_items(self, df):
+        # df: product_id, category, quantity, price, age, gender
+        units = df['quantity'].to_numpy(dtype=np.int64)
+        cents = np.round(df['price'].astype(float).to_numpy() * 100).astype(np.int64) * units
+
+        product_keys = df['product_id'].astype(str).to_numpy()
+        self.product_units.add(product_keys, units)
+        self.product_revenue.add(product_keys, cents)
+        self.top_products.add(*_summed(product_keys, units))
+        self.top_categories.add(*_summed(df['category'].to_numpy(), units))
+
+        aged = df['age'].notna().to_numpy()
+        if aged.any():
+            keys = segment_keys(df['age'][aged], df['gender'][aged], df['category'][aged])
+            self.segment_units.add(keys, units[aged])
+            self.segment_revenue.add(keys, cents[aged])
+
+
+def _summed(keys, counts):
+    # Pre-aggregate a batch so heavy-hitter merges see one entry per key
+    summed = pd.Series(counts).groupby(keys).sum()
+    return summed.index.to_numpy(), summed.to_numpy()
+
+
+def segment_keys(ages, genders, categories):
+    ages = pd.Series(ages).astype('int64').astype(str).to_numpy(dtype=object)
+    genders = pd.Series(genders).fillna(UNSPECIFIED_GENDER).astype(str).to_numpy(dtype=object)
+    return ages + '|' + genders + '|' + pd.Series(categories).astype(str).to_numpy(dtype=object)
+
+
+def _keyset_batches(queryset, fields, first_id, last_id, batch_size):
+    while True:
+        rows = list(
+            queryset.filter(id__gt=first_id, id__lte=last_id).order_by('id').values_list('id', *fields)[:batch_size]
+        )
+        if not rows:
+            return
+        yield pd.DataFrame(rows, columns=['id', *fields])
+        first_id = rows[-1][0]
+
+
+def refresh_sketches(full=False, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Fold purchases and items above the watermarks into the sketches (all of
+    them with full=True). Returns a summary dict.
+    """
+    max_purchase_id = Purchase.objects.aggregate(value=Max('id'))['value'] or 0
+    max_item_id = PurchaseItem.objects.aggregate(value=Max('id'))['value'] or 0
+
+    with transaction.atomic():
+        row, _ = SalesSketch.objects.select_for_update().get_or_create(name=SKETCH_NAME)
+        if full:
+            sketches = SalesSketches()
+            row.last_purchase_id = row.last_item_id = 0
+        else:
+            sketches = SalesSketches.from_blob(row.data)
+
+        purchases = items = 0
+        for df in _keyset_batches(Purchase.objects, ['customer_id', 'total_amount'],
+                                  row.last_purchase_id, max_purchase_id, batch_size):
+            sketches.add_purchases(df)
+            purchases += len(df)
+        item_fields = ['product_id', 'product__category', 'quantity', 'price_at_purchase',
+                       'purchase__customer__age', 'purchase__customer__gender']
+        for df in _keyset_batches(PurchaseItem.objects, item_fields, row.last_item_id, max_item_id, batch_size):
+            df.columns = ['id', 'product_id', 'category', 'quantity', 'price', 'age', 'gender']
+            sketches.add_items(df)
+            items += len(df)
+
+        row.data = sketches.to_blob()
+        row.last_purchase_id = max(row.last_purchase_id, max_purchase_id)
+        row.last_item_id = max(row.last_item_id, max_item_id)
+        row.save()
+        if purchases or items or full:
+            transaction.on_commit(bump_data_version)
+
+    return {'mode': 'full' if full else 'incremental', 'purchases': purchases, 'items': items,
+            'bytes': len(row.data)}
+
+
+def load_sales_sketches():
+    """
+    (stored sketches, time of their last refresh). Before the first refresh
+    the sketches are empty and the time is None.
+    """
+    row = SalesSketch.objects.filter(name=SKETCH_NAME).defer('data').first()
+    if row is None:
+        return SalesSketches(), None
+
+    # Deserialize once per version of the row
+    key = (row.pk, row.updated_at, row.last_purchase_id, row.last_item_id)
+    with _loaded_lock:
+        if _loaded['key'] != key:
+            blob = SalesSketch.objects.filter(pk=row.pk).values_list('data', flat=True).get()
+            _loaded.update(key=key, sketches=SalesSketches.from_blob(blob))
+        return _loaded['sketches'], row.updated_at
+
+
+def _count_min_bounds(sketch, cells=1):
+    return {
+        'epsilon': round(sketch.epsilon, 6),
+        'delta': round(sketch.delta, 6),
+        # Estimates never undercount; summed over `cells` sketch cells
+        'max_overestimate': round(sketch.max_overestimate * cells, 2),
+    }
+
+
+def _heavy_hitter_bounds(sketch):
+    return {'capacity': sketch.capacity, 'max_undercount': sketch.decremented}
+
+
+def approx_overview(limit=5):
+    sketches, as_of = load_sales_sketches()
+
+    top_customers = sketches.top_customers.top(limit)
+    names = dict(Customer.objects.filter(id__in=[int(key) for key in top_customers.index]).values_list('id', 'name'))
+    return {
+        'summary': {
+            'total_customers': Customer.objects.count(),
+            'total_products': Product.objects.count(),
+            'total_purchases': sketches.purchases,
+            'total_revenue': sketches.revenue_cents / 100,
+            'purchasing_customers': round(sketches.customers.estimate()),
+            'order_value_quantiles': {
+                f'p{round(q * 100)}': _round(sketches.order_values.quantile(q)) for q in QUANTILES
+            },
+        },
+        'top_categories': [
+            {'product__category': category, 'quantity_sold': int(units)}
+            for category, units in sketches.top_categories.top(limit).items()
+        ],
+        'top_customers': [
+            {'customer__name': names.get(int(key)), 'total_spent': int(cents) / 100}
+            for key, cents in top_customers.items()
+        ],
+        'approximate': True,
+        'error_bounds': {
+            'as_of': as_of,
+            'purchasing_customers': {'relative_standard_error': round(sketches.customers.relative_error, 4)},
+            'top_categories': _heavy_hitter_bounds(sketches.top_categories),
+            # Spend in cents
+            'top_customers': _heavy_hitter_bounds(sketches.top_customers),
+            'order_value_quantiles': {
+                'compression': sketches.order_values.compression,
+                'centroids': len(sketches.order_values.means),
+            },
+        },
+    }
+
+
+def approx_top_products(limit=10):
+    """Returns (top product rows, error bounds)."""
+    sketches, as_of = load_sales_sketches()
+
+    # Heavy hitters pick the candidates, Count-Min estimates their totals
+    candidates = sketches.top_products.top(max(limit * 2, limit + 10)).index.to_numpy()
+    units = sketches.product_units.estimate(candidates)
+    cents = sketches.product_revenue.estimate(candidates)
+    order = np.argsort(-units, kind='stable')[:limit]
+
+    ids = [int(candidates[i]) for i in order]
+    products = Product.objects.in_bulk(ids)
+    rows = [
+        {
+            'product__id': product_id,
+            'product__name': products[product_id].name,
+            'product__category': products[product_id].category,
+            'total_quantity': int(units[i]),
+            'total_revenue': int(cents[i]) / 100,
+        }
+        for product_id, i in zip(ids, order)
+        if product_id in products
+    ]
+    bounds = {
+        'as_of': as_of,
+        'candidates': _heavy_hitter_bounds(sketches.top_products),
+        'total_quantity': _count_min_bounds(sketches.product_units),
+        # In cents
+        'total_revenue': _count_min_bounds(sketches.product_revenue),
+    }
+    return rows, bounds
+
+
+def approx_category_preferences(age_groups, gender_groups):
+    """
+    Returns ({(age label, gender): [category rows]}, error bounds), summing
+    per-age Count-Min estimates over each age bucket.
+    """
+    sketches, as_of = load_sales_sketches()
+    categories = list(Product.objects.values_list('category', flat=True).distinct().order_by('category'))
+
+    cells = []
+    for label, low, high in age_groups:
+        for age in range(low, (high if high is not None else MAX_AGE) + 1):
+            for gender in gender_groups:
+                for category in categories:
+                    cells.append((label, gender, category, age))
+    if not cells:
+        return {}, {}
+
+    frame = pd.DataFrame(cells, columns=['age_group', 'gender_group', 'category', 'age'])
+    keys = segment_keys(frame['age'], frame['gender_group'], frame['category'])
+    frame['units'] = sketches.segment_units.estimate(keys)
+    frame['cents'] = sketches.segment_revenue.estimate(keys)
+    totals = frame.groupby(['age_group', 'gender_group', 'category'], sort=False)[['units', 'cents']].sum()
+
+    grouped = {}
+    for (age_group, gender_group, category), row in totals.sort_values('units', ascending=False).iterrows():
+        if row['units'] > 0:
+            grouped.setdefault((age_group, gender_group), []).append({
+                'product__category': category,
+                'total_quantity': int(row['units']),
+                'total_revenue': int(row['cents']) / 100,
+            })
+
+    # A bucket's totals add up one sketch cell per age
+    widest = max((high if high is not None else MAX_AGE) - low + 1 for _, low, high in age_groups)
+    bounds = {
+        'as_of': as_of,
+        'total_quantity': _count_min_bounds(sketches.segment_units, cells=widest),
+        # In cents
+        'total_revenue': _count_min_bounds(sketches.segment_revenue, cells=widest),
+    }
+    return grouped, bounds
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
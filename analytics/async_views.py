@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from .approx import APPROX_WINDOW_ERROR, approx_category_preferences, approx_overview, approx_top_products
+from .buckets import parse_age_buckets, parse_genders
+from .instrumentation import phase
+from .pipelines import SegmentationError, segment_customer_frame
+from .queries import (
+    category_preferences_query, customer_groups_query, discount_usage_by_group, discount_usage_query,
+    overview_from_parts, overview_queries, overview_response, preferences_by_group, top_product_series_query,
+    top_products_query
+)
+from .models import Customer, Product
+from .query_params import parse_date_range, parse_flag, parse_source, parse_window
+from .rollups import overview_from_rollups, top_products_from_rollups
+from .segmentation import extract_rfm_features
+
+
+# Async variants of the read-only analytics endpoints, for ASGI deployments
+# (ecommerce/asgi.py). Responses match the sync views.
+#
+# Django's own async ORM calls (acount(), aaggregate(), ...) all run on one
+# shared thread, so gathering them would still execute the queries one after
+# another. Independent queries therefore run with
+# sync_to_async(thread_sensitive=False), each on an executor thread with its
+# own connection, and the request waits for the slowest one. CPU-bound
+# pandas/sklearn work runs in the default executor so the event loop stays
+# free. These views skip the response cache (cache_response wraps sync
+# APIView.get methods) and, like the sync views, require no authentication.
+#
+# The executor threads are pooled, so with persistent connections
+# (DATABASES CONN_MAX_AGE > 0, DB_CONN_MAX_AGE in settings) each thread keeps
+# one open connection across requests; the database must allow about
+# min(32, CPUs + 4) of them per ASGI worker. With CONN_MAX_AGE = 0 every
+# query would open and close its own connection, which costs more than the
+# concurrency saves.
+
+
+def _in_own_connection(query):
+    def run():
+        # Drops this thread's connection if it outlived CONN_MAX_AGE or broke
+        close_old_connections()
+        try:
+            return query()
+        finally:
+            close_old_connections()
+    return run
+
+
+def run_query(query):
+    return sync_to_async(_in_own_connection(query), thread_sensitive=False)()
+
+
+def _json(data, status=200):
+    # DRF's encoder, so decimals and dates render as in the sync views
+    return JsonResponse(data, status=status, encoder=JSONEncoder)
+
+
+def _error(message, status):
+    return _json({'error': message}, status=status)
+
+
+async def basic_analytics_overview(request):
+    try:
+        try:
+            start, end, granularity, limit = parse_window(request.GET, default_limit=5)
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        if parse_flag(request.GET.get('approx')):
+            if start or end or granularity:
+                return _error(APPROX_WINDOW_ERROR, 400)
+            return _json(await run_query(partial(approx_overview, limit)))
+
+        try:
+            source = parse_source(request.GET.get('source'))
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        if source == 'rollup':
+            rollup, total_customers, total_products = await asyncio.gather(
+                run_query(partial(overview_from_rollups, limit, start, end, granularity)),
+                run_query(Customer.objects.count),
+                run_query(Product.objects.count),
+            )
+            overview = {**rollup, 'total_customers': total_customers, 'total_products': total_products}
+        else:
+            queries = overview_queries(start, end, limit, granularity)
+            results = await asyncio.gather(*(run_query(query) for query in queries.values()))
+            overview = overview_from_parts(dict(zip(queries, results)))
+
+        return _json(overview_response(overview, granularity))
+
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+async def top_products(request):
+    try:
+        try:
+            start, end, granularity, limit = parse_window(request.GET, default_limit=10)
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        if parse_flag(request.GET.get('approx')):
+            if start or end or granularity:
+                return _error(APPROX_WINDOW_ERROR, 400)
+            products, error_bounds = await run_query(partial(approx_top_products, limit))
+            return _json({
+                'message': 'Top products retrieved successfully.',
+                'top_products': products,
+                'approximate': True,
+                'error_bounds': error_bounds
+            })
+
+        try:
+            source = parse_source(request.GET.get('source'))
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        if source == 'rollup':
+            products, series = await run_query(partial(top_products_from_rollups, limit, start, end, granularity))
+        else:
+            # The series needs the top product ids, so these two are sequential
+            products = await run_query(lambda: list(top_products_query(start, end, limit)))
+            series = None
+            if granularity:
+                product_ids = [row['product__id'] for row in products]
+                series = await run_query(lambda: list(top_product_series_query(product_ids, granularity, start, end)))
+
+        data = {
+            'message': 'Top products retrieved successfully.',
+            'top_products': products
+        }
+        if granularity:
+            data['granularity'] = granularity
+            data['series'] = series
+        return _json(data)
+
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+async def category_preferences(request):
+    try:
+        try:
+            age_groups = parse_age_buckets(request.GET.get('age_buckets'))
+            gender_groups = parse_genders(request.GET.get('genders'))
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        approx = parse_flag(request.GET.get('approx'))
+
+        if approx:
+            customer_groups, (grouped, error_bounds) = await asyncio.gather(
+                run_query(partial(customer_groups_query, age_groups, gender_groups)),
+                run_query(partial(approx_category_preferences, age_groups, gender_groups)),
+            )
+        else:
+            customer_groups, grouped = await asyncio.gather(
+                run_query(partial(customer_groups_query, age_groups, gender_groups)),
+                run_query(partial(category_preferences_query, age_groups, gender_groups)),
+            )
+
+        data = {
+            'message': 'Category preferences by age and gender retrieved successfully.',
+            'preferences': preferences_by_group(customer_groups, grouped, age_groups, gender_groups)
+        }
+        if approx:
+            data['approximate'] = True
+            data['error_bounds'] = error_bounds
+        return _json(data)
+
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+async def discount_usage(request):
+    try:
+        try:
+            age_groups = parse_age_buckets(request.GET.get('age_buckets'))
+            start, end = parse_date_range(request.GET)
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        rows = await run_query(partial(discount_usage_query, age_groups, start, end))
+        return _json({
+            'message': 'Discount usage analysis completed.',
+            'discount_usage_by_age_group': discount_usage_by_group(rows, age_groups)
+        })
+
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+async def customer_segmentation(request):
+    try:
+        source = request.GET.get('source', 'store')
+        if source not in ('store', 'purchases'):
+            return _error('Invalid "source" parameter. Use "store" or "purchases".', 400)
+
+        def features():
+            with phase('features'):
+                return extract_rfm_features(source=source)
+
+        df = await run_query(features)
+        # KMeans prediction, labeling and summaries off the event loop; the
+        # copied context keeps their phases in this request's Server-Timing
+        context = contextvars.copy_context()
+        result = await asyncio.get_running_loop().run_in_executor(None, context.run, segment_customer_frame, df)
+
+        return _json({
+            'message': 'Customer segmentation from database successful.',
+            **result
+        })
+
+    except SegmentationError as e:
+        return _error(str(e), e.status)
+    except Exception as e:
+        return _error(str(e), 500)
@@ -0,0 +1,117 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# JWT authentication that resolves users from a small in-process cache instead
+# of loading the User row on every request. Entries are dropped when the user
+# is saved (including deactivation and password changes) or deleted; other
+# worker processes only learn of the change when their entry expires, so
+# TIMEOUT bounds how long a deactivated user keeps access there. Changes made
+# with QuerySet.update() send no signals and are likewise bounded by TIMEOUT.
+# Configured by settings.ANALYTICS_AUTH_USER_CACHE:
+#   TIMEOUT   seconds a resolved user is reused (0 disables the cache)
+#   MAX_SIZE  users kept per process; least recently used are evicted first
+
+DEFAULTS = {
+    'TIMEOUT': 60,
+    'MAX_SIZE': 10_000,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'ANALYTICS_AUTH_USER_CACHE', {})}
+
+
+class UserCache:
+    def __init__(self):
+        # user id -> (expires at, user)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, user, timeout, max_size):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + timeout, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+USER_CACHE = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for simplejwt's JWTAuthentication that serves repeat
+    requests for the same user without a database query.
+    """
+
+    def get_user(self, validated_token):
+        config = _config()
+        if not config['TIMEOUT']:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        key = str(user_id)
+        user = USER_CACHE.get(key)
+        if user is None:
+            # Unknown and inactive users raise here and are never cached
+            user = super().get_user(validated_token)
+            USER_CACHE.set(key, user, config['TIMEOUT'], config['MAX_SIZE'])
+        else:
+            self.check_user(user, validated_token)
+
+        # Views get their own instance, so nothing they set leaks into the cache
+        return copy.copy(user)
+
+    @staticmethod
+    def check_user(user, validated_token):
+        # The per-token checks JWTAuthentication.get_user() applies after loading
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    key = str(getattr(instance, api_settings.USER_ID_FIELD))
+    USER_CACHE.delete(key)
+    # Again once committed, in case a concurrent request re-cached the old row
+    transaction.on_commit(lambda: USER_CACHE.delete(key))
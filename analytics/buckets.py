@@ -0,0 +1,88 @@
+import re
+
+from django.db.models import Case, CharField, F, Q, Value, When
+
+
+# Default demographic buckets used by the analytics endpoints
+DEFAULT_AGE_BUCKETS = '18-25,26-35,36-50,51+'
+DEFAULT_GENDERS = 'Male,Female,Unspecified'
+# Label for customers without a recorded gender
+UNSPECIFIED_GENDER = 'Unspecified'
+
+# "18-25" is closed; "51-", "51+" and a bare "51" are open-ended. An
+# unescaped "+" decodes to a space in a query string, which leaves "51"
+_BUCKET_RE = re.compile(r'^(\d+)\s*(?:-\s*(\d+)|[-+])?$')
+
+
+def parse_age_buckets(value=None):
+    """
+    Parse "18-25,26-35,51-" into [(label, low, high)], high being None for an
+    open-ended bucket ("51-", "51+" or "51"). Labels use an en dash ("18–25")
+    like the original hard-coded buckets. Raises ValueError for malformed or
+    overlapping buckets.
+    """
+    buckets = []
+    for part in (value or DEFAULT_AGE_BUCKETS).split(','):
+        match = _BUCKET_RE.match(part.strip())
+        if not match:
+            raise ValueError(f'Invalid age bucket "{part.strip()}". Use e.g. "18-25", or "51-" for 51 and over.')
+
+        low = int(match.group(1))
+        if match.group(2) is None:
+            buckets.append((f'{low}+', low, None))
+        else:
+            high = int(match.group(2))
+            if high < low:
+                raise ValueError(f'Invalid age bucket "{part.strip()}".')
+            buckets.append((f'{low}–{high}', low, high))
+
+    ordered = sorted(buckets, key=lambda bucket: bucket[1])
+    for (label, _, high), (next_label, next_low, _) in zip(ordered, ordered[1:]):
+        if high is None or high >= next_low:
+            raise ValueError(f'Age buckets "{label}" and "{next_label}" overlap.')
+    return buckets
+
+
+def parse_genders(value=None):
+    genders = [gender.strip() for gender in (value or DEFAULT_GENDERS).split(',') if gender.strip()]
+    if not genders:
+        raise ValueError('At least one gender is required.')
+    return genders
+
+
+def age_bucket_expression(age_field, buckets):
+    """SQL CASE mapping `age_field` to its bucket label (NULL when unbucketed)."""
+    whens = []
+    for label, low, high in buckets:
+        lookup = {f'{age_field}__gte': low}
+        if high is not None:
+            lookup[f'{age_field}__lte'] = high
+        whens.append(When(then=Value(label), **lookup))
+    return Case(*whens, default=Value(None), output_field=CharField())
+
+
+def age_bucket_filter(age_field, buckets):
+    # Plain range predicate that lets the database use an index on age
+    q = Q()
+    for _, low, high in buckets:
+        lookup = {f'{age_field}__gte': low}
+        if high is not None:
+            lookup[f'{age_field}__lte'] = high
+        q |= Q(**lookup)
+    return q
+
+
+def gender_expression(gender_field):
+    return Case(
+        When(**{f'{gender_field}__isnull': True}, then=Value(UNSPECIFIED_GENDER)),
+        default=F(gender_field),
+        output_field=CharField(),
+    )
+
+
+def gender_filter(gender_field, genders):
+    named = [gender for gender in genders if gender != UNSPECIFIED_GENDER]
+    q = Q(**{f'{gender_field}__in': named})
+    if UNSPECIFIED_GENDER in genders:
+        q |= Q(**{f'{gender_field}__isnull': True})
+    return q
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .segmentation import FEATURE_DTYPES, REQUIRED_COLUMNS
+
+
+# Typed, memory-mappable copy of an uploaded segmentation CSV: one .npy file
+# per required column in "<name>.columns/" next to the CSV, plus meta.json.
+# Later analyses np.load(..., mmap_mode='r') these instead of re-parsing text.
+
+CONVERT_CHUNK_SIZE = 100_000
+META_FILE = 'meta.json'
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def columnar_dir(csv_path):
+    return f'{os.path.splitext(csv_path)[0]}.columns'
+
+
+def convert_csv_to_columnar(csv_path, content_hash=None, chunk_size=CONVERT_CHUNK_SIZE):
+    """
+    Validate the upload's schema and write the columnar copy in two chunked
+    passes (sizing, then filling pre-allocated memmaps), so memory stays
+    bounded by one chunk. `content_hash` (SHA-256 of the CSV bytes) is kept
+    in the metadata for result caching. Returns the metadata dict.
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise SchemaError(f'Missing required columns: {missing}')
+
+    def chunks():
+        return pd.read_csv(csv_path, usecols=REQUIRED_COLUMNS, dtype={**FEATURE_DTYPES, 'CustomerID': str},
+                           chunksize=chunk_size)
+
+    # Pass 1: row count and the narrowest dtype that holds every CustomerID
+    n_rows = 0
+    numeric_ids = True
+    id_width = 1
+    try:
+        for chunk in chunks():
+            if chunk.empty:
+                continue
+            missing_ids = chunk['CustomerID'].isna()
+            if missing_ids.any():
+                # Header is line 1; the chunk index counts data rows across chunks
+                raise SchemaError(f'Empty CustomerID on line {chunk.index[missing_ids.to_numpy()][0] + 2}.')
+            n_rows += len(chunk)
+            ids = chunk['CustomerID']
+            id_width = max(id_width, int(ids.str.len().max() or 1))
+            if numeric_ids and not ids.str.fullmatch(r'-?\d+').all():
+                numeric_ids = False
+    except ValueError as e:
+        raise SchemaError(f'Invalid CSV data: {e}')
+    if not n_rows:
+        raise SchemaError('The file contains no data rows.')
+
+    dtypes = {**FEATURE_DTYPES, 'CustomerID': 'int64' if numeric_ids else f'<U{id_width}'}
+
+    target_dir = columnar_dir(csv_path)
+    tmp_dir = f'{target_dir}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # Pass 2: fill the pre-allocated column files
+    arrays = {
+        col: np.lib.format.open_memmap(os.path.join(tmp_dir, f'{col}.npy'), mode='w+',
+                                       dtype=dtypes[col], shape=(n_rows,))
+        for col in REQUIRED_COLUMNS
+    }
+    offset = 0
+    for chunk in chunks():
+        end = offset + len(chunk)
+        for col in REQUIRED_COLUMNS:
+            arrays[col][offset:end] = chunk[col].to_numpy(dtype=dtypes[col])
+        offset = end
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    meta = {'rows': n_rows, 'dtypes': dtypes, 'sha256': content_hash}
+    with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.replace(tmp_dir, target_dir)
+    return meta
+
+
+def read_columnar_meta(csv_path):
+    try:
+        with open(os.path.join(columnar_dir(csv_path), META_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_columnar(csv_path):
+    """Memory-map the columnar copy of an upload, or return None if there is none."""
+    target_dir = columnar_dir(csv_path)
+    if not os.path.exists(os.path.join(target_dir, META_FILE)):
+        return None
+
+    return {
+        col: np.load(os.path.join(target_dir, f'{col}.npy'), mmap_mode='r')
+        for col in REQUIRED_COLUMNS
+    }
+
+
+def columnar_frame(columns, start=0, stop=None):
+    # Memmap slices are views. copy=False also keeps one block per column: a
+    # consolidated frame would copy the int64 columns into a single 2-D block.
+    # The float64 matrix handed to the model is still a copy (predict_segments).
+    return pd.DataFrame({col: columns[col][start:stop] for col in REQUIRED_COLUMNS}, copy=False)
+
+
+def iter_columnar_chunks(columns, chunk_size):
+    n_rows = len(columns[REQUIRED_COLUMNS[0]])
+    for start in range(0, n_rows, chunk_size):
+        yield columnar_frame(columns, start, start + chunk_size)
@@ -0,0 +1,272 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils.timezone import get_current_timezone, localdate, make_aware
+
+from .jobs import _init_worker
+
+
+# Synthetic data for seed_data. Every random draw comes from a numpy
+# Generator seeded with (seed, stream, batch), so a given seed, batch size
+# and end date produce the same data however many workers run the batches.
+# Purchases get explicit ids (1..N) so items can reference them without
+# reading ids back from bulk_create, which MySQL does not return. Like
+# jobs.py, this module is imported by spawned workers before Django is set
+# up: model imports stay local.
+
+CATEGORIES = ['Clothing', 'Footwear', 'Accessories']
+GENDERS = ['Male', 'Female']
+PRODUCT_SUFFIXES = ['Delux', 'Pro', 'Lux', 'Devine', 'Aes', 'X']
+NAME_POOL_SIZE = 500
+# Zipf exponent for product popularity and customer activity
+PRODUCT_SKEW = 1.1
+CUSTOMER_SKEW = 0.8
+MAX_ITEMS_PER_PURCHASE = 4
+MAX_QUANTITY = 3
+
+# Random streams
+CUSTOMER_STREAM = 1
+PRODUCT_STREAM = 2
+PURCHASE_STREAM = 3
+
+
+def _rng(seed, stream, batch=0):
+    return np.random.default_rng([seed, stream, batch])
+
+
+def zipf_weights(n, skew):
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def seasonal_day_weights(days, end):
+    """
+    Relative purchase volume for each of the `days` days before `end` (1 day
+    ago first): a yearly cycle peaking in December, plus busier weekends.
+    """
+    dates = [(end - timedelta(days=offset)).date() for offset in range(1, days + 1)]
+    day_of_year = np.array([d.timetuple().tm_yday for d in dates])
+    weekday = np.array([d.weekday() for d in dates])
+    weights = 1 + 0.35 * np.cos(2 * np.pi * (day_of_year - 345) / 365)
+    weights *= np.where(weekday >= 5, 1.3, 1.0)
+    return weights / weights.sum()
+
+
+def _name_pools(seed):
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    return {
+        'Male': [fake.name_male() for _ in range(NAME_POOL_SIZE)],
+        'Female': [fake.name_female() for _ in range(NAME_POOL_SIZE)],
+        'city': [fake.city() for _ in range(NAME_POOL_SIZE)],
+        'word': [fake.word().capitalize() for _ in range(NAME_POOL_SIZE)],
+    }
+
+
+def clear_data():
+    """
+    Empty the data and derived tables with plain DELETEs. Model.delete()
+    would load every row to run cascades and signals.
+    """
+    from .models import (
+        Customer, CustomerCategoryFeature, CustomerFeatures, DailyCategorySales, DailyCustomerSales,
+        DailyProductSales, Product, Purchase, PurchaseItem, RollupWatermark, SalesSketch
+    )
+
+    ordered = [
+        DailyProductSales, DailyCategorySales, DailyCustomerSales, RollupWatermark, SalesSketch,
+        CustomerCategoryFeature, CustomerFeatures, PurchaseItem, Purchase, Product, Customer,
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in ordered:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def reset_sequences():
+    # Explicit ids leave PostgreSQL sequences behind; a no-op on MySQL/SQLite
+    from django.core.management.color import no_style
+
+    from .models import Customer, Product, Purchase
+
+    statements = connection.ops.sequence_reset_sql(no_style(), [Customer, Product, Purchase])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def create_customers(count, seed, batch_size):
+    from .features import bulk_insert_in_batches
+    from .models import Customer
+
+    rng = _rng(seed, CUSTOMER_STREAM)
+    pools = _name_pools(seed)
+    genders = rng.choice(GENDERS, size=count)
+    ages = rng.integers(18, 66, size=count)
+    names = rng.integers(0, NAME_POOL_SIZE, size=count)
+    cities = rng.integers(0, NAME_POOL_SIZE, size=count)
+
+    with transaction.atomic():
+        return bulk_insert_in_batches(Customer, (
+            Customer(
+                id=index + 1,
+                name=pools[genders[index]][names[index]],
+                gender=genders[index],
+                age=int(ages[index]),
+                location=pools['city'][cities[index]],
+            )
+            for index in range(count)
+        ), batch_size)
+
+
+def product_prices(count, seed):
+    """Return (base_price, price) in cents; price is base plus a 10-50% markup."""
+    rng = _rng(seed, PRODUCT_STREAM)
+    base = rng.integers(20, 201, size=count) * 100
+    markup = rng.uniform(1.1, 1.5, size=count)
+    return base, np.round(base * markup).astype(np.int64)
+
+
+def create_products(count, seed, batch_size):
+    from .features import bulk_insert_in_batches
+    from .models import Product
+
+    base, price = product_prices(count, seed)
+    rng = _rng(seed, PRODUCT_STREAM, 1)
+    pools = _name_pools(seed)
+    categories = rng.choice(CATEGORIES, size=count)
+    words = rng.integers(0, NAME_POOL_SIZE, size=count)
+    suffixes = rng.choice(PRODUCT_SUFFIXES, size=count)
+    stock = rng.integers(20, 101, size=count)
+
+    with transaction.atomic():
+        return bulk_insert_in_batches(Product, (
+            Product(
+                id=index + 1,
+                name=f"{pools['word'][words[index]]} {suffixes[index]}",
+                category=categories[index],
+                base_price=_cents(base[index]),
+                price=_cents(price[index]),
+                stock_quantity=int(stock[index]),
+            )
+            for index in range(count)
+        ), batch_size)
+
+
+def _cents(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def create_purchase_batch(batch, first_id, count, spec):
+    """
+    Generate and insert purchases first_id..first_id+count-1 with their
+    items. Runs in the command's process or in a worker. Returns
+    (purchases, items) written.
+    """
+    from .models import Purchase, PurchaseItem
+
+    rng = _rng(spec['seed'], PURCHASE_STREAM, batch)
+    end = spec['end']
+
+    # Zipf-skewed customers and products; a random permutation decouples
+    # popularity from id order
+    customers = spec['customer_order'][
+        rng.choice(spec['customers'], size=count, p=zipf_weights(spec['customers'], CUSTOMER_SKEW))
+    ] + 1
+    days_ago = rng.choice(spec['days'], size=count, p=seasonal_day_weights(spec['days'], end)) + 1
+    seconds = rng.integers(0, 24 * 60 * 60, size=count)
+    discounts = rng.random(count) < 0.5
+    item_counts = rng.integers(1, MAX_ITEMS_PER_PURCHASE + 1, size=count)
+
+    n_items = int(item_counts.sum())
+    product_index = spec['product_order'][
+        rng.choice(spec['products'], size=n_items, p=zipf_weights(spec['products'], PRODUCT_SKEW))
+    ]
+    quantities = rng.integers(1, MAX_QUANTITY + 1, size=n_items)
+    prices = spec['prices'][product_index]
+
+    # Purchase totals straight from the cents arrays, no per-row Decimal math
+    owners = np.repeat(np.arange(count), item_counts)
+    totals = np.bincount(owners, weights=prices * quantities, minlength=count).astype(np.int64)
+    purchase_ids = np.arange(first_id, first_id + count)
+
+    day_start = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    with transaction.atomic():
+        Purchase.objects.bulk_create([
+            Purchase(
+                id=int(purchase_ids[index]),
+                customer_id=int(customers[index]),
+                purchase_date=day_start - timedelta(days=int(days_ago[index])) + timedelta(seconds=int(seconds[index])),
+                total_amount=_cents(totals[index]),
+                discount_applied=bool(discounts[index]),
+            )
+            for index in range(count)
+        ])
+        PurchaseItem.objects.bulk_create([
+            PurchaseItem(
+                purchase_id=int(purchase_ids[owners[index]]),
+                product_id=int(product_index[index]) + 1,
+                quantity=int(quantities[index]),
+                price_at_purchase=_cents(prices[index]),
+            )
+            for index in range(n_items)
+        ], batch_size=spec['batch_size'])
+    return count, n_items
+
+
+def _run_batch(args):
+    # Worker entry point; connections are per process
+    try:
+        return create_purchase_batch(*args)
+    finally:
+        connection.close()
+
+
+def create_purchases(count, customers, products, seed, days, batch_size, workers=1, progress=None, end_date=None):
+    """Purchases fall on the `days` days before `end_date` (default: today)."""
+    rng = _rng(seed, PURCHASE_STREAM)
+    end_date = end_date or localdate()
+    spec = {
+        'seed': seed,
+        'end': make_aware(datetime.combine(end_date, time.min), get_current_timezone()),
+        'days': days,
+        'customers': customers,
+        'products': products,
+        'customer_order': rng.permutation(customers),
+        'product_order': rng.permutation(products),
+        'prices': product_prices(products, seed)[1],
+        'batch_size': batch_size,
+    }
+    batches = [
+        (batch, first + 1, min(batch_size, count - first), spec)
+        for batch, first in enumerate(range(0, count, batch_size))
+    ]
+
+    written = [0, 0]
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'ecommerce.settings'),),
+        ) as executor:
+            results = executor.map(_run_batch, batches)
+            for purchases, items in results:
+                written[0] += purchases
+                written[1] += items
+                if progress:
+                    progress(*written)
+    else:
+        for args in batches:
+            purchases, items = create_purchase_batch(*args)
+            written[0] += purchases
+            written[1] += items
+            if progress:
+                progress(*written)
+    return tuple(written)
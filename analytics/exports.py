@@ -0,0 +1,71 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import PurchaseItem
+
+
+# Flat purchase line-item rows for warehouse exports. All four tables are
+# joined in each query; batches are keyed on the item id (id > last seen)
+# so memory stays bounded on every backend, including MySQL whose driver
+# buffers whole result sets rather than streaming from a server-side cursor.
+
+EXPORT_BATCH_SIZE = 5000
+
+PURCHASE_ITEM_EXPORT_COLUMNS = [
+    ('item_id', 'id'),
+    ('purchase_id', 'purchase_id'),
+    ('purchase_date', 'purchase__purchase_date'),
+    ('discount_applied', 'purchase__discount_applied'),
+    ('customer_id', 'purchase__customer_id'),
+    ('customer_name', 'purchase__customer__name'),
+    ('customer_gender', 'purchase__customer__gender'),
+    ('customer_age', 'purchase__customer__age'),
+    ('customer_location', 'purchase__customer__location'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('category', 'product__category'),
+    ('quantity', 'quantity'),
+    ('price_at_purchase', 'price_at_purchase'),
+]
+
+
+def iter_purchase_item_rows(filters=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield export rows (tuples in PURCHASE_ITEM_EXPORT_COLUMNS order)."""
+    paths = [path for _, path in PURCHASE_ITEM_EXPORT_COLUMNS]
+    queryset = PurchaseItem.objects.filter(**(filters or {})).order_by('id').values_list(*paths)
+
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1][0]
+
+
+def _normalize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in PURCHASE_ITEM_EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_normalize(value) for value in row])
+
+
+def stream_ndjson(rows):
+    # Decimals are written as strings so money keeps its exact value
+    names = [name for name, _ in PURCHASE_ITEM_EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(names, (_normalize(value) for value in row)))) + '\n'
@@ -0,0 +1,167 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .response_cache import bump_data_version
+from .models import Customer, CustomerCategoryFeature, CustomerFeatures, Purchase, PurchaseItem
+
+
+# Rows inserted per bulk_create when rebuilding the store
+REBUILD_BATCH_SIZE = 5000
+
+
+def apply_new_purchase(purchase):
+    """Fold a freshly created purchase into the customer's running totals."""
+    updated = CustomerFeatures.objects.filter(customer_id=purchase.customer_id).update(
+        total_spend=F('total_spend') + purchase.total_amount,
+        purchase_count=F('purchase_count') + 1,
+        last_purchase_date=Greatest(
+            Coalesce('last_purchase_date', Value(purchase.purchase_date)),
+            Value(purchase.purchase_date),
+        ),
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            CustomerFeatures.objects.create(
+                customer_id=purchase.customer_id,
+                total_spend=purchase.total_amount,
+                purchase_count=1,
+                last_purchase_date=purchase.purchase_date,
+            )
+    except IntegrityError:
+        # Another writer created the row first - retry as an increment
+        apply_new_purchase(purchase)
+
+
+def apply_new_purchase_item(item, customer_id, category):
+    """Add a freshly created line item's quantity to the customer's category totals."""
+    updated = CustomerCategoryFeature.objects.filter(customer_id=customer_id, category=category).update(
+        quantity=F('quantity') + item.quantity,
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            CustomerCategoryFeature.objects.create(
+                customer_id=customer_id,
+                category=category,
+                quantity=item.quantity,
+            )
+    except IntegrityError:
+        apply_new_purchase_item(item, customer_id, category)
+
+
+def refresh_customer_features(customer_id):
+    """
+    Recompute one customer's features from their purchase history. Used when
+    purchases or items are edited or deleted, where a running delta is unknown.
+    """
+    if not Customer.objects.filter(pk=customer_id).exists():
+        return
+
+    with transaction.atomic():
+        totals = Purchase.objects.filter(customer_id=customer_id).aggregate(
+            total_spend=Sum('total_amount'),
+            purchase_count=Count('id'),
+            last_purchase_date=Max('purchase_date'),
+        )
+        CustomerFeatures.objects.update_or_create(
+            customer_id=customer_id,
+            defaults={
+                'total_spend': totals['total_spend'] or 0,
+                'purchase_count': totals['purchase_count'],
+                'last_purchase_date': totals['last_purchase_date'],
+            },
+        )
+
+        category_rows = (
+            PurchaseItem.objects
+            .filter(purchase__customer_id=customer_id)
+            .values('product__category')
+            .annotate(quantity=Sum('quantity'))
+            .order_by()
+        )
+        CustomerCategoryFeature.objects.filter(customer_id=customer_id).delete()
+        CustomerCategoryFeature.objects.bulk_create([
+            CustomerCategoryFeature(
+                customer_id=customer_id,
+                category=row['product__category'],
+                quantity=row['quantity'],
+            )
+            for row in category_rows
+        ])
+
+
+def rebuild_feature_store(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Rebuild both feature tables from scratch with two grouped aggregates.
+    Returns (customer rows, category rows) written.
+    """
+    customer_rows = (
+        Purchase.objects
+        .values('customer_id')
+        .annotate(
+            total_spend=Sum('total_amount'),
+            purchase_count=Count('id'),
+            last_purchase_date=Max('purchase_date'),
+        )
+        .order_by('customer_id')
+    )
+    category_rows = (
+        PurchaseItem.objects
+        .values('purchase__customer_id', 'product__category')
+        .annotate(quantity=Sum('quantity'))
+        .order_by('purchase__customer_id')
+    )
+
+    with transaction.atomic():
+        CustomerCategoryFeature.objects.all().delete()
+        CustomerFeatures.objects.all().delete()
+
+        written_customers = bulk_insert_in_batches(
+            CustomerFeatures,
+            (
+                CustomerFeatures(
+                    customer_id=row['customer_id'],
+                    total_spend=row['total_spend'] or 0,
+                    purchase_count=row['purchase_count'],
+                    last_purchase_date=row['last_purchase_date'],
+                )
+                for row in customer_rows.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        written_categories = bulk_insert_in_batches(
+            CustomerCategoryFeature,
+            (
+                CustomerCategoryFeature(
+                    customer_id=row['purchase__customer_id'],
+                    category=row['product__category'],
+                    quantity=row['quantity'],
+                )
+                for row in category_rows.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        transaction.on_commit(bump_data_version)
+
+    return written_customers, written_categories
+
+
+def bulk_insert_in_batches(model, objects, batch_size):
+    written = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
@@ -0,0 +1,328 @@
+import csv
+import os
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.utils.timezone import localtime
+
+from .approx import refresh_sketches
+from .columnar import SchemaError
+from .features import rebuild_feature_store, refresh_customer_features
+from .product_counters import reconcile_product_counters
+from .recommendations import refresh_recommendations
+from .similarity import refresh_similarity_index
+from .models import Customer, Product, Purchase, PurchaseItem
+from .response_cache import bump_data_version
+from .rollups import refresh_rollups
+
+
+# Bulk import of transactional CSVs: one row per order line, e.g.
+#   order_id,order_date,customer_id,product_id,quantity,unit_price[,optional columns]
+# Customers, products and orders are upserted on their external ids, so
+# re-importing a file is idempotent: the first time an order appears in a run
+# its existing lines are replaced, later rows of the same order in that run
+# are appended. Invalid rows are skipped and written to a rejected-rows report.
+# Naive order dates are read as UTC.
+
+REQUIRED_IMPORT_COLUMNS = ['order_id', 'order_date', 'customer_id', 'product_id', 'quantity', 'unit_price']
+CUSTOMER_COLUMNS = {'customer_name': 'name', 'gender': 'gender', 'age': 'age', 'location': 'location'}
+PRODUCT_COLUMNS = {'product_name': 'name', 'category': 'category'}
+IMPORT_CHUNK_SIZE = 50_000
+IMPORT_BATCH_SIZE = 5000
+# Above this many touched customers the whole feature store is rebuilt
+FEATURE_REFRESH_LIMIT = 1000
+DEFAULT_CATEGORY = 'Uncategorized'
+# Purchase.total_amount is DECIMAL(10, 2); larger order totals are rejected
+MAX_ORDER_CENTS = 10 ** Purchase._meta.get_field('total_amount').max_digits
+MAX_QUANTITY = 2 ** 31 - 1
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+
+def import_transactions_csv(file_path, report_path=None, chunk_size=IMPORT_CHUNK_SIZE, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Load a transactional CSV. Returns a summary dict; raises SchemaError when
+    required columns are missing.
+    """
+    started = time.monotonic()
+    header = pd.read_csv(file_path, nrows=0).columns.str.strip()
+    missing = [col for col in REQUIRED_IMPORT_COLUMNS if col not in header]
+    if missing:
+        raise SchemaError(f'Missing required columns: {missing}')
+
+    if report_path is None:
+        report_path = f'{os.path.splitext(file_path)[0]}.rejected.csv'
+
+    state = {
+        # order external id -> total cents imported so far in this run
+        'order_totals': {},
+        'customers': set(),
+        'products': set(),
+        'touched_customers': set(),
+        # product ids whose sales counters need recounting
+        'touched_products': set(),
+        # days whose rollups lose rows when re-imported orders are replaced
+        'stale_days': set(),
+    }
+    summary = {'rows': 0, 'imported_rows': 0, 'rejected_rows': 0, 'items': 0}
+    report = None
+
+    try:
+        reader = pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            # 1-based file line numbers (line 1 is the header)
+            chunk.index = chunk.index + 2
+            valid, rejected = validate_rows(chunk, state['order_totals'])
+
+            if len(rejected):
+                if report is None:
+                    report = open(report_path, 'w', newline='')
+                    writer = csv.writer(report)
+                    writer.writerow(['line', 'reason'] + list(header))
+                for line, row in rejected.iterrows():
+                    writer.writerow([line, row['reason']] + [row.get(col, '') for col in header])
+
+            if len(valid):
+                with transaction.atomic():
+                    summary['items'] += _import_chunk(valid, set(header), state, batch_size)
+
+            summary['rows'] += len(chunk)
+            summary['imported_rows'] += len(valid)
+            summary['rejected_rows'] += len(rejected)
+    finally:
+        if report is not None:
+            report.close()
+        # Each chunk commits on its own, so a failure in a later one still
+        # leaves the earlier chunks' rows to be folded into derived tables
+        _refresh_derived(state, batch_size)
+        bump_data_version()
+
+    summary.update({
+        'orders': len(state['order_totals']),
+        'customers': len(state['customers']),
+        'products': len(state['products']),
+        'rejected_report': report_path if summary['rejected_rows'] else None,
+        'seconds': round(time.monotonic() - started, 2),
+    })
+    return summary
+
+
+def validate_rows(df, order_totals=None):
+    """
+    Vectorized validation. Returns (valid rows with parsed columns, rejected
+    rows with a 'reason' column). `order_totals` maps order ids to the cents
+    already imported for them in this run.
+    """
+    df = df.apply(lambda col: col.str.strip())
+    reasons = pd.Series('', index=df.index)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == '')] = reason
+
+    for col in ('order_id', 'customer_id', 'product_id'):
+        reject(df[col] == '', f'missing {col}')
+        reject(df[col].str.len() > 64, f'{col} longer than 64 characters')
+
+    order_date = pd.to_datetime(df['order_date'], errors='coerce', utc=True, format='mixed')
+    reject(order_date.isna(), 'invalid order_date')
+
+    quantity = pd.to_numeric(df['quantity'], errors='coerce')
+    reject(quantity.isna() | (quantity <= 0) | (quantity % 1 != 0), 'quantity must be a positive integer')
+    reject(quantity > MAX_QUANTITY, 'quantity too large')
+
+    unit_price = pd.to_numeric(df['unit_price'], errors='coerce')
+    reject(unit_price.isna() | (unit_price < 0) | (unit_price >= 10 ** 8), 'invalid unit_price')
+
+    if 'discount_applied' in df:
+        flags = df['discount_applied'].str.lower()
+        reject(~flags.isin(TRUE_VALUES | FALSE_VALUES), 'discount_applied must be true/false')
+        discount = flags.isin(TRUE_VALUES)
+    else:
+        discount = pd.Series(False, index=df.index)
+
+    if 'age' in df:
+        age = pd.to_numeric(df['age'], errors='coerce')
+        reject((df['age'] != '') & (age.isna() | (age < 0) | (age > 150) | (age % 1 != 0)), 'invalid age')
+    for col in ('product_name', 'category'):
+        if col in df:
+            reject(df[col] == '', f'missing {col}')
+    # Overlong text would abort the whole chunk's insert on strict databases
+    for columns, model in ((CUSTOMER_COLUMNS, Customer), (PRODUCT_COLUMNS, Product)):
+        for col, field in columns.items():
+            max_length = model._meta.get_field(field).max_length
+            if col in df and max_length:
+                reject(df[col].str.len() > max_length, f'{col} longer than {max_length} characters')
+
+    # Orders whose total would overflow are rejected with all their rows in this chunk
+    ok = reasons == ''
+    line_cents = np.round(unit_price[ok] * 100) * quantity[ok]
+    order_cents = line_cents.groupby(df['order_id'][ok]).transform('sum')
+    if order_totals:
+        order_cents += df['order_id'][ok].map(order_totals).fillna(0)
+    reject((order_cents >= MAX_ORDER_CENTS).reindex(df.index, fill_value=False), 'order total too large')
+
+    ok = reasons == ''
+    valid = df[ok].copy()
+    valid['order_date'] = order_date[ok]
+    valid['quantity'] = quantity[ok].astype('int64')
+    valid['price_cents'] = np.round(unit_price[ok].to_numpy() * 100).astype('int64')
+    valid['discount_applied'] = discount[ok]
+    if 'age' in valid:
+        valid['age'] = [int(value) if value == value else None for value in age[ok]]
+
+    rejected = df[~ok].copy()
+    rejected['reason'] = reasons[~ok]
+    return valid, rejected
+
+
+def _cents(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def _id_map(model, keys, batch_size):
+    ids = {}
+    keys = list(keys)
+    for start in range(0, len(keys), batch_size):
+        ids.update(model.objects.filter(external_id__in=keys[start:start + batch_size]).values_list('external_id', 'id'))
+    return ids
+
+
+def _upsert(model, objects, update_fields, batch_size):
+    if update_fields:
+        # MySQL cannot name the conflict target; ON DUPLICATE KEY UPDATE
+        # resolves on the unique external_id key by itself
+        unique_fields = ['external_id'] if connection.features.supports_update_conflicts_with_target else None
+        model.objects.bulk_create(objects, batch_size=batch_size, update_conflicts=True,
+                                  unique_fields=unique_fields, update_fields=update_fields)
+    else:
+        model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+    return _id_map(model, (obj.external_id for obj in objects), batch_size)
+
+
+def _optional(value):
+    if value is None or value == '' or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value
+
+
+def _import_chunk(df, columns, state, batch_size):
+    # Customers: last row per external id wins
+    customer_fields = [field for col, field in CUSTOMER_COLUMNS.items() if col in columns]
+    customer_rows = df.drop_duplicates('customer_id', keep='last')
+    customer_ids = _upsert(Customer, [
+        Customer(
+            external_id=row['customer_id'],
+            **{field: _optional(row[col]) for col, field in CUSTOMER_COLUMNS.items() if col in columns},
+        )
+        for row in customer_rows.to_dict('records')
+    ], customer_fields, batch_size)
+    state['customers'].update(customer_ids)
+
+    # Products: name/category from the file when given; prices stay as stored
+    product_fields = [field for col, field in PRODUCT_COLUMNS.items() if col in columns]
+    product_rows = df.drop_duplicates('product_id', keep='last')
+    product_ids = _upsert(Product, [
+        Product(
+            external_id=row['product_id'],
+            name=row.get('product_name') or row['product_id'],
+            category=row.get('category') or DEFAULT_CATEGORY,
+            price=_cents(row['price_cents']),
+            base_price=_cents(row['price_cents']),
+            stock_quantity=0,
+        )
+        for row in product_rows.to_dict('records')
+    ], product_fields, batch_size)
+    state['products'].update(product_ids)
+    state['touched_products'].update(product_ids.values())
+
+    # Order totals from integer cents, summed per order without per-row saves
+    line_cents = df['price_cents'] * df['quantity']
+    chunk_totals = line_cents.groupby(df['order_id'], sort=False).sum()
+    order_totals = state['order_totals']
+    first_seen = [order for order in chunk_totals.index if order not in order_totals]
+    for order, cents in chunk_totals.items():
+        order_totals[order] = order_totals.get(order, 0) + int(cents)
+
+    # Orders imported by an earlier run get their lines replaced
+    existing = []
+    for start in range(0, len(first_seen), batch_size):
+        existing += Purchase.objects.filter(external_id__in=first_seen[start:start + batch_size]).values_list(
+            'id', 'customer_id', 'purchase_date'
+        )
+    if existing:
+        state['touched_products'].update(_delete_items([row[0] for row in existing], batch_size))
+        state['touched_customers'].update(row[1] for row in existing)
+        state['stale_days'].update(localtime(row[2]).date() for row in existing)
+
+    order_rows = df.drop_duplicates('order_id', keep='first')
+    purchase_fields = ['customer', 'purchase_date', 'total_amount']
+    if 'discount_applied' in columns:
+        purchase_fields.append('discount_applied')
+    purchase_ids = _upsert(Purchase, [
+        Purchase(
+            external_id=row['order_id'],
+            customer_id=customer_ids[row['customer_id']],
+            purchase_date=row['order_date'].to_pydatetime(),
+            total_amount=_cents(order_totals[row['order_id']]),
+            discount_applied=bool(row['discount_applied']),
+        )
+        for row in order_rows.to_dict('records')
+    ], purchase_fields, batch_size)
+    state['touched_customers'].update(customer_ids[key] for key in order_rows['customer_id'])
+
+    items = [
+        PurchaseItem(
+            purchase_id=purchase_ids[order],
+            product_id=product_ids[product],
+            quantity=int(quantity),
+            price_at_purchase=_cents(cents),
+        )
+        for order, product, quantity, cents in zip(
+            df['order_id'], df['product_id'], df['quantity'], df['price_cents']
+        )
+    ]
+    PurchaseItem.objects.bulk_create(items, batch_size=batch_size)
+    return len(items)
+
+
+def _delete_items(purchase_ids, batch_size):
+    """Delete the orders' lines; returns the ids of the products they were for."""
+    # Plain DELETE: QuerySet.delete() would load every line to send the
+    # per-row signals, and derived tables are refreshed after the import anyway
+    table = connection.ops.quote_name(PurchaseItem._meta.db_table)
+    product_ids = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(purchase_ids), batch_size):
+            batch = purchase_ids[start:start + batch_size]
+            product_ids.update(
+                PurchaseItem.objects.filter(purchase_id__in=batch).values_list('product_id', flat=True).distinct()
+            )
+            cursor.execute(f'DELETE FROM {table} WHERE purchase_id IN ({", ".join(["%s"] * len(batch))})', batch)
+    return product_ids
+
+
+def _refresh_derived(state, batch_size):
+    # bulk_create skips the signals that maintain the feature store
+    touched = state['touched_customers']
+    if len(touched) > FEATURE_REFRESH_LIMIT:
+        rebuild_feature_store(batch_size=batch_size)
+    else:
+        for customer_id in touched:
+            refresh_customer_features(customer_id)
+
+    # New lines have ids above the rollup watermarks, so an incremental
+    # refresh picks up their days; replaced orders' old days are added
+    refresh_rollups(extra_days=state['stale_days'], batch_size=batch_size)
+    # Recounted rather than incremented, since replaced lines were removed
+    reconcile_product_counters(state['touched_products'], batch_size=batch_size)
+    # Sketches cannot subtract the replaced lines, so replacements rebuild them
+    refresh_sketches(full=bool(state['stale_days']), batch_size=batch_size)
+    # Same for co-purchase counts; new orders are folded into the matrix
+    refresh_recommendations(full=bool(state['stale_days']), batch_size=batch_size)
+    # Re-embeds the customers whose features were refreshed above
+    refresh_similarity_index(batch_size=batch_size)
@@ -0,0 +1,220 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Per-request performance metrics. PerformanceMiddleware records SQL count and
+# time, analytics phases (see phase()), response rendering and size, emits them
+# in a Server-Timing header and folds them into in-process histograms served
+# in Prometheus text format by the metrics/ endpoint. Each worker process keeps
+# its own registry; Prometheus aggregates across processes when scraping each.
+# Streaming responses are measured up to the first byte only.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+_current = contextvars.ContextVar('analytics_request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets, label):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            counts, total = self._series.get(label_value, ([0] * (len(self.buckets) + 1), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._series[label_value] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for label_value, counts, total in series:
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram('analytics_request_duration_seconds', 'Request wall time.', DURATION_BUCKETS, 'endpoint')
+REQUEST_QUERIES = Histogram('analytics_request_db_queries', 'SQL queries per request.', QUERY_BUCKETS, 'endpoint')
+REQUEST_DB_DURATION = Histogram('analytics_request_db_duration_seconds', 'Time spent in SQL per request.',
+                                DURATION_BUCKETS, 'endpoint')
+RESPONSE_SIZE = Histogram('analytics_response_size_bytes', 'Response body size (non-streaming).',
+                          SIZE_BUCKETS, 'endpoint')
+PHASE_DURATION = Histogram('analytics_phase_duration_seconds', 'Time spent in each analytics phase.',
+                           DURATION_BUCKETS, 'phase')
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_DURATION, RESPONSE_SIZE, PHASE_DURATION]
+
+
+def render_metrics():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+class RequestMetrics:
+    def __init__(self, parent=None):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # phase name -> seconds, in first-seen order
+        self.phases = {}
+        # An enclosing collect_metrics() block sees everything recorded here too
+        self.parent = parent
+        # Async views run queries concurrently on executor threads
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+        if self.parent is not None:
+            self.parent.add_query(seconds)
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if self.parent is not None:
+            self.parent.add_phase(name, seconds)
+
+
+@contextmanager
+def collect_metrics():
+    """
+    Count queries and phases issued in this context, including those of
+    requests made through the test clients and of their executor threads.
+    """
+    metrics = RequestMetrics(parent=_current.get())
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def _instrument_connection(sender, connection, **kwargs):
+    # Installed on every connection rather than around the request, so
+    # queries from sync_to_async threads (which inherit the request's
+    # context) are counted as well
+    connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a block as analytics phase `name` ('features', 'clustering',
+    'labeling', 'serialization', ...). Repeated phases accumulate.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+
+def record_phase(name, seconds):
+    PHASE_DURATION.observe(name, seconds)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_phase(name, seconds)
+
+
+def server_timing(metrics, total_seconds):
+    entries = [f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries"']
+    entries += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics.phases.items()]
+    entries.append(f'total;dur={total_seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class PerformanceMiddleware:
+    """Enabled unless settings.ANALYTICS_INSTRUMENTATION is False."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ANALYTICS_INSTRUMENTATION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        metrics = RequestMetrics(parent=_current.get())
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(parent=_current.get())
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    def finish(self, request, response, metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.url_name or match.route) if match else 'unmatched'
+        REQUEST_DURATION.observe(endpoint, total)
+        REQUEST_QUERIES.observe(endpoint, metrics.queries)
+        REQUEST_DB_DURATION.observe(endpoint, metrics.db_seconds)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(endpoint, len(response.content))
+
+        response['Server-Timing'] = server_timing(metrics, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that as 'render'
+        started = time.perf_counter()
+        response.add_post_render_callback(lambda rendered: record_phase('render', time.perf_counter() - started))
+        return response
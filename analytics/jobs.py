@@ -0,0 +1,111 @@
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils.timezone import now
+
+
+# One pool per web process. Workers are spawned (not forked) so they never
+# share the parent's open database connections. This module is imported by
+# the fresh worker before Django is set up, so model imports stay local.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'SEGMENTATION_JOB_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'ecommerce.settings'),),
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def submit_segmentation_job(kind, params):
+    """Persist a pending job and hand it to the worker pool."""
+    from .models import SegmentationJob
+
+    job = SegmentationJob.objects.create(kind=kind, params=params)
+    try:
+        future = _get_executor().submit(run_segmentation_job, str(job.pk))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool and retry once
+        _reset_executor()
+        future = _get_executor().submit(run_segmentation_job, str(job.pk))
+    future.add_done_callback(functools.partial(_fail_crashed_job, str(job.pk), threading.get_ident()))
+    return job
+
+
+def _fail_crashed_job(job_id, submitter, future):
+    # Runs in the parent when the worker returns or dies. run_segmentation_job
+    # records its own errors, so an exception here means the worker never got
+    # to (BrokenProcessPool after a kill, or a failure before the job started)
+    if future.cancelled():
+        error = 'Cancelled before it started.'
+    elif future.exception() is not None:
+        exc = future.exception()
+        error = f'{type(exc).__name__}: {exc}'
+    else:
+        return
+
+    from .models import SegmentationJob
+    try:
+        SegmentationJob.objects.filter(
+            pk=job_id, status__in=[SegmentationJob.STATUS_PENDING, SegmentationJob.STATUS_RUNNING]
+        ).update(status=SegmentationJob.STATUS_FAILED, error=error, finished_at=now())
+    finally:
+        # Usually called on the pool's management thread, which keeps no
+        # connection; a future already done when the callback was added runs
+        # it in the submitting request thread, whose connection stays open
+        if threading.get_ident() != submitter:
+            connection.close()
+
+
+def run_segmentation_job(job_id):
+    # Executed inside a worker process
+    from .models import SegmentationJob
+    from .pipelines import SegmentationError, run_db_segmentation, run_file_segmentation
+
+    close_old_connections()
+    job = SegmentationJob.objects.get(pk=job_id)
+    job.status = SegmentationJob.STATUS_RUNNING
+    job.started_at = now()
+    job.save(update_fields=['status', 'started_at'])
+
+    try:
+        if job.kind == SegmentationJob.KIND_FILE:
+            job.result = run_file_segmentation(**job.params)
+        else:
+            job.result = run_db_segmentation(**job.params)
+        job.status = SegmentationJob.STATUS_SUCCEEDED
+    except SegmentationError as e:
+        job.status = SegmentationJob.STATUS_FAILED
+        job.error = str(e)
+    except Exception as e:
+        job.status = SegmentationJob.STATUS_FAILED
+        job.error = f'{type(e).__name__}: {e}'
+
+    job.finished_at = now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    close_old_connections()
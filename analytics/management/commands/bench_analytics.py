@@ -0,0 +1,290 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from io import StringIO
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from analytics import urls as analytics_urls
+from analytics.columnar import columnar_dir, convert_csv_to_columnar
+from analytics.instrumentation import collect_metrics
+from analytics.management.commands.explain_analytics import QUERY_STRINGS
+from analytics.model_registry import DB_MODEL, EXTERNAL_MODEL, train_model
+from analytics.models import Customer, CustomerFeatures, Product
+from analytics.segmentation import REQUIRED_COLUMNS, extract_rfm_features
+
+
+# customers:products:purchases
+DEFAULT_SCALES = ['30:10:50', '2000:100:20000']
+# Seeded purchases end here rather than today, so runs on different days
+# benchmark the same data
+DEFAULT_END_DATE = '2026-01-01'
+# POST-only endpoints, and job details that need a run on the worker pool
+SKIPPED_ENDPOINTS = {'upload-csv', 'import-transactions', 'segmentation-jobs', 'segmentation-job-detail'}
+# Served under ASGI; requested through the async test client
+ASYNC_ENDPOINTS = {'async-basic-analytics', 'async-top-products', 'async-customer-segmentation'}
+# Products in the basket-recommendations request
+BASKET_SIZE = 3
+# A regression must also exceed this absolute p95 slowdown to count, so
+# sub-millisecond noise on fast endpoints does not fail the run
+MIN_LATENCY_DELTA_MS = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every analytics GET endpoint at several data scales (p50/p95 latency, SQL queries, '
+        'rows, peak memory) and compare against a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', dest='scales',
+                            help='customers:products:purchases to seed (repeatable); default: %s' % DEFAULT_SCALES)
+        parser.add_argument('--current-data', action='store_true',
+                            help='Benchmark the configured database as-is instead of seeding a test database')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='URL name to benchmark (repeatable); defaults to every GET endpoint')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--end-date', default=DEFAULT_END_DATE,
+                            help='Last day (exclusive) of the seeded purchases; default: %s' % DEFAULT_END_DATE)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare against results JSON written by an earlier run')
+        parser.add_argument('--max-latency-ratio', type=float, default=1.5,
+                            help='Fail when p95 exceeds the baseline p95 by this factor')
+        parser.add_argument('--max-extra-queries', type=int, default=0,
+                            help='Fail when an endpoint issues more queries than the baseline plus this')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+
+        names = options['endpoints'] or [
+            pattern.name for pattern in analytics_urls.urlpatterns
+            if pattern.name and pattern.name not in SKIPPED_ENDPOINTS
+        ]
+        scales = [] if options['current_data'] else [
+            self.parse_scale(value) for value in (options['scales'] or DEFAULT_SCALES)
+        ]
+
+        results = {
+            'generated_at': now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'scales': [],
+        }
+        with tempfile.TemporaryDirectory() as model_root, override_settings(
+            ALLOWED_HOSTS=['*'],
+            # Measure the computation, not the response cache
+            ANALYTICS_RESPONSE_CACHE={'ENABLED': False},
+            # Keep models trained on benchmark data out of the real registry
+            SEGMENTATION_MODEL_ROOT=model_root,
+        ):
+            if options['current_data']:
+                results['scales'].append(self.run_scale('current', names, options))
+            else:
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    for customers, products, purchases in scales:
+                        label = f'{customers}:{products}:{purchases}'
+                        self.stdout.write(f"🌱 Seeding {label}...")
+                        call_command('seed_data', customers=customers, products=products, purchases=purchases,
+                                     seed=options['seed'], end_date=options['end_date'], stdout=StringIO())
+                        results['scales'].append(self.run_scale(label, names, options))
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.print_report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"📝 Results written to {options['output']}")
+
+        if options['baseline']:
+            failures = self.compare(results, options)
+            if failures:
+                for failure in failures:
+                    self.stdout.write(self.style.ERROR(f"❌ {failure}"))
+                raise CommandError(f'{len(failures)} benchmark regression(s) against {options["baseline"]}.')
+            self.stdout.write(self.style.SUCCESS("✅ No regressions against the baseline."))
+
+    @staticmethod
+    def parse_scale(value):
+        try:
+            customers, products, purchases = (int(part) for part in value.split(':'))
+        except ValueError:
+            raise CommandError(f'Invalid --scale "{value}". Use customers:products:purchases, e.g. 2000:100:20000.')
+        if min(customers, products, purchases) < 1:
+            raise CommandError(f'Invalid --scale "{value}": counts must be at least 1.')
+        return customers, products, purchases
+
+    def run_scale(self, label, names, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Scale {label}"))
+        upload = self.prepare_models()
+        try:
+            paths = self.endpoint_paths(names, upload)
+            endpoints = {}
+            for name in names:
+                if paths[name] is None:
+                    self.stdout.write(self.style.WARNING(f"   {name}: skipped, no data to build the request from"))
+                    continue
+                endpoints[name] = self.run_endpoint(name, paths[name], options)
+        finally:
+            os.remove(upload)
+            shutil.rmtree(columnar_dir(upload), ignore_errors=True)
+        return {'scale': label, 'endpoints': endpoints}
+
+    def prepare_models(self):
+        """
+        Train the segmentation models the GETs predict with (request paths
+        never train) and write the seeded features as an upload for the
+        external segmentation endpoint. Returns the upload's path.
+        """
+        features = extract_rfm_features()
+        if len(features):
+            train_model(DB_MODEL, features)
+
+        # The endpoint resolves ?file= under ./media, like the upload view
+        media_root = os.path.join(os.getcwd(), 'media')
+        os.makedirs(media_root, exist_ok=True)
+        upload = os.path.join(media_root, f'bench-{uuid.uuid4().hex}.csv')
+        features[REQUIRED_COLUMNS].to_csv(upload, index=False)
+        if len(features):
+            convert_csv_to_columnar(upload)
+            train_model(EXTERNAL_MODEL, features)
+        return upload
+
+    def endpoint_paths(self, names, upload):
+        # Ids taken from the data under test: the best-selling products and a
+        # customer with features, so the lookups exercise real neighbours
+        top_products = list(Product.objects.order_by('-units_sold', 'id').values_list('id', flat=True)[:BASKET_SIZE])
+        customer_id = (CustomerFeatures.objects.order_by('customer_id').values_list('customer_id', flat=True).first()
+                       or Customer.objects.order_by('id').values_list('id', flat=True).first())
+
+        paths = {}
+        for name in names:
+            if name == 'similar-customers':
+                path = customer_id and reverse(name, kwargs={'customer_id': customer_id})
+            elif name == 'product-recommendations':
+                path = top_products and reverse(name, kwargs={'product_id': top_products[0]})
+            elif name == 'basket-recommendations':
+                path = top_products and f"{reverse(name)}?products={','.join(map(str, top_products))}"
+            elif name == 'external-customer-segmentation':
+                # The warm-up run segments the file; timed repeats are served
+                # from the segmentation result cache, as repeat uploads are
+                path = f'{reverse(name)}?file={os.path.basename(upload)}'
+            else:
+                path = reverse(name)
+                if name in QUERY_STRINGS:
+                    path = f'{path}?{QUERY_STRINGS[name]}'
+            paths[name] = path or None
+        return paths
+
+    def run_endpoint(self, name, path, options):
+        request = self.request_async if name in ASYNC_ENDPOINTS else self.request
+
+        # Warm-up request (index builds, connection setup) doubles as the
+        # measured run for queries, rows and memory; tracemalloc would
+        # distort the timings, so those runs are separate. Queries are
+        # counted per context, so async views' executor threads are included
+        tracemalloc.start()
+        with collect_metrics() as metrics:
+            status, body, streaming = request(path)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            request(path)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return {
+            'path': path,
+            'status': status,
+            'p50_ms': round(float(np.percentile(timings, 50)), 3),
+            'p95_ms': round(float(np.percentile(timings, 95)), 3),
+            'queries': metrics.queries,
+            'rows': self.count_rows(body, streaming),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
+
+    @staticmethod
+    def request(path):
+        response = Client().get(path)
+        if response.streaming:
+            return response.status_code, b''.join(response.streaming_content), True
+        return response.status_code, response.content, False
+
+    @staticmethod
+    def request_async(path):
+        # Through the ASGI handler, as the async views are served in production
+        response = async_to_sync(AsyncClient().get)(path)
+        return response.status_code, response.content, False
+
+    @staticmethod
+    def count_rows(body, streaming):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            # NDJSON / CSV streams: one row per line (CSV header excluded)
+            lines = [line for line in body.splitlines() if line.strip()]
+            return max(len(lines) - (0 if lines[:1] and lines[0].startswith(b'{') else 1), 0)
+
+        if isinstance(data, list):
+            return len(data)
+        if isinstance(data, dict):
+            # Largest top-level list, e.g. 'results', 'top_products', 'preview'
+            lists = [len(value) for value in data.values() if isinstance(value, list)]
+            return max(lists) if lists else 1
+        return 1
+
+    def print_report(self, results):
+        for scale in results['scales']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Results for {scale['scale']}"))
+            self.stdout.write(f"  {'endpoint':<34}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}"
+                              f"{'queries':>9}{'rows':>8}{'peak KB':>11}")
+            for name, entry in scale['endpoints'].items():
+                self.stdout.write(
+                    f"  {name:<34}{entry['status']:>7}{entry['p50_ms']:>10.1f}{entry['p95_ms']:>10.1f}"
+                    f"{entry['queries']:>9}{entry['rows']:>8}{entry['peak_memory_kb']:>11.1f}"
+                )
+
+    def compare(self, results, options):
+        try:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read baseline: {e}')
+
+        previous = {
+            (scale['scale'], name): entry
+            for scale in baseline.get('scales', [])
+            for name, entry in scale['endpoints'].items()
+        }
+        failures = []
+        for scale in results['scales']:
+            for name, entry in scale['endpoints'].items():
+                before = previous.get((scale['scale'], name))
+                if before is None:
+                    continue
+                label = f"{scale['scale']} {name}"
+                if entry['queries'] > before['queries'] + options['max_extra_queries']:
+                    failures.append(f"{label}: {entry['queries']} queries (baseline {before['queries']})")
+                if (entry['p95_ms'] > before['p95_ms'] * options['max_latency_ratio']
+                        and entry['p95_ms'] - before['p95_ms'] > MIN_LATENCY_DELTA_MS):
+                    failures.append(f"{label}: p95 {entry['p95_ms']:.1f}ms (baseline {before['p95_ms']:.1f}ms)")
+                if entry['status'] != before['status']:
+                    failures.append(f"{label}: status {entry['status']} (baseline {before['status']})")
+        return failures
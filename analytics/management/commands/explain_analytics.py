@@ -0,0 +1,168 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from analytics import urls as analytics_urls
+
+
+# GET endpoints that need arguments or uploads are skipped
+SKIPPED_ENDPOINTS = {'upload-csv', 'import-transactions', 'external-customer-segmentation', 'segmentation-job-detail', 'segmentation-jobs'}
+# Same queries as their sync views, but run on executor threads this command cannot capture
+SKIPPED_ENDPOINTS |= {'async-basic-analytics', 'async-top-products', 'async-customer-segmentation'}
+# Need a customer / product id in the path or query string
+SKIPPED_ENDPOINTS |= {'similar-customers', 'product-recommendations', 'basket-recommendations'}
+SQLITE_PLAN_RE = re.compile(r'^(SCAN|SEARCH) (\S+)(?: AS \S+)?(?: USING (.*))?$')
+SQLITE_INDEX_RE = re.compile(r'INDEX (\S+)')
+# A trailing LIMIT on the statement itself (Django inlines the number)
+SQL_LIMIT_RE = re.compile(r'\bLIMIT (\d+)(?: OFFSET \d+)?\s*$', re.IGNORECASE)
+# Anything that makes SQLite read every row before the LIMIT applies
+SQL_UNBOUNDED_RE = re.compile(r'\b(WHERE|GROUP BY|DISTINCT|COUNT|SUM|AVG|MIN|MAX)\b', re.IGNORECASE)
+# Table endpoints are analyzed on their paginated path rather than loading whole tables
+QUERY_STRINGS = {
+    'customer-list': 'limit=100',
+    'product-list': 'limit=100',
+    'purchase-list': 'limit=100',
+    'purchase-item-list': 'limit=100',
+}
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the SQL issued by each analytics endpoint and report index usage and scanned rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='URL name to analyze (repeatable); defaults to every GET endpoint')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        names = options['endpoints'] or [
+            pattern.name for pattern in analytics_urls.urlpatterns
+            if pattern.name and pattern.name not in SKIPPED_ENDPOINTS
+        ]
+
+        report = []
+        for name in names:
+            path = reverse(name)
+            if name in QUERY_STRINGS:
+                path = f'{path}?{QUERY_STRINGS[name]}'
+            queries = self.capture_queries(path)
+            report.append({
+                'endpoint': name,
+                'queries': [self.explain(sql, params) for sql, params in queries],
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+            return
+
+        for entry in report:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{entry['endpoint']} ({len(entry['queries'])} queries)"))
+            for index, plan in enumerate(entry['queries'], start=1):
+                if plan['full_scans']:
+                    status = self.style.ERROR('FULL SCAN')
+                elif plan.get('bounded_scans'):
+                    status = self.style.SUCCESS('bounded scan')
+                else:
+                    status = self.style.SUCCESS('indexed')
+                rows = plan['estimated_rows'] if plan['estimated_rows'] is not None else '?'
+                indexes = ', '.join(dict.fromkeys(plan['indexes'])) or '-'
+                self.stdout.write(f"  #{index} {status}  rows~{rows}  indexes: {indexes}")
+                for table in plan['full_scans']:
+                    self.stdout.write(f"      full scan on {table}")
+                for table in plan.get('bounded_scans', []):
+                    self.stdout.write(f"      primary-key order scan on {table}, stops after {rows} rows")
+
+    def capture_queries(self, path):
+        captured = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                captured.append((sql, params))
+            return execute(sql, params, many, context)
+
+        # Bypass the response cache so every run really issues the queries
+        no_cache = override_settings(ALLOWED_HOSTS=['*'], ANALYTICS_RESPONSE_CACHE={'ENABLED': False})
+        with no_cache, connection.execute_wrapper(record):
+            response = Client().get(path)
+            if response.streaming:
+                # The first chunk runs the first batch; later batches share its plan
+                next(iter(response.streaming_content), None)
+                response.close()
+        return captured
+
+    def explain(self, sql, params):
+        vendor = connection.vendor
+        with connection.cursor() as cursor:
+            if vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return self.parse_sqlite(cursor.fetchall(), sql)
+            if vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                return self.parse_postgresql(cursor.fetchone()[0], sql)
+
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [col[0] for col in cursor.description]
+            return self.parse_mysql([dict(zip(columns, row)) for row in cursor.fetchall()], sql)
+
+    @staticmethod
+    def parse_sqlite(rows, sql):
+        # SQLite reports a bare "SCAN <table>" for table scans and
+        # "SEARCH|SCAN <table> USING [COVERING] INDEX <name>" / "INTEGER PRIMARY KEY" otherwise.
+        # A bare scan of the outermost table is walked in rowid order, so with a
+        # LIMIT, no temp b-tree sort and nothing that consumes every row first
+        # (filters, grouping, aggregates) it stops after LIMIT rows
+        limit = SQL_LIMIT_RE.search(sql)
+        bounded = (
+            limit is not None
+            and not SQL_UNBOUNDED_RE.search(sql)
+            and not any('USE TEMP B-TREE' in row[-1] for row in rows)
+        )
+        full_scans, bounded_scans, indexes = [], [], []
+        for position, row in enumerate(rows):
+            detail = row[-1]
+            match = SQLITE_PLAN_RE.match(detail)
+            if not match:
+                continue
+            op, table, using = match.groups()
+            if using:
+                index = SQLITE_INDEX_RE.search(using)
+                indexes.append(index.group(1) if index else 'PRIMARY')
+            elif op == 'SCAN':
+                if bounded and position == 0 and row[1] == 0:
+                    bounded_scans.append(table)
+                else:
+                    full_scans.append(table)
+        estimated = int(limit.group(1)) if bounded_scans else None
+        return {'sql': sql, 'full_scans': full_scans, 'bounded_scans': bounded_scans, 'indexes': indexes,
+                'estimated_rows': estimated, 'plan': [row[-1] for row in rows]}
+
+    @staticmethod
+    def parse_mysql(rows, sql):
+        # type=ALL means a full table scan; `rows` is the optimizer's estimate per table
+        full_scans = [row['table'] for row in rows if row.get('type') == 'ALL']
+        indexes = [row['key'] for row in rows if row.get('key')]
+        estimated = sum(int(row['rows'] or 0) for row in rows) if rows else None
+        return {'sql': sql, 'full_scans': full_scans, 'indexes': indexes, 'estimated_rows': estimated,
+                'plan': rows}
+
+    @staticmethod
+    def parse_postgresql(plan, sql):
+        full_scans, indexes = [], []
+
+        def walk(node):
+            if node.get('Node Type') == 'Seq Scan':
+                full_scans.append(node.get('Relation Name'))
+            if node.get('Index Name'):
+                indexes.append(node['Index Name'])
+            for child in node.get('Plans', []):
+                walk(child)
+
+        root = plan[0]['Plan']
+        walk(root)
+        return {'sql': sql, 'full_scans': full_scans, 'indexes': indexes, 'estimated_rows': root.get('Plan Rows'),
+                'plan': plan}
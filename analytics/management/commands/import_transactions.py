@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.columnar import SchemaError
+from analytics.importer import IMPORT_BATCH_SIZE, IMPORT_CHUNK_SIZE, import_transactions_csv
+
+
+class Command(BaseCommand):
+    help = 'Import a transactional CSV (one row per order line) with upserts on external ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Path to the CSV file')
+        parser.add_argument('--report', help='Where to write rejected rows (default: <file>.rejected.csv)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='CSV rows per transaction')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"📥 Importing {options['file']}...")
+        try:
+            summary = import_transactions_csv(
+                options['file'],
+                report_path=options['report'],
+                chunk_size=options['chunk_size'],
+                batch_size=options['batch_size'],
+            )
+        except (SchemaError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {summary['imported_rows']} of {summary['rows']} rows: {summary['orders']} orders, "
+            f"{summary['items']} items, {summary['customers']} customers, {summary['products']} products "
+            f"in {summary['seconds']}s."
+        ))
+        if summary['rejected_rows']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {summary['rejected_rows']} rows rejected, see {summary['rejected_report']}"
+            ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics.features import REBUILD_BATCH_SIZE, rebuild_feature_store
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-customer feature store from the purchase history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help='Rows inserted per bulk_create batch')
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding customer feature store...")
+        customers, categories = rebuild_feature_store(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Feature store rebuilt: {customers} customers, {categories} category rows."
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from analytics.product_counters import RECONCILE_BATCH_SIZE, reconcile_product_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product.units_sold/revenue from purchase items and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='products',
+                            help='Product id to reconcile (repeatable); defaults to every product')
+        parser.add_argument('--batch-size', type=int, default=RECONCILE_BATCH_SIZE,
+                            help='Products recounted per query')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing it back')
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Reconciling product sales counters...")
+        drifted = reconcile_product_counters(
+            options['products'], batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        for product_id, units, revenue, actual_units, actual_revenue in drifted[:20]:
+            self.stdout.write(
+                f"   product {product_id}: units {units} -> {actual_units}, revenue {revenue} -> {actual_revenue}"
+            )
+        if len(drifted) > 20:
+            self.stdout.write(f"   ... and {len(drifted) - 20} more")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("✅ All product counters match the purchase items."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"⚠️ {len(drifted)} products drifted (dry run, nothing written)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Repaired {len(drifted)} drifted products."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from analytics.features import REBUILD_BATCH_SIZE
+from analytics.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Fold new purchase items into the "bought together" co-purchase index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recount every purchase (needed after edits or deletes)')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Items read per query')
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Refreshing co-purchase index...")
+        summary = refresh_recommendations(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Co-purchase index refreshed ({summary['mode']}): {summary['items']} items counted, "
+            f"{summary['products']} products, {summary['pairs']} product pairs."
+        ))
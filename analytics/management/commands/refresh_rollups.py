@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from analytics.features import REBUILD_BATCH_SIZE
+from analytics.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily sales rollups for days changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every day from scratch')
+        parser.add_argument('--since', help='Recompute every day from this date (YYYY-MM-DD) onwards')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a YYYY-MM-DD date.')
+
+        self.stdout.write("📊 Refreshing daily rollups...")
+        summary = refresh_rollups(full=options['full'], since=since, batch_size=options['batch_size'])
+        days = 'all' if summary['days'] is None else summary['days']
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rollups refreshed ({summary['mode']}): {days} days, {summary['rows']} rows written."
+        ))
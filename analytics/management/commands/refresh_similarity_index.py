@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from analytics.features import REBUILD_BATCH_SIZE
+from analytics.similarity import refresh_similarity_index
+
+
+class Command(BaseCommand):
+    help = 'Re-embed customers whose features changed in the similar-customers vector index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild the index (rescales every feature)')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Customers read per query')
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Refreshing similarity index...")
+        summary = refresh_similarity_index(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Similarity index refreshed ({summary['mode']}): {summary['customers']} customers embedded, "
+            f"{summary['dimensions']} dimensions."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from analytics.approx import refresh_sketches
+from analytics.features import REBUILD_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Fold new purchases into the sales sketches behind approx=true queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild from scratch (needed after edits or deletes of existing rows)')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Rows read per query')
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Refreshing sales sketches...")
+        summary = refresh_sketches(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Sketches refreshed ({summary['mode']}): {summary['purchases']} purchases, "
+            f"{summary['items']} items folded in, {summary['bytes'] / 1024:.0f} KB stored."
+        ))
@@ -1,84 +1,94 @@
-from django.core.management.base import BaseCommand
-from analytics.models import Customer, Product, Purchase, PurchaseItem
-from faker import Faker
 import random
-from datetime import timedelta
-from django.utils import timezone
-from decimal import Decimal
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import localdate
+
+from analytics.datagen import (
+    clear_data, create_customers, create_products, create_purchases, reset_sequences
+)
+from analytics.approx import refresh_sketches
+from analytics.features import rebuild_feature_store
+from analytics.similarity import build_similarity_index
+from analytics.recommendations import build_recommendations
+from analytics.product_counters import reconcile_product_counters
+from analytics.response_cache import bump_data_version
+from analytics.rollups import refresh_rollups
+
 
 class Command(BaseCommand):
     help = 'Seed the database with realistic test data'
 
-    def handle(self, *args, **kwargs):
-        fake = Faker()
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=30)
+        parser.add_argument('--products', type=int, default=10)
+        parser.add_argument('--purchases', type=int, default=50)
+        parser.add_argument('--days', type=int, default=90, help='Spread purchases over this many past days')
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible data (default: random)')
+        parser.add_argument('--end-date', help='Purchases fall on the --days days before this YYYY-MM-DD date '
+                                               '(default: today); pass it with --seed to reproduce a dataset')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert / transaction')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes generating purchase batches in parallel (not for SQLite)')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Do not rebuild the feature store and the tables, counters, sketches and index derived from it')
+
+    def handle(self, *args, **options):
+        for name in ('customers', 'products', 'purchases', 'days', 'batch_size', 'workers'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1.")
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING("⚠️ SQLite allows a single writer; using 1 worker."))
+            workers = 1
+
+        try:
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else localdate()
+        except ValueError:
+            raise CommandError('--end-date must be a YYYY-MM-DD date.')
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
         self.stdout.write("🧹 Clearing existing data...")
-        PurchaseItem.objects.all().delete()
-        Purchase.objects.all().delete()
-        Product.objects.all().delete()
-        Customer.objects.all().delete()
-
-        self.stdout.write("👥 Creating customers...")
-        customers = []
-        for _ in range(30):
-            gender = random.choice(['Male', 'Female'])
-            age = random.randint(18, 65)
-            name = fake.name_male() if gender == 'Male' else fake.name_female()
-            location = fake.city()
-            customer = Customer.objects.create(
-                name=name,
-                gender=gender,
-                age=age,
-                location=location
-            )
-            customers.append(customer)
-
-        self.stdout.write("📦 Creating products...")
-        categories = ['Clothing', 'Footwear', 'Accessories']
-        products = []
-        for _ in range(10):
-            base_price = Decimal(random.randint(20, 200))
-            markup = Decimal(random.uniform(1.1, 1.5))  # 10% to 50% markup
-            final_price = (base_price * markup).quantize(Decimal('0.01'))
-            product = Product.objects.create(
-                name=fake.word().capitalize() + ' ' + random.choice(['Delux', 'Pro', 'Lux', 'Devine', 'Aes', 'X']),
-                category=random.choice(categories),
-                base_price=base_price,
-                price=final_price,
-                stock_quantity=random.randint(20, 100)
-            )
-            products.append(product)
-
-        self.stdout.write("🧾 Creating purchases and items...")
-        for _ in range(50):
-            customer = random.choice(customers)
-            purchase_date = timezone.now() - timedelta(days=random.randint(1, 90))
-            discount_applied = random.choice([True, False])
-
-            purchase = Purchase.objects.create(
-                customer=customer,
-                purchase_date=purchase_date,
-                total_amount=Decimal('0.00'),  # will be updated
-                discount_applied=discount_applied
-            )
-
-            num_items = random.randint(1, 4)
-            total = Decimal('0.00')
-            for _ in range(num_items):
-                product = random.choice(products)
-                quantity = random.randint(1, 3)
-                price = product.price
-                subtotal = (price * quantity).quantize(Decimal('0.01'))
-
-                PurchaseItem.objects.create(
-                    purchase=purchase,
-                    product=product,
-                    quantity=quantity,
-                    price_at_purchase=price
-                )
-
-                total += subtotal
-
-            purchase.total_amount = total
-            purchase.save()
-
-        self.stdout.write(self.style.SUCCESS("✅ Database seeding completed successfully."))
+        clear_data()
+
+        self.stdout.write(f"👥 Creating {options['customers']} customers...")
+        create_customers(options['customers'], seed, batch_size)
+
+        self.stdout.write(f"📦 Creating {options['products']} products...")
+        create_products(options['products'], seed, batch_size)
+
+        self.stdout.write(f"🧾 Creating {options['purchases']} purchases and items...")
+        report_every = max(options['purchases'] // 10, batch_size)
+
+        def progress(purchases, items):
+            if purchases % report_every < batch_size or purchases == options['purchases']:
+                self.stdout.write(f"   {purchases} purchases, {items} items")
+
+        purchases, items = create_purchases(
+            options['purchases'], options['customers'], options['products'], seed,
+            days=options['days'], batch_size=batch_size, workers=workers, progress=progress, end_date=end_date,
+        )
+        reset_sequences()
+
+        # bulk_create skips the signals that keep derived tables current
+        if not options['skip_derived']:
+            self.stdout.write("🧮 Rebuilding feature store, rollups, sales counters, sketches, similarity and co-purchase indexes...")
+            rebuild_feature_store(batch_size=batch_size)
+            refresh_rollups(full=True, batch_size=batch_size)
+            reconcile_product_counters(batch_size=batch_size)
+            refresh_sketches(full=True, batch_size=batch_size)
+            build_similarity_index(batch_size=batch_size)
+            build_recommendations(batch_size=batch_size)
+
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Database seeding completed successfully (seed {seed}, end date {end_date}): "
+            f"{options['customers']} customers, {options['products']} products, {purchases} purchases, {items} items "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
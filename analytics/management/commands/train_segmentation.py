@@ -0,0 +1,50 @@
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.model_registry import DB_MODEL, DEFAULT_CLUSTERS, train_model, train_model_streaming
+from analytics.pipelines import STREAM_CHUNK_SIZE
+from analytics.segmentation import FEATURE_DTYPES, REQUIRED_COLUMNS, extract_rfm_features
+
+
+class Command(BaseCommand):
+    help = 'Train and save a new version of a customer segmentation model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=DB_MODEL, help='Registry name of the model to train')
+        parser.add_argument('--file', help='Train from a CSV file instead of the database features')
+        parser.add_argument('--clusters', type=int, default=DEFAULT_CLUSTERS)
+        parser.add_argument('--stream', action='store_true',
+                            help='Train from --file in chunks with mini-batch KMeans (bounded memory)')
+
+    def handle(self, *args, **options):
+        if options['stream']:
+            if not options['file']:
+                raise CommandError('--stream requires --file.')
+            self.stdout.write(f"🧠 Streaming training of '{options['model']}' from {options['file']}...")
+            try:
+                _, metadata = train_model_streaming(
+                    options['model'],
+                    lambda: pd.read_csv(options['file'], usecols=REQUIRED_COLUMNS, dtype=FEATURE_DTYPES,
+                                        chunksize=STREAM_CHUNK_SIZE),
+                    n_clusters=options['clusters'],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"✅ Saved model version {metadata['version']}."))
+            return
+
+        if options['file']:
+            df = pd.read_csv(options['file'], usecols=REQUIRED_COLUMNS)
+        else:
+            df = extract_rfm_features()
+
+        if df.empty:
+            raise CommandError('No training data available.')
+
+        self.stdout.write(f"🧠 Training '{options['model']}' on {len(df)} customers...")
+        try:
+            _, metadata = train_model(options['model'], df, n_clusters=options['clusters'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Saved model version {metadata['version']}."))
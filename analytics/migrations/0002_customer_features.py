@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:04
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+BATCH_SIZE = 5000
+
+
+def fill_feature_store(apps, schema_editor):
+    # Same two grouped aggregates as analytics.features.rebuild_feature_store()
+    Purchase = apps.get_model('analytics', 'Purchase')
+    PurchaseItem = apps.get_model('analytics', 'PurchaseItem')
+    CustomerFeatures = apps.get_model('analytics', 'CustomerFeatures')
+    CustomerCategoryFeature = apps.get_model('analytics', 'CustomerCategoryFeature')
+
+    customer_rows = (
+        Purchase.objects.values('customer_id')
+        .annotate(total_spend=Sum('total_amount'), purchase_count=Count('id'), last_purchase_date=Max('purchase_date'))
+        .order_by('customer_id')
+    )
+    category_rows = (
+        PurchaseItem.objects.values('purchase__customer_id', 'product__category')
+        .annotate(quantity=Sum('quantity'))
+        .order_by('purchase__customer_id')
+    )
+    _insert(CustomerFeatures, (
+        CustomerFeatures(customer_id=row['customer_id'], total_spend=row['total_spend'] or 0,
+                         purchase_count=row['purchase_count'], last_purchase_date=row['last_purchase_date'])
+        for row in customer_rows.iterator(chunk_size=BATCH_SIZE)
+    ))
+    _insert(CustomerCategoryFeature, (
+        CustomerCategoryFeature(customer_id=row['purchase__customer_id'], category=row['product__category'],
+                                quantity=row['quantity'])
+        for row in category_rows.iterator(chunk_size=BATCH_SIZE)
+    ))
+
+
+def _insert(model, objects):
+    while batch := list(islice(objects, BATCH_SIZE)):
+        model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerFeatures',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to='analytics.customer')),
+                ('total_spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('purchase_count', models.IntegerField(default=0)),
+                ('last_purchase_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_purchase_date'], name='custfeat_last_purchase_idx'), models.Index(fields=['total_spend'], name='custfeat_total_spend_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerCategoryFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_features', to='analytics.customer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('customer', 'category'), name='uniq_customer_category_feature')],
+            },
+        ),
+        migrations.RunPython(fill_feature_store, migrations.RunPython.noop),
+    ]
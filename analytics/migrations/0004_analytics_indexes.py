@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_segmentationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['age', 'gender'], name='customer_age_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['gender'], name='customer_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at', 'id'], name='customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category'], name='product_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['purchase_date', 'id'], name='purchase_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['customer', 'purchase_date', 'total_amount'], name='purchase_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['discount_applied', 'purchase_date'], name='purchase_discount_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseitem',
+            index=models.Index(fields=['product', 'quantity', 'price_at_purchase'], name='item_product_qty_price_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:04
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_sales_counters(apps, schema_editor):
+    # One UPDATE with correlated sums; the reconcile_product_counters command does the same in batches
+    Product = apps.get_model('analytics', 'Product')
+    PurchaseItem = apps.get_model('analytics', 'PurchaseItem')
+    money = DecimalField(max_digits=14, decimal_places=2)
+
+    items = PurchaseItem.objects.filter(product=OuterRef('pk')).values('product')
+    units = items.annotate(total=Sum('quantity')).values('total')
+    revenue = items.annotate(total=Sum(F('quantity') * F('price_at_purchase'), output_field=money)).values('total')
+    Product.objects.update(
+        units_sold=Coalesce(Subquery(units), Value(0)),
+        revenue=Coalesce(Subquery(revenue, output_field=money), Value(0), output_field=money),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_external_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='units_sold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-units_sold', 'id'], name='product_units_sold_idx'),
+        ),
+        migrations.RunPython(fill_sales_counters, migrations.RunPython.noop),
+    ]
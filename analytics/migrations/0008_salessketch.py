@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_product_sales_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('data', models.BinaryField(default=b'')),
+                ('last_purchase_id', models.BigIntegerField(default=0)),
+                ('last_item_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
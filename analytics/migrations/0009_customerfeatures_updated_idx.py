@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_salessketch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerfeatures',
+            index=models.Index(fields=['updated_at'], name='custfeat_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import threading
+import uuid
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.utils.timezone import now
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .response_cache import bump_data_version
+from .segmentation import FEATURE_COLUMNS
+
+
+# Models trained from the database features and from uploaded CSVs
+DB_MODEL = 'customer-db'
+EXTERNAL_MODEL = 'external'
+
+DEFAULT_CLUSTERS = 3
+# Older model files kept on disk per model name after a retrain
+KEEP_VERSIONS = 5
+
+MODEL_NAME_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class ModelNotTrained(Exception):
+    pass
+
+
+def model_root():
+    return getattr(settings, 'SEGMENTATION_MODEL_ROOT', os.path.join(settings.BASE_DIR, 'ml_models'))
+
+
+def _model_dir(name):
+    if not MODEL_NAME_RE.match(name or ''):
+        raise ValueError(f'Invalid model name "{name}".')
+    return os.path.join(model_root(), name)
+
+
+def _pointer_path(name):
+    return os.path.join(_model_dir(name), 'latest.json')
+
+
+def train_model(name, df, n_clusters=DEFAULT_CLUSTERS):
+    """
+    Fit a scaler + KMeans pipeline on the feature frame, persist it with
+    joblib as a new version and make it the active model for `name`.
+    """
+    if len(df) < n_clusters:
+        raise ValueError(f'Need at least {n_clusters} rows to train a model, got {len(df)}.')
+
+    pipeline = make_pipeline(StandardScaler(), KMeans(n_clusters=n_clusters, random_state=42))
+    pipeline.fit(df[FEATURE_COLUMNS].to_numpy(dtype='float64'))
+    return save_model(name, pipeline, n_samples=len(df), n_clusters=n_clusters)
+
+
+def train_model_streaming(name, chunks, n_clusters=DEFAULT_CLUSTERS):
+    """
+    Fit the same scaler + clusterer pipeline incrementally, with memory bounded
+    by one chunk. `chunks` is a callable returning a fresh iterator of feature
+    frames; it is consumed twice (scaler statistics, then mini-batch KMeans).
+    """
+    scaler = StandardScaler()
+    n_samples = 0
+    for chunk in chunks():
+        if len(chunk):
+            scaler.partial_fit(chunk[FEATURE_COLUMNS].to_numpy(dtype='float64'))
+            n_samples += len(chunk)
+
+    if n_samples < n_clusters:
+        raise ValueError(f'Need at least {n_clusters} rows to train a model, got {n_samples}.')
+
+    clusterer = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3)
+    pending = None
+    for chunk in chunks():
+        X = scaler.transform(chunk[FEATURE_COLUMNS].to_numpy(dtype='float64'))
+        if pending is not None:
+            X = np.vstack([pending, X])
+            pending = None
+        # The first partial_fit needs at least n_clusters rows; carry tiny chunks forward
+        if not hasattr(clusterer, 'cluster_centers_') and len(X) < n_clusters:
+            pending = X
+            continue
+        if len(X):
+            clusterer.partial_fit(X)
+    if pending is not None:
+        clusterer.partial_fit(pending)
+
+    pipeline = make_pipeline(scaler, clusterer)
+    return save_model(name, pipeline, n_samples=n_samples, n_clusters=n_clusters)
+
+
+def save_model(name, pipeline, n_samples, n_clusters):
+    """Persist a fitted pipeline as a new version and make it the active model."""
+    trained_at = now()
+    version = f"{trained_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    metadata = {
+        'name': name,
+        'version': version,
+        'trained_at': trained_at.isoformat(),
+        'n_samples': int(n_samples),
+        'n_clusters': n_clusters,
+        'features': FEATURE_COLUMNS,
+    }
+
+    model_dir = _model_dir(name)
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump({'pipeline': pipeline, 'metadata': metadata}, os.path.join(model_dir, f'{version}.joblib'))
+
+    # Swap the pointer atomically so concurrent readers never see a partial file
+    tmp_pointer = f'{_pointer_path(name)}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_pointer, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(tmp_pointer, _pointer_path(name))
+
+    _prune_versions(name, keep=KEEP_VERSIONS)
+
+    with _cache_lock:
+        _cache[name] = (version, pipeline, metadata)
+    # Cached segmentation responses were produced by the previous version
+    bump_data_version()
+    return pipeline, metadata
+
+
+def load_model(name):
+    """
+    Return (pipeline, metadata) for the active version of `name`. The model is
+    read from disk once per version and then served from memory.
+    """
+    try:
+        with open(_pointer_path(name)) as f:
+            version = json.load(f)['version']
+    except FileNotFoundError:
+        raise ModelNotTrained(f'No trained model named "{name}".')
+
+    with _cache_lock:
+        cached = _cache.get(name)
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+
+    saved = joblib.load(os.path.join(_model_dir(name), f'{version}.joblib'))
+    with _cache_lock:
+        _cache[name] = (version, saved['pipeline'], saved['metadata'])
+    return saved['pipeline'], saved['metadata']
+
+
+def predict_segments(pipeline, df):
+    return pipeline.predict(df[FEATURE_COLUMNS].to_numpy(dtype='float64'))
+
+
+def list_models():
+    models = []
+    root = model_root()
+    if not os.path.isdir(root):
+        return models
+
+    for name in sorted(os.listdir(root)):
+        try:
+            with open(_pointer_path(name)) as f:
+                active = json.load(f)
+        except FileNotFoundError:
+            continue
+        models.append({'name': name, 'active': active, 'versions': _versions(name)})
+    return models
+
+
+def _versions(name):
+    # Newest first by file time: version names made in the same second only
+    # differ by a random suffix, so they do not sort chronologically
+    model_dir = _model_dir(name)
+    files = [fname for fname in os.listdir(model_dir) if fname.endswith('.joblib')]
+    files.sort(key=lambda fname: (os.stat(os.path.join(model_dir, fname)).st_mtime_ns, fname), reverse=True)
+    return [fname[:-len('.joblib')] for fname in files]
+
+
+def _prune_versions(name, keep):
+    model_dir = _model_dir(name)
+    try:
+        with open(_pointer_path(name)) as f:
+            active = json.load(f)['version']
+    except FileNotFoundError:
+        active = None
+    # The version the pointer names is never removed, whatever its age
+    stale = [version for version in _versions(name) if version != active][max(keep - 1, 0):]
+    for version in stale:
+        os.remove(os.path.join(model_dir, f'{version}.joblib'))
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 class Customer(models.Model):
@@ -6,6 +8,17 @@ class Customer(models.Model):
     age = models.IntegerField(blank=True, null=True)
     location = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Id in the source system, the upsert key for CSV imports
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Demographic buckets (category preferences, discount usage)
+            models.Index(fields=['age', 'gender'], name='customer_age_gender_idx'),
+            models.Index(fields=['gender'], name='customer_gender_idx'),
+            # Keyset pagination on ?order=date
+            models.Index(fields=['created_at', 'id'], name='customer_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name or 'Customer'} ({self.id})"
@@ -17,6 +30,17 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     stock_quantity = models.IntegerField()
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # All-time sales, maintained at write time (see analytics/product_counters.py)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category'], name='product_category_idx'),
+            # Unwindowed top-products ranking
+            models.Index(fields=['-units_sold', 'id'], name='product_units_sold_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -27,6 +51,16 @@ class Purchase(models.Model):
     purchase_date = models.DateTimeField()
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     discount_applied = models.BooleanField(default=False)
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Date-range filters, exports and keyset pagination on ?order=date
+            models.Index(fields=['purchase_date', 'id'], name='purchase_date_idx'),
+            # Covers per-customer Sum/Count/Max (RFM features, top customers)
+            models.Index(fields=['customer', 'purchase_date', 'total_amount'], name='purchase_customer_date_idx'),
+            models.Index(fields=['discount_applied', 'purchase_date'], name='purchase_discount_date_idx'),
+        ]
 
     def __str__(self):
         return f"Purchase {self.id} by Customer {self.customer_id}"
@@ -38,5 +72,166 @@ class PurchaseItem(models.Model):
     quantity = models.IntegerField()
     price_at_purchase = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Covers per-product quantity/revenue aggregation (top products, categories)
+            models.Index(fields=['product', 'quantity', 'price_at_purchase'], name='item_product_qty_price_idx'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name} (Purchase {self.purchase_id})"
+
+
+class CustomerFeatures(models.Model):
+    # Running per-customer aggregates, maintained from Purchase writes (see analytics/features.py)
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='features')
+    total_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchase_count = models.IntegerField(default=0)
+    last_purchase_date = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_purchase_date'], name='custfeat_last_purchase_idx'),
+            models.Index(fields=['total_spend'], name='custfeat_total_spend_idx'),
+            # Customers to re-embed in the similarity index
+            models.Index(fields=['updated_at'], name='custfeat_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Features for Customer {self.customer_id}"
+
+
+class CustomerCategoryFeature(models.Model):
+    # Per-customer quantity bought in each product category
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='category_features')
+    category = models.CharField(max_length=100)
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'category'], name='uniq_customer_category_feature'),
+        ]
+
+    def __str__(self):
+        return f"{self.category}: {self.quantity} (Customer {self.customer_id})"
+
+
+class SegmentationJob(models.Model):
+    # Background segmentation run executed by the local worker pool (analytics/jobs.py)
+    KIND_DB = 'db'
+    KIND_FILE = 'file'
+    KIND_CHOICES = [(KIND_DB, 'Database'), (KIND_FILE, 'Uploaded file')]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def as_dict(self, include_result=False):
+        data = {
+            'id': str(self.id),
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+        }
+        if include_result:
+            data['result'] = self.result
+            data['error'] = self.error or None
+        return data
+
+    def __str__(self):
+        return f"SegmentationJob {self.id} ({self.status})"
+
+
+class DailyProductSales(models.Model):
+    # Pre-aggregated facts maintained by the refresh_rollups command (analytics/rollups.py)
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='uniq_daily_product_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'day'], name='dailyproduct_product_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}: {self.quantity}"
+
+
+class DailyCategorySales(models.Model):
+    day = models.DateField()
+    category = models.CharField(max_length=100)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='uniq_daily_category_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category}: {self.quantity}"
+
+
+class DailyCustomerSales(models.Model):
+    day = models.DateField()
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='daily_sales')
+    purchase_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'customer'], name='uniq_daily_customer_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['customer', 'day'], name='dailycustomer_customer_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} Customer {self.customer_id}: {self.total_amount}"
+
+
+class RollupWatermark(models.Model):
+    # Highest source row id already folded into the rollups, per source table
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+class SalesSketch(models.Model):
+    # Serialized streaming sketches behind approx=true queries (analytics/approx.py)
+    name = models.CharField(max_length=50, unique=True)
+    data = models.BinaryField(default=b'')
+    # Highest purchase / purchase item ids already folded in
+    last_purchase_id = models.BigIntegerField(default=0)
+    last_item_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: purchases <= {self.last_purchase_id}, items <= {self.last_item_id}"
@@ -0,0 +1,189 @@
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .response_cache import cache_response
+
+
+# Shared machinery for the table endpoints (customers/, products/, ...):
+#   ?fields=id,name        only return (and only SELECT) these columns
+#   ?limit=500&cursor=...  keyset pagination; responds {'results', 'next_cursor'}
+#   ?order=id|date|-date   key the pages on the primary key or the date column
+#   ?stream=true           stream a JSON array built from QuerySet.iterator()
+# Without any of these the endpoints return the full list, as before.
+
+MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_SIZE = 2000
+
+
+def format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else None
+
+
+def format_float(value):
+    return float(value) if value is not None else None
+
+
+class Column:
+    def __init__(self, *paths, format=None):
+        self.paths = paths or ()
+        self.format = format
+
+    def render(self, values):
+        if self.format:
+            return self.format(*values)
+        return values[0]
+
+
+def encode_cursor(order, key_value, pk):
+    if hasattr(key_value, 'isoformat'):
+        key_value = key_value.isoformat()
+    payload = json.dumps([order, key_value, pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid "cursor" parameter.')
+
+
+class TableListView(APIView):
+    """
+    Subclasses set `columns` (public name -> Column of ORM paths) and
+    `date_field`, and implement get_queryset().
+    """
+    columns = {}
+    date_field = None
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        # Only pages are cached; full lists would pickle whole tables into the cache
+        if request.query_params.get('limit') or request.query_params.get('cursor'):
+            return self.get_page(request, *args, **kwargs)
+        return self.list_response(request)
+
+    @cache_response
+    def get_page(self, request, *args, **kwargs):
+        return self.list_response(request)
+
+    def list_response(self, request):
+        params = request.query_params
+        try:
+            names = self.selected_columns(params.get('fields'))
+            order = self.order_param(params.get('order'))
+            limit = self.limit_param(params.get('limit'))
+            cursor = params.get('cursor')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        key_path = 'id' if order.lstrip('-') == 'id' else self.date_field
+        descending = order.startswith('-')
+        queryset = self.get_queryset().order_by(
+            *(f'-{key_path}', '-id') if descending else (key_path, 'id')
+        )
+
+        if cursor:
+            try:
+                cursor_order, key_value, pk = decode_cursor(cursor)
+                if cursor_order != order:
+                    raise ValueError('"cursor" was issued for a different "order".')
+                queryset = queryset.filter(self.keyset_filter(key_path, key_value, pk, descending))
+            except (ValueError, TypeError) as e:
+                return Response({'error': str(e)}, status=400)
+
+        paths = []
+        for name in names:
+            paths.extend(path for path in self.columns[name].paths if path not in paths)
+        fetch_paths = paths + [path for path in ('id', key_path) if path not in paths]
+        queryset = queryset.values_list(*fetch_paths)
+        if limit:
+            queryset = queryset[:limit]
+
+        positions = {path: index for index, path in enumerate(fetch_paths)}
+        column_positions = [(name, [positions[path] for path in self.columns[name].paths]) for name in names]
+
+        def render(row):
+            return {
+                name: self.columns[name].render([row[index] for index in indexes])
+                for name, indexes in column_positions
+            }
+
+        if str(params.get('stream', '')).lower() in ('1', 'true', 'yes'):
+            return StreamingHttpResponse(
+                self.stream_json(render(row) for row in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)),
+                content_type='application/json',
+            )
+
+        rows = list(queryset)
+        data = [render(row) for row in rows]
+        if not (limit or cursor):
+            return Response(data)
+
+        next_cursor = None
+        if limit and len(rows) == limit:
+            last = rows[-1]
+            next_cursor = encode_cursor(order, last[positions[key_path]], last[positions['id']])
+        return Response({'results': data, 'next_cursor': next_cursor})
+
+    def selected_columns(self, value):
+        if not value:
+            return list(self.columns)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.columns]
+        if unknown:
+            raise ValueError(f'Unknown fields: {unknown}. Available: {list(self.columns)}')
+        return names
+
+    def order_param(self, value):
+        order = value or 'id'
+        allowed = ['id', '-id'] + (['date', '-date'] if self.date_field else [])
+        if order not in allowed:
+            raise ValueError(f'Invalid "order". Use one of {allowed}.')
+        return order
+
+    def limit_param(self, value):
+        if not value:
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValueError('"limit" must be an integer.')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'"limit" must be between 1 and {MAX_PAGE_SIZE}.')
+        return limit
+
+    def keyset_filter(self, key_path, key_value, pk, descending):
+        op = 'lt' if descending else 'gt'
+        if key_path == 'id':
+            return Q(**{f'id__{op}': pk})
+
+        key_value = parse_datetime(key_value)
+        if key_value is None:
+            raise ValueError('Invalid "cursor" parameter.')
+        return Q(**{f'{key_path}__{op}': key_value}) | Q(**{key_path: key_value, f'id__{op}': pk})
+
+    @staticmethod
+    def stream_json(rows):
+        # Rows are encoded one by one but flushed in batches to keep chunks sizeable
+        encoder = DjangoJSONEncoder()
+        buffer = ['[']
+        first = True
+        for row in rows:
+            buffer.append(('' if first else ',') + encoder.encode(row))
+            first = False
+            if len(buffer) >= 500:
+                yield ''.join(buffer)
+                buffer = []
+        buffer.append(']')
+        yield ''.join(buffer)
@@ -0,0 +1,207 @@
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .model_registry import (
+    DB_MODEL, DEFAULT_CLUSTERS, EXTERNAL_MODEL, ModelNotTrained, load_model, predict_segments, train_model,
+    train_model_streaming
+)
+from .instrumentation import phase
+from .columnar import columnar_frame, iter_columnar_chunks, load_columnar, read_columnar_meta
+from .result_cache import get_result_cache, hash_file, segmentation_cache_key
+from .segmentation import FEATURE_DTYPES, PREVIEW_COLUMNS, REQUIRED_COLUMNS, extract_rfm_features, label_segments
+
+
+# End-to-end segmentation runs shared by the synchronous views and the
+# background job workers (analytics/jobs.py). These only predict with a
+# persisted model; training happens through POST /api/segmentation-models/
+# or the train_segmentation command.
+
+STREAM_CHUNK_SIZE = 100_000
+
+
+class SegmentationError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_stream_param(value):
+    # None lets run_file_segmentation decide from the file size
+    if value is None or value == '':
+        return None
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def load_trained_model(name):
+    try:
+        return load_model(name)
+    except ModelNotTrained as e:
+        raise SegmentationError(
+            f'{e} Train it with POST /api/segmentation-models/ or the train_segmentation command.', status=404
+        )
+    except ValueError as e:
+        # Invalid model name
+        raise SegmentationError(str(e))
+
+
+def _summarize(df, model_meta):
+    return {
+        'segment_summary': df['SegmentLabel'].value_counts().to_dict(),
+        'cluster_summary': {int(k): int(v) for k, v in df['Segment'].value_counts().sort_index().items()},
+        'model_version': model_meta['version'],
+        'preview': df[PREVIEW_COLUMNS].head(10).to_dict(orient='records'),
+    }
+
+
+def run_db_segmentation(source='store'):
+    if source not in ('store', 'purchases'):
+        raise SegmentationError('Invalid "source" parameter. Use "store" or "purchases".')
+
+    with phase('features'):
+        df = extract_rfm_features(source=source)
+    return segment_customer_frame(df)
+
+
+def segment_customer_frame(df):
+    # CPU-only half of run_db_segmentation (no queries), for executors
+    if df.empty:
+        raise SegmentationError('No valid purchase data available.', status=404)
+
+    with phase('clustering'):
+        pipeline, model_meta = load_trained_model(DB_MODEL)
+        df['Segment'] = predict_segments(pipeline, df)
+
+    with phase('labeling'):
+        df['SegmentLabel'] = label_segments(df, high_freq=3, mid_freq=2)
+    with phase('serialization'):
+        return _summarize(df, model_meta)
+
+
+def file_content_hash(file_path):
+    # Uploads hash their bytes once at ingest; older files are hashed on demand
+    meta = read_columnar_meta(file_path)
+    if meta and meta.get('sha256'):
+        return meta['sha256']
+    return hash_file(file_path)
+
+
+def run_file_segmentation(file_path, model_name=EXTERNAL_MODEL, stream=None):
+    """
+    Segment an uploaded file, serving repeat requests for identical content
+    and model version from the result cache.
+    """
+    pipeline, model_meta = load_trained_model(model_name)
+    cache = get_result_cache()
+    key = segmentation_cache_key(file_content_hash(file_path), model_meta)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = _run_file_segmentation(file_path, pipeline, model_meta, stream)
+    cache.set(key, result)
+    return result
+
+
+def _should_stream(file_path, stream):
+    # Large files (or stream=True) are processed chunk by chunk
+    if stream is None:
+        return os.path.getsize(file_path) >= getattr(settings, 'SEGMENTATION_STREAM_THRESHOLD', 100 * 1024 * 1024)
+    return stream
+
+
+def load_file_frame(file_path):
+    # Uploads converted at ingest are memory-mapped instead of re-parsed
+    columns = load_columnar(file_path)
+    if columns is not None:
+        return columnar_frame(columns)
+    _check_header(file_path)
+    return pd.read_csv(file_path, usecols=REQUIRED_COLUMNS, dtype=FEATURE_DTYPES)
+
+
+def file_chunks(file_path, chunk_size=STREAM_CHUNK_SIZE):
+    """Callable returning a fresh iterator of feature frames of at most `chunk_size` rows."""
+    columns = load_columnar(file_path)
+    if columns is not None:
+        return lambda: iter_columnar_chunks(columns, chunk_size)
+    _check_header(file_path)
+    return lambda: pd.read_csv(file_path, usecols=REQUIRED_COLUMNS, dtype=FEATURE_DTYPES, chunksize=chunk_size)
+
+
+def _check_header(file_path):
+    header = pd.read_csv(file_path, nrows=0).columns
+    if not all(col in header for col in REQUIRED_COLUMNS):
+        raise SegmentationError(f'Missing required columns: {REQUIRED_COLUMNS}')
+
+
+def train_file_model(file_path, model_name=EXTERNAL_MODEL, stream=None, n_clusters=DEFAULT_CLUSTERS):
+    """Train a new version of `model_name` from an upload, in bounded memory for large files."""
+    try:
+        if _should_stream(file_path, stream):
+            return train_model_streaming(model_name, file_chunks(file_path), n_clusters=n_clusters)
+        return train_model(model_name, load_file_frame(file_path), n_clusters=n_clusters)
+    except ValueError as e:
+        # Too few rows, or bad values for the declared dtypes
+        raise SegmentationError(str(e))
+
+
+def _run_file_segmentation(file_path, pipeline, model_meta, stream):
+    if _should_stream(file_path, stream):
+        return run_file_segmentation_streaming(file_path, model_meta['name'], pipeline=pipeline, model_meta=model_meta)
+
+    with phase('features'):
+        df = load_file_frame(file_path)
+
+    with phase('clustering'):
+        df['Segment'] = predict_segments(pipeline, df)
+
+    # Heuristic labeling on the raw features (the KMeans segment ids
+    # are kept for reference but labels come from these thresholds)
+    with phase('labeling'):
+        df['SegmentLabel'] = label_segments(df, high_freq=5, mid_freq=3)
+    with phase('serialization'):
+        return _summarize(df, model_meta)
+
+
+def run_file_segmentation_streaming(file_path, model_name=EXTERNAL_MODEL, chunk_size=STREAM_CHUNK_SIZE,
+                                    pipeline=None, model_meta=None):
+    """
+    Segment a file of any size with memory bounded by `chunk_size` rows: the
+    columnar copy is sliced (or the CSV read in typed chunks of the required
+    columns only) and label/cluster counts are accumulated per chunk.
+    """
+    if pipeline is None:
+        pipeline, model_meta = load_trained_model(model_name)
+
+    chunks = file_chunks(file_path, chunk_size)
+
+    try:
+        label_counts = Counter()
+        cluster_counts = np.zeros(model_meta['n_clusters'], dtype='int64')
+        preview = []
+
+        # Chunk reads are not timed separately; phases accumulate per chunk
+        for chunk in chunks():
+            with phase('clustering'):
+                segments = predict_segments(pipeline, chunk)
+                cluster_counts += np.bincount(segments, minlength=len(cluster_counts))
+
+            with phase('labeling'):
+                chunk['SegmentLabel'] = label_segments(chunk, high_freq=5, mid_freq=3)
+                label_counts.update(chunk['SegmentLabel'].value_counts().to_dict())
+
+            if len(preview) < 10:
+                preview.extend(chunk[PREVIEW_COLUMNS].head(10 - len(preview)).to_dict(orient='records'))
+    except ValueError as e:
+        # Bad values for the declared dtypes (e.g. blanks in an int column)
+        raise SegmentationError(str(e))
+
+    return {
+        'segment_summary': dict(label_counts.most_common()),
+        'cluster_summary': {i: int(count) for i, count in enumerate(cluster_counts)},
+        'model_version': model_meta['version'],
+        'preview': preview,
+    }
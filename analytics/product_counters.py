@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Product, PurchaseItem
+from .response_cache import bump_data_version
+from .rollups import LINE_REVENUE
+
+
+# Denormalized all-time sales per product (Product.units_sold / revenue), so
+# an unwindowed top-products ranking is an index read on Product instead of
+# an aggregation over every purchase item. Line items created or deleted
+# through the ORM adjust the counters with F() updates (see signals.py);
+# bulk loaders call reconcile_product_counters() for the products they
+# touched, and the reconcile_product_counters command repairs any drift.
+
+RECONCILE_BATCH_SIZE = 5000
+
+
+def apply_purchase_item_sales(item, sign=1):
+    """Add (or with sign=-1, remove) one line item's units and revenue."""
+    Product.objects.filter(pk=item.product_id).update(
+        units_sold=F('units_sold') + sign * item.quantity,
+        revenue=F('revenue') + sign * item.quantity * item.price_at_purchase,
+    )
+
+
+def reconcile_product_counters(product_ids=None, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """
+    Recompute the counters from purchase items for the given products (all
+    when None) and write back those that drifted. Returns the drifted
+    products as (id, stored units, stored revenue, actual units, actual revenue).
+    """
+    products = Product.objects.order_by('id')
+    if product_ids is not None:
+        product_ids = sorted(set(product_ids))
+        batches = (product_ids[start:start + batch_size] for start in range(0, len(product_ids), batch_size))
+    else:
+        batches = _id_batches(products, batch_size)
+
+    drifted = []
+    for ids in batches:
+        actual = {
+            row['product_id']: (row['units'], row['revenue'])
+            for row in PurchaseItem.objects.filter(product_id__in=ids)
+            .values('product_id').annotate(units=Sum('quantity'), revenue=LINE_REVENUE).order_by()
+        }
+        stale = []
+        for product in products.filter(id__in=ids).only('id', 'units_sold', 'revenue'):
+            units, revenue = actual.get(product.id, (0, Decimal('0')))
+            revenue = (revenue or Decimal('0')).quantize(Decimal('0.01'))
+            if product.units_sold != (units or 0) or product.revenue != revenue:
+                drifted.append((product.id, product.units_sold, product.revenue, units or 0, revenue))
+                product.units_sold, product.revenue = units or 0, revenue
+                stale.append(product)
+        if stale and not dry_run:
+            Product.objects.bulk_update(stale, ['units_sold', 'revenue'], batch_size=batch_size)
+    if drifted and not dry_run:
+        transaction.on_commit(bump_data_version)
+    return drifted
+
+
+def _id_batches(products, batch_size):
+    # Keyset over product ids so every batch is one index range
+    last_id = 0
+    while True:
+        ids = list(products.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
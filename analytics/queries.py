@@ -0,0 +1,190 @@
+from django.db.models import Count, F, Q, Sum
+
+from .buckets import age_bucket_expression, age_bucket_filter, gender_expression, gender_filter
+from .models import Customer, Product, Purchase, PurchaseItem
+from .query_params import date_range_lookup, period_expression
+from .rollups import LINE_REVENUE
+
+
+# Live aggregate queries shared by the sync views and their async variants
+# (analytics/async_views.py). Overview parts are independent zero-argument
+# callables so the async view can run them concurrently.
+
+def top_products_query(start=None, end=None, limit=10):
+    if start is None and end is None:
+        # All-time ranking straight from the write-time counters
+        return (
+            Product.objects
+            .filter(units_sold__gt=0)
+            .order_by('-units_sold', 'id')
+            .values(
+                product__id=F('id'), product__name=F('name'), product__category=F('category'),
+                total_quantity=F('units_sold'), total_revenue=F('revenue'),
+            )[:limit]
+        )
+    return (
+        PurchaseItem.objects
+        .filter(**date_range_lookup('purchase__purchase_date', start, end))
+        .values('product__id', 'product__name', 'product__category')
+        .annotate(total_quantity=Sum('quantity'), total_revenue=LINE_REVENUE)
+        .order_by('-total_quantity')[:limit]
+    )
+
+
+def top_product_series_query(product_ids, granularity, start=None, end=None):
+    # Per-period totals for the given products in one grouped query
+    return (
+        PurchaseItem.objects
+        .filter(product_id__in=product_ids, **date_range_lookup('purchase__purchase_date', start, end))
+        .annotate(period=period_expression('purchase__purchase_date', granularity))
+        .values('period', 'product__id')
+        .annotate(total_quantity=Sum('quantity'), total_revenue=LINE_REVENUE)
+        .order_by('period', 'product__id')
+    )
+
+
+def overview_queries(start=None, end=None, limit=5, granularity=None):
+    purchases = Purchase.objects.filter(**date_range_lookup('purchase_date', start, end))
+    queries = {
+        'total_customers': Customer.objects.count,
+        'total_products': Product.objects.count,
+        'totals': lambda: purchases.aggregate(count=Count('id'), total=Sum('total_amount')),
+        'top_categories': lambda: list(
+            PurchaseItem.objects
+            .filter(**date_range_lookup('purchase__purchase_date', start, end))
+            .values('product__category')
+            .annotate(quantity_sold=Sum('quantity'))
+            .order_by('-quantity_sold')[:limit]
+        ),
+        'top_customers': lambda: list(
+            purchases
+            .values('customer__name')
+            .annotate(total_spent=Sum('total_amount'))
+            .order_by('-total_spent')[:limit]
+        ),
+    }
+    if granularity:
+        queries['series'] = lambda: list(
+            purchases
+            .annotate(period=period_expression('purchase_date', granularity))
+            .values('period')
+            .annotate(total_purchases=Count('id'), total_revenue=Sum('total_amount'))
+            .order_by('period')
+        )
+    return queries
+
+
+def overview_from_parts(parts):
+    """Turn evaluated overview_queries() into the overview's field values."""
+    return {
+        'total_customers': parts['total_customers'],
+        'total_products': parts['total_products'],
+        'total_purchases': parts['totals']['count'],
+        'total_revenue': parts['totals']['total'] or 0,
+        'top_categories': parts['top_categories'],
+        'top_customers': parts['top_customers'],
+        'series': parts.get('series'),
+    }
+
+
+def overview_response(overview, granularity):
+    data = {
+        'summary': {
+            'total_customers': overview['total_customers'],
+            'total_products': overview['total_products'],
+            'total_purchases': overview['total_purchases'],
+            'total_revenue': float(overview['total_revenue'])
+        },
+        'top_categories': list(overview['top_categories']),
+        'top_customers': list(overview['top_customers'])
+    }
+    if granularity:
+        data['granularity'] = granularity
+        data['series'] = overview['series']
+    return data
+
+
+def customer_groups_query(age_groups, gender_groups):
+    # (age bucket, gender) pairs that have customers at all, so groups
+    # without purchases still show up as empty lists
+    return set(
+        Customer.objects
+        .filter(age_bucket_filter('age', age_groups), gender_filter('gender', gender_groups))
+        .annotate(age_group=age_bucket_expression('age', age_groups), gender_group=gender_expression('gender'))
+        .values_list('age_group', 'gender_group')
+        .distinct()
+    )
+
+
+def category_preferences_query(age_groups, gender_groups):
+    """{(age group, gender group): [category rows]} in one GROUP BY over purchase items."""
+    category_stats = (
+        PurchaseItem.objects
+        .filter(
+            age_bucket_filter('purchase__customer__age', age_groups),
+            gender_filter('purchase__customer__gender', gender_groups),
+        )
+        .annotate(
+            age_group=age_bucket_expression('purchase__customer__age', age_groups),
+            gender_group=gender_expression('purchase__customer__gender'),
+        )
+        .values('age_group', 'gender_group', 'product__category')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            total_revenue=LINE_REVENUE
+        )
+        .order_by('-total_quantity')
+    )
+
+    grouped = {}
+    for row in category_stats:
+        grouped.setdefault((row.pop('age_group'), row.pop('gender_group')), []).append(row)
+    return grouped
+
+
+def preferences_by_group(customer_groups, grouped, age_groups, gender_groups):
+    return {
+        age_label: {
+            gender: grouped.get((age_label, gender), [])
+            for gender in gender_groups
+            if (age_label, gender) in customer_groups
+        }
+        for age_label, _, _ in age_groups
+    }
+
+
+def discount_usage_query(age_groups, start=None, end=None):
+    purchase_filter = Q(**date_range_lookup('purchases__purchase_date', start, end))
+    with_discount = purchase_filter & Q(purchases__discount_applied=True)
+    without_discount = purchase_filter & Q(purchases__discount_applied=False)
+
+    # One pass over customers LEFT JOIN purchases with conditional aggregates
+    return list(
+        Customer.objects
+        .filter(age_bucket_filter('age', age_groups))
+        .annotate(age_group=age_bucket_expression('age', age_groups))
+        .values('age_group')
+        .annotate(
+            total_customers=Count('id', distinct=True),
+            purchases_with_discount=Count('purchases', filter=with_discount),
+            revenue_with_discount=Sum('purchases__total_amount', filter=with_discount),
+            purchases_without_discount=Count('purchases', filter=without_discount),
+            revenue_without_discount=Sum('purchases__total_amount', filter=without_discount),
+        )
+        .order_by()
+    )
+
+
+def discount_usage_by_group(rows, age_groups):
+    by_group = {row.pop('age_group'): row for row in rows}
+    result = {}
+    for label, _, _ in age_groups:
+        row = by_group.get(label, {})
+        result[label] = {
+            'total_customers': row.get('total_customers', 0),
+            'purchases_with_discount': row.get('purchases_with_discount', 0),
+            'revenue_with_discount': row.get('revenue_with_discount') or 0,
+            'purchases_without_discount': row.get('purchases_without_discount', 0),
+            'revenue_without_discount': row.get('revenue_without_discount') or 0,
+        }
+    return result
@@ -0,0 +1,114 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import DateField
+from django.db.models.functions import Trunc
+from django.utils.dateparse import parse_date
+from django.utils.timezone import get_current_timezone, make_aware
+
+
+GRANULARITIES = ('day', 'week', 'month')
+# Upper bound for ?limit on the top-N endpoints
+MAX_TOP_LIMIT = 100
+SOURCES = ('live', 'rollup')
+
+
+def parse_date_range(params, start_param='start', end_param='end'):
+    """
+    Read optional YYYY-MM-DD `start`/`end` query parameters (both inclusive)
+    as a half-open [start, end) pair of aware datetimes, so filters stay
+    plain range predicates on the indexed datetime column.
+    Raises ValueError on malformed dates.
+    """
+    bounds = []
+    for name, shift in ((start_param, 0), (end_param, 1)):
+        value = params.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValueError(f'Invalid "{name}" date "{value}". Use YYYY-MM-DD.')
+        bounds.append(make_aware(datetime.combine(day + timedelta(days=shift), time.min), get_current_timezone()))
+
+    start, end = bounds
+    if start and end and start >= end:
+        raise ValueError(f'"{start_param}" must not be after "{end_param}".')
+    return start, end
+
+
+def date_range_lookup(field, start, end):
+    lookup = {}
+    if start:
+        lookup[f'{field}__gte'] = start
+    if end:
+        lookup[f'{field}__lt'] = end
+    return lookup
+
+
+def day_range_lookup(field, start, end):
+    # Same half-open range for DateField columns (e.g. the daily rollups)
+    return date_range_lookup(field, start and start.date(), end and end.date())
+
+
+def parse_granularity(value):
+    if not value:
+        return None
+    if value not in GRANULARITIES:
+        raise ValueError(f'Invalid "granularity". Use one of {list(GRANULARITIES)}.')
+    return value
+
+
+def period_expression(field, granularity):
+    # Truncated in the database (weeks start on Monday), in the current time zone
+    return Trunc(field, granularity, output_field=DateField())
+
+
+def parse_limit(value, default, maximum):
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('"limit" must be an integer.')
+    if not 1 <= limit <= maximum:
+        raise ValueError(f'"limit" must be between 1 and {maximum}.')
+    return limit
+
+
+def parse_window(params, default_limit):
+    """
+    The ?start/end/granularity/limit window shared by the top-N endpoints:
+    (start, end, granularity, limit). Raises ValueError.
+    """
+    start, end = parse_date_range(params)
+    granularity = parse_granularity(params.get('granularity'))
+    limit = parse_limit(params.get('limit'), default=default_limit, maximum=MAX_TOP_LIMIT)
+    return start, end, granularity, limit
+
+
+def parse_source(value):
+    # ?source=live (default) or rollup
+    source = value or 'live'
+    if source not in SOURCES:
+        raise ValueError('Invalid "source" parameter. Use "live" or "rollup".')
+    return source
+
+
+def parse_flag(value):
+    # ?approx=true|1|yes; anything else (or absent) is off
+    return str(value or '').lower() in ('1', 'true', 'yes')
+
+
+def parse_id_list(value, name, maximum):
+    # ?products=12,40,7 -> [12, 40, 7] (duplicates dropped, order kept)
+    try:
+        ids = list(dict.fromkeys(int(part) for part in (value or '').split(',') if part.strip()))
+    except ValueError:
+        raise ValueError(f'"{name}" must be a comma-separated list of ids.')
+    if not 1 <= len(ids) <= maximum:
+        raise ValueError(f'"{name}" must list between 1 and {maximum} ids.')
+    return ids
@@ -0,0 +1,313 @@
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+from django.db.models import Max
+from django.utils.timezone import now
+from scipy import sparse
+
+from .features import REBUILD_BATCH_SIZE
+from .model_registry import model_root
+from .models import Product, PurchaseItem
+from .response_cache import bump_data_version
+
+
+# "Bought together" recommendations from a sparse product x product
+# co-occurrence matrix: entry (a, b) counts the purchases containing both
+# products (each product counted once per purchase), the diagonal is kept
+# separately as each product's purchase count. Every row's TOP_K partners are
+# precomputed, so a lookup is a slice of one array row and a basket lookup
+# merges |basket| such rows.
+#
+# The matrix and lists are persisted as one npz file under the model root.
+# Items above the stored id watermark are folded in incrementally by CSV
+# imports and the refresh_recommendations command: for the purchases they
+# belong to, the pair counts of the basket before and after are diffed, so
+# lines added to older purchases are counted correctly. Only rows whose
+# counts changed get their top-k lists recomputed. Edits and deletes of
+# counted items need a full rebuild (seed_data does one). Lookups only read
+# the saved index.
+
+INDEX_NAME = 'recommendations'
+TOP_K = 50
+
+_loaded = {'key': None, 'index': None}
+_loaded_lock = threading.Lock()
+
+
+class ProductNotIndexed(Exception):
+    pass
+
+
+def index_path():
+    return os.path.join(model_root(), INDEX_NAME, 'co_purchases.npz')
+
+
+class CoPurchaseIndex:
+    def __init__(self, arrays):
+        # Matrix position -> product id, in first-seen order (new products append)
+        self.product_ids = arrays['product_ids']
+        self.matrix = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(arrays['shape'])
+        )
+        self.support = arrays['support']
+        self.top_ids = arrays['top_ids']
+        self.top_counts = arrays['top_counts']
+        self.last_item_id = int(arrays['last_item_id'])
+        self.built_at = str(arrays['built_at'])
+        self.positions = pd.Index(self.product_ids)
+
+    def to_arrays(self):
+        return {
+            'product_ids': self.product_ids,
+            'data': self.matrix.data,
+            'indices': self.matrix.indices,
+            'indptr': self.matrix.indptr,
+            'shape': np.array(self.matrix.shape),
+            'support': self.support,
+            'top_ids': self.top_ids,
+            'top_counts': self.top_counts,
+            'last_item_id': np.array(self.last_item_id),
+            'built_at': np.array(self.built_at),
+        }
+
+    def position(self, product_id):
+        position = self.positions.get_indexer([product_id])[0]
+        return None if position < 0 else int(position)
+
+    def bought_with(self, product_id):
+        """[(partner product id, co-purchase count)], best first."""
+        position = self.position(product_id)
+        if position is None:
+            raise ProductNotIndexed(f'Product {product_id} has no purchases to recommend from.')
+        counts = self.top_counts[position]
+        filled = counts > 0
+        return list(zip(self.top_ids[position][filled].tolist(), counts[filled].tolist())), int(self.support[position])
+
+    def bought_with_basket(self, product_ids):
+        """Partners of a basket, scored by summed co-purchase counts over its products."""
+        scores = {}
+        for product_id in product_ids:
+            position = self.position(product_id)
+            if position is None:
+                continue
+            for partner, count in zip(self.top_ids[position].tolist(), self.top_counts[position].tolist()):
+                if count > 0 and partner not in product_ids:
+                    scores[partner] = scores.get(partner, 0) + count
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _basket_matrix(purchase_ids, positions, n_products):
+    """Binary purchases x products incidence matrix (duplicate lines count once)."""
+    rows = pd.factorize(purchase_ids)[0]
+    baskets = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, positions)),
+        shape=(rows.max() + 1 if len(rows) else 0, n_products),
+    )
+    baskets.data[:] = 1
+    return baskets
+
+
+def _co_occurrence(baskets):
+    counts = (baskets.T @ baskets).tocsr()
+    support = counts.diagonal().astype(np.int64)
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts, support
+
+
+def _top_k(matrix, rows, top_ids, top_counts, product_ids):
+    for row in rows:
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        data, columns = matrix.data[start:end], matrix.indices[start:end]
+        top_ids[row] = -1
+        top_counts[row] = 0
+        if not len(data):
+            continue
+        # Highest count first, ties by product id so the cut-off is deterministic
+        best = np.lexsort((product_ids[columns], -data))[:TOP_K]
+        take = len(best)
+        top_ids[row, :take] = product_ids[columns[best]]
+        top_counts[row, :take] = data[best]
+
+
+def _read_items(first_id=0, last_id=None, purchase_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """(purchase ids, product ids, item ids) arrays, read in keyset batches."""
+    items = PurchaseItem.objects.all()
+    if last_id is not None:
+        items = items.filter(id__lte=last_id)
+    # Each batch becomes an int64 array at once, so only one batch of row
+    # tuples is alive at a time
+    chunks = [np.empty((0, 3), dtype=np.int64)]
+    if purchase_ids is not None:
+        for start in range(0, len(purchase_ids), batch_size):
+            batch = items.filter(purchase_id__in=purchase_ids[start:start + batch_size])
+            rows = list(batch.values_list('purchase_id', 'product_id', 'id'))
+            chunks.append(np.array(rows, dtype=np.int64).reshape(-1, 3))
+    else:
+        while True:
+            rows = items.filter(id__gt=first_id).order_by('id').values_list('purchase_id', 'product_id', 'id')
+            chunk = np.array(list(rows[:batch_size]), dtype=np.int64).reshape(-1, 3)
+            if not len(chunk):
+                break
+            chunks.append(chunk)
+            first_id = int(chunk[-1, 2])
+    rows = np.concatenate(chunks)
+    return rows[:, 0], rows[:, 1], rows[:, 2]
+
+
+def build_recommendations(batch_size=REBUILD_BATCH_SIZE):
+    """Count every purchase's product pairs and persist a fresh index."""
+    last_item_id = PurchaseItem.objects.aggregate(value=Max('id'))['value'] or 0
+    purchase_ids, product_ids, _ = _read_items(last_id=last_item_id, batch_size=batch_size)
+
+    positions, index_ids = pd.factorize(product_ids)
+    index_ids = np.asarray(index_ids, dtype=np.int64)
+    counts, support = _co_occurrence(_basket_matrix(purchase_ids, positions, len(index_ids)))
+
+    top_ids = np.full((len(index_ids), TOP_K), -1, dtype=np.int64)
+    top_counts = np.zeros((len(index_ids), TOP_K), dtype=np.int64)
+    _top_k(counts, range(len(index_ids)), top_ids, top_counts, index_ids)
+
+    index = CoPurchaseIndex({
+        'product_ids': index_ids,
+        'data': counts.data.astype(np.int64), 'indices': counts.indices, 'indptr': counts.indptr,
+        'shape': np.array(counts.shape),
+        'support': support,
+        'top_ids': top_ids,
+        'top_counts': top_counts,
+        'last_item_id': np.array(last_item_id),
+        'built_at': np.array(now().isoformat()),
+    })
+    _save(index)
+    return {'mode': 'full', 'products': len(index_ids), 'pairs': int(counts.nnz // 2), 'items': len(purchase_ids)}
+
+
+def refresh_recommendations(full=False, batch_size=REBUILD_BATCH_SIZE):
+    """Fold items above the watermark into the index (or rebuild). Returns a summary dict."""
+    index = None if full else _read()
+    if index is None:
+        return build_recommendations(batch_size)
+
+    last_item_id = PurchaseItem.objects.aggregate(value=Max('id'))['value'] or 0
+    new_purchases, _, _ = _read_items(first_id=index.last_item_id, last_id=last_item_id, batch_size=batch_size)
+    if not len(new_purchases):
+        return {'mode': 'incremental', 'products': len(index.product_ids), 'pairs': int(index.matrix.nnz // 2),
+                'items': 0}
+
+    # Whole baskets of the affected purchases, before and after the new lines
+    affected = np.unique(new_purchases).tolist()
+    purchase_ids, product_ids, item_ids = _read_items(last_id=last_item_id, purchase_ids=affected,
+                                                      batch_size=batch_size)
+
+    new_products = pd.Index(np.unique(product_ids)).difference(index.positions)
+    index_ids = np.concatenate([index.product_ids, new_products.to_numpy(dtype=np.int64)])
+    n = len(index_ids)
+    positions = pd.Index(index_ids).get_indexer(product_ids)
+    old = item_ids <= index.last_item_id
+
+    after, support_after = _co_occurrence(_basket_matrix(purchase_ids, positions, n))
+    before, support_before = _co_occurrence(_basket_matrix(purchase_ids[old], positions[old], n))
+    delta = (after - before).tocsr()
+    delta.eliminate_zeros()
+
+    matrix = index.matrix.copy()
+    matrix.resize((n, n))
+    matrix = (matrix + delta).tocsr()
+    matrix.eliminate_zeros()
+    support = np.concatenate([index.support, np.zeros(len(new_products), dtype=np.int64)])
+    support += support_after - support_before
+
+    top_ids = np.vstack([index.top_ids, np.full((len(new_products), TOP_K), -1, dtype=np.int64)])
+    top_counts = np.vstack([index.top_counts, np.zeros((len(new_products), TOP_K), dtype=np.int64)])
+    touched = np.unique(delta.nonzero()[0])
+    _top_k(matrix, touched, top_ids, top_counts, index_ids)
+
+    # A new object rather than in-place updates: other threads may be reading the old one
+    index = CoPurchaseIndex({
+        'product_ids': index_ids,
+        'data': matrix.data.astype(np.int64), 'indices': matrix.indices, 'indptr': matrix.indptr,
+        'shape': np.array(matrix.shape),
+        'support': support,
+        'top_ids': top_ids,
+        'top_counts': top_counts,
+        'last_item_id': np.array(last_item_id),
+        'built_at': np.array(index.built_at),
+    })
+    _save(index)
+    return {'mode': 'incremental', 'products': n, 'pairs': int(matrix.nnz // 2), 'items': len(new_purchases)}
+
+
+def _save(index):
+    path = index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Swap atomically so concurrent readers never see a partial file
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp.npz'
+    np.savez_compressed(tmp_path, **index.to_arrays())
+    os.replace(tmp_path, path)
+    with _loaded_lock:
+        _loaded.update(key=_file_key(path), index=index)
+    bump_data_version()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _read():
+    path = index_path()
+    try:
+        key = _file_key(path)
+    except FileNotFoundError:
+        return None
+    with _loaded_lock:
+        if _loaded['key'] != key:
+            with np.load(path, allow_pickle=False) as data:
+                _loaded.update(key=key, index=CoPurchaseIndex({name: data[name] for name in data.files}))
+        return _loaded['index']
+
+
+def current_index():
+    """The saved index, as of its last refresh. Raises ProductNotIndexed before the first build."""
+    index = _read()
+    if index is None:
+        raise ProductNotIndexed('The co-purchase index has not been built yet; run refresh_recommendations.')
+    return index
+
+
+def _product_rows(pairs, limit, support=None):
+    # Partners deleted since the last full build are skipped, so further
+    # candidates are looked up until `limit` rows are filled
+    rows = []
+    for start in range(0, len(pairs), limit):
+        batch = pairs[start:start + limit]
+        products = Product.objects.in_bulk([product_id for product_id, _ in batch])
+        for product_id, count in batch:
+            product = products.get(product_id)
+            if product is None:
+                continue
+            row = {
+                'product__id': product_id,
+                'product__name': product.name,
+                'product__category': product.category,
+                'co_purchases': int(count),
+            }
+            if support:
+                # Share of this product's purchases that also contained the partner
+                row['confidence'] = round(count / support, 4)
+            rows.append(row)
+            if len(rows) == limit:
+                return rows
+    return rows
+
+
+def bought_together(product_id, limit=10):
+    pairs, support = current_index().bought_with(product_id)
+    return _product_rows(pairs, limit, support)
+
+
+def bought_together_with_basket(product_ids, limit=10):
+    return _product_rows(current_index().bought_with_basket(set(product_ids)), limit)
@@ -0,0 +1,134 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+
+# Cache of analytics GET responses keyed by path, normalized query parameters
+# and a data-version counter. Anything that changes the underlying data bumps
+# the counter (model signals, bulk loads, seed_data, rollup/feature rebuilds,
+# model retraining), which retires every cached response at once; stale
+# entries simply age out. The ETag is derived from the same key, so a client
+# revalidating with If-None-Match gets a 304 without touching the database.
+# Configured by settings.ANALYTICS_RESPONSE_CACHE:
+#   ENABLED      turn the layer off entirely
+#   CACHE_ALIAS  settings.CACHES alias; must be shared between processes
+#                (file-based, redis, ...) so commands and other workers'
+#                bumps reach the process serving requests
+#   TIMEOUT      seconds an entry is kept (None = until evicted)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+DATA_VERSION_KEY = 'analytics:data-version'
+# Backends whose entries live inside one process
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'ANALYTICS_RESPONSE_CACHE', {})}
+
+
+def _cache():
+    return caches[_config()['CACHE_ALIAS']]
+
+
+def _process_local(config):
+    return settings.CACHES.get(config['CACHE_ALIAS'], {}).get('BACKEND') in PROCESS_LOCAL_BACKENDS
+
+
+def _enabled(config):
+    # A per-process counter never sees bumps from seed_data, imports, job
+    # workers or sibling web workers, so the cache stays off on one
+    return config['ENABLED'] and not _process_local(config)
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    config = _config()
+    if config['ENABLED'] and _process_local(config):
+        return [checks.Warning(
+            f'ANALYTICS_RESPONSE_CACHE uses the process-local cache "{config["CACHE_ALIAS"]}"; '
+            'the response cache is disabled.',
+            hint='Use a shared backend (FileBasedCache, RedisCache) for that alias.',
+            id='analytics.W001',
+        )]
+    return []
+
+
+def _fresh_version():
+    # Seeded from the clock so a counter lost to eviction or a restart never
+    # reuses a version that older cached entries were stored under
+    return time.time_ns() // 1000
+
+
+def get_data_version():
+    cache = _cache()
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, _fresh_version(), None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    cache = _cache()
+    try:
+        return cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Counter missing (first write, eviction or cache restart)
+        version = _fresh_version()
+        cache.set(DATA_VERSION_KEY, version, None)
+        return version
+
+
+def response_cache_key(request, version):
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+    )
+    raw = '|'.join([request.path, str(version)] + [f'{name}={value}' for name, value in params])
+    return 'analytics:response:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cache_response(get):
+    """
+    Decorator for APIView.get(). Only 200 responses with `data` are cached;
+    streaming and error responses pass through untouched.
+    """
+    @functools.wraps(get)
+    def wrapper(self, request, *args, **kwargs):
+        config = _config()
+        if not _enabled(config):
+            return get(self, request, *args, **kwargs)
+
+        key = response_cache_key(request, get_data_version())
+        etag = f'"{key[-32:]}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=304, headers={'ETag': etag})
+
+        cache = caches[config['CACHE_ALIAS']]
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Analytics-Cache'] = 'HIT'
+        else:
+            response = get(self, request, *args, **kwargs)
+            if response.status_code != 200 or not isinstance(response, Response):
+                return response
+            cache.set(key, response.data, config['TIMEOUT'])
+            response['X-Analytics-Cache'] = 'MISS'
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Cache of external segmentation results (summary + preview), keyed by the
+# uploaded file's content hash plus the model parameters that produced them.
+# Configured by settings.SEGMENTATION_RESULT_CACHE:
+#   BACKEND      'memory' (per-process LRU) or 'django' (settings.CACHES alias)
+#   MAX_ENTRIES  LRU bound for the in-process backend
+#   CACHE_ALIAS  Django cache alias for the 'django' backend
+#   TIMEOUT      seconds, Django backend only (None = never expire)
+
+DEFAULTS = {
+    'BACKEND': 'memory',
+    'MAX_ENTRIES': 128,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': None,
+}
+HASH_BLOCK_SIZE = 1024 * 1024
+HASH_MEMO_MAX_ENTRIES = 1024
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SEGMENTATION_RESULT_CACHE', {})}
+
+
+class LRUResultCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoResultCache:
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+
+    def get(self, key):
+        return caches[self.alias].get(key)
+
+    def set(self, key, value):
+        caches[self.alias].set(key, value, self.timeout)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            config = _config()
+            if config['BACKEND'] == 'django':
+                _backend = DjangoResultCache(config['CACHE_ALIAS'], config['TIMEOUT'])
+            else:
+                _backend = LRUResultCache(config['MAX_ENTRIES'])
+        return _backend
+
+
+def hash_file(file_path):
+    """
+    SHA-256 of a file's bytes, memoized per (path, size, mtime) so repeat
+    requests for the same upload do not re-read it.
+    """
+    stat = os.stat(file_path)
+    memo_key = (file_path, stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    content_hash = digest.hexdigest()
+    with _hash_lock:
+        if len(_hash_memo) >= HASH_MEMO_MAX_ENTRIES:
+            _hash_memo.clear()
+        _hash_memo[memo_key] = content_hash
+    return content_hash
+
+
+def segmentation_cache_key(content_hash, model_meta, **params):
+    parts = [content_hash, model_meta['name'], model_meta['version']]
+    parts += [f'{name}={params[name]}' for name in sorted(params)]
+    return 'segmentation:' + hashlib.sha256('|'.join(parts).encode()).hexdigest()
@@ -0,0 +1,208 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import get_current_timezone, make_aware
+
+from .features import REBUILD_BATCH_SIZE, bulk_insert_in_batches
+from .response_cache import bump_data_version
+from .query_params import day_range_lookup, period_expression
+from .models import (
+    DailyCategorySales, DailyCustomerSales, DailyProductSales, Purchase, PurchaseItem, RollupWatermark
+)
+
+
+# Daily fact tables at (day, product), (day, category) and (day, customer)
+# grain. Days are calendar days in the current time zone. Incremental
+# refreshes recompute only the days touched by purchases / items whose id is
+# above the stored watermarks; edits or deletes of already-rolled-up rows
+# need a --since or --full refresh.
+
+PURCHASE_WATERMARK = 'purchase'
+ITEM_WATERMARK = 'purchase_item'
+
+LINE_REVENUE = Sum(F('quantity') * F('price_at_purchase'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _day_start(day):
+    return make_aware(datetime.combine(day, time.min), get_current_timezone())
+
+
+def _contiguous_runs(days):
+    # [d1, d2, d3, d7] -> [(d1, d3), (d7, d7)]
+    runs = []
+    for day in sorted(days):
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def _rebuild(first_day=None, last_day=None, batch_size=REBUILD_BATCH_SIZE):
+    """Replace the rollup rows for [first_day, last_day] (None = unbounded)."""
+    purchase_range = {}
+    day_range = {}
+    if first_day:
+        purchase_range['purchase_date__gte'] = _day_start(first_day)
+        day_range['day__gte'] = first_day
+    if last_day:
+        purchase_range['purchase_date__lt'] = _day_start(last_day + timedelta(days=1))
+        day_range['day__lte'] = last_day
+    item_range = {f'purchase__{key}': value for key, value in purchase_range.items()}
+
+    items = (
+        PurchaseItem.objects
+        .filter(**item_range)
+        .annotate(day=TruncDate('purchase__purchase_date'))
+    )
+    product_rows = items.values('day', 'product_id').annotate(units=Sum('quantity'), revenue=LINE_REVENUE).order_by()
+    category_rows = (
+        items.values('day', 'product__category').annotate(units=Sum('quantity'), revenue=LINE_REVENUE).order_by()
+    )
+    customer_rows = (
+        Purchase.objects
+        .filter(**purchase_range)
+        .annotate(day=TruncDate('purchase_date'))
+        .values('day', 'customer_id')
+        .annotate(purchase_count=Count('id'), total_amount=Sum('total_amount'))
+        .order_by()
+    )
+
+    DailyProductSales.objects.filter(**day_range).delete()
+    DailyCategorySales.objects.filter(**day_range).delete()
+    DailyCustomerSales.objects.filter(**day_range).delete()
+
+    return sum([
+        bulk_insert_in_batches(DailyProductSales, (
+            DailyProductSales(day=row['day'], product_id=row['product_id'],
+                              quantity=row['units'], revenue=row['revenue'] or 0)
+            for row in product_rows.iterator(chunk_size=batch_size)
+        ), batch_size),
+        bulk_insert_in_batches(DailyCategorySales, (
+            DailyCategorySales(day=row['day'], category=row['product__category'],
+                               quantity=row['units'], revenue=row['revenue'] or 0)
+            for row in category_rows.iterator(chunk_size=batch_size)
+        ), batch_size),
+        bulk_insert_in_batches(DailyCustomerSales, (
+            DailyCustomerSales(day=row['day'], customer_id=row['customer_id'],
+                               purchase_count=row['purchase_count'], total_amount=row['total_amount'] or 0)
+            for row in customer_rows.iterator(chunk_size=batch_size)
+        ), batch_size),
+    ])
+
+
+def _watermark(name):
+    return RollupWatermark.objects.get_or_create(name=name)[0]
+
+
+def refresh_rollups(full=False, since=None, extra_days=(), batch_size=REBUILD_BATCH_SIZE):
+    """
+    Bring the daily rollups up to date. Returns a summary dict with the
+    number of days recomputed and rollup rows written. `extra_days` are
+    recomputed too by an incremental refresh, for callers that moved or
+    removed already-rolled-up rows.
+    """
+    # Snapshot the high-water marks first so rows arriving meanwhile are
+    # picked up by the next run rather than half-processed by this one
+    max_purchase_id = Purchase.objects.aggregate(value=Max('id'))['value'] or 0
+    max_item_id = PurchaseItem.objects.aggregate(value=Max('id'))['value'] or 0
+
+    with transaction.atomic():
+        purchase_mark = _watermark(PURCHASE_WATERMARK)
+        item_mark = _watermark(ITEM_WATERMARK)
+
+        if full:
+            days = None
+            rows = _rebuild(batch_size=batch_size)
+        elif since:
+            days = None
+            rows = _rebuild(first_day=since, batch_size=batch_size)
+        else:
+            days = set(extra_days)
+            days |= set(
+                Purchase.objects
+                .filter(id__gt=purchase_mark.last_id, id__lte=max_purchase_id)
+                .annotate(day=TruncDate('purchase_date'))
+                .values_list('day', flat=True)
+                .order_by()
+                .distinct()
+            )
+            days |= set(
+                PurchaseItem.objects
+                .filter(id__gt=item_mark.last_id, id__lte=max_item_id)
+                .annotate(day=TruncDate('purchase__purchase_date'))
+                .values_list('day', flat=True)
+                .order_by()
+                .distinct()
+            )
+            rows = sum(_rebuild(first, last, batch_size) for first, last in _contiguous_runs(days))
+
+        purchase_mark.last_id = max_purchase_id
+        purchase_mark.save(update_fields=['last_id', 'updated_at'])
+        item_mark.last_id = max_item_id
+        item_mark.save(update_fields=['last_id', 'updated_at'])
+        transaction.on_commit(bump_data_version)
+
+    return {
+        'mode': 'full' if full else ('since' if since else 'incremental'),
+        'days': None if days is None else len(days),
+        'rows': rows,
+    }
+
+
+def top_products_from_rollups(limit=10, start=None, end=None, granularity=None):
+    rows = DailyProductSales.objects.filter(**day_range_lookup('day', start, end))
+    top_products = list(
+        rows
+        .values('product__id', 'product__name', 'product__category')
+        .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+        .order_by('-total_quantity')[:limit]
+    )
+    series = None
+    if granularity:
+        series = list(
+            rows
+            .filter(product_id__in=[row['product__id'] for row in top_products])
+            .annotate(period=period_expression('day', granularity))
+            .values('period', 'product__id')
+            .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+            .order_by('period', 'product__id')
+        )
+    return top_products, series
+
+
+def overview_from_rollups(limit=5, start=None, end=None, granularity=None):
+    day_range = day_range_lookup('day', start, end)
+    customer_rows = DailyCustomerSales.objects.filter(**day_range)
+    totals = customer_rows.aggregate(purchases=Sum('purchase_count'), revenue=Sum('total_amount'))
+    top_categories = (
+        DailyCategorySales.objects
+        .filter(**day_range)
+        .values(product__category=F('category'))
+        .annotate(quantity_sold=Sum('quantity'))
+        .order_by('-quantity_sold')[:limit]
+    )
+    top_customers = (
+        customer_rows
+        .values('customer__name')
+        .annotate(total_spent=Sum('total_amount'))
+        .order_by('-total_spent')[:limit]
+    )
+    series = None
+    if granularity:
+        series = list(
+            customer_rows
+            .annotate(period=period_expression('day', granularity))
+            .values('period')
+            .annotate(total_purchases=Sum('purchase_count'), total_revenue=Sum('total_amount'))
+            .order_by('period')
+        )
+    return {
+        'total_purchases': totals['purchases'] or 0,
+        'total_revenue': totals['revenue'] or 0,
+        'top_categories': list(top_categories),
+        'top_customers': list(top_customers),
+        'series': series,
+    }
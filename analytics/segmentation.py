@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from django.db.models import Count, Max, Sum
+from django.utils.timezone import now
+
+from .models import CustomerFeatures, Purchase
+
+
+FEATURE_COLUMNS = ['TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays']
+REQUIRED_COLUMNS = ['CustomerID'] + FEATURE_COLUMNS
+PREVIEW_COLUMNS = REQUIRED_COLUMNS + ['SegmentLabel']
+
+# Parsed dtypes of the feature columns in uploaded CSVs
+FEATURE_DTYPES = {
+    'TotalSpend': 'float64',
+    'PurchaseFrequency': 'int64',
+    'LastPurchaseDays': 'int64',
+}
+
+# Rows pulled from the DB cursor per round trip when building the feature frame
+FEATURE_CHUNK_SIZE = 5000
+
+
+def extract_rfm_features(today=None, source='store', chunk_size=FEATURE_CHUNK_SIZE):
+    """
+    Build the recency / frequency / monetary frame for every customer with at
+    least one purchase.
+
+    source='store' reads the incrementally maintained CustomerFeatures table;
+    source='purchases' (or an empty store) falls back to a single grouped
+    aggregate over Purchase.
+    """
+    today = today or now().date()
+
+    if source == 'store' and CustomerFeatures.objects.exists():
+        rows = (
+            CustomerFeatures.objects
+            .filter(purchase_count__gt=0)
+            .order_by('customer_id')
+            .values_list('customer_id', 'total_spend', 'purchase_count', 'last_purchase_date')
+        )
+    else:
+        rows = (
+            Purchase.objects
+            .values('customer_id')
+            .annotate(
+                total_spend=Sum('total_amount'),
+                frequency=Count('id'),
+                last_purchase=Max('purchase_date'),
+            )
+            .order_by('customer_id')
+            .values_list('customer_id', 'total_spend', 'frequency', 'last_purchase')
+        )
+
+    df = pd.DataFrame.from_records(
+        rows.iterator(chunk_size=chunk_size),
+        columns=['CustomerID', 'TotalSpend', 'PurchaseFrequency', 'LastPurchase'],
+    )
+    if df.empty:
+        return pd.DataFrame(columns=['CustomerID'] + FEATURE_COLUMNS)
+
+    last_purchase_day = (
+        pd.to_datetime(df.pop('LastPurchase'), utc=True)
+        .dt.tz_localize(None)
+        .dt.normalize()
+    )
+    df['TotalSpend'] = df['TotalSpend'].astype('float64')
+    df['PurchaseFrequency'] = df['PurchaseFrequency'].astype('int64')
+    df['LastPurchaseDays'] = (pd.Timestamp(today) - last_purchase_day).dt.days.astype('int64')
+    return df
+
+
+def label_segments(df, high_freq, mid_freq, high_spend=800, mid_spend=500, max_recency=15):
+    """
+    Vectorized version of the heuristic row labeling used by the segmentation
+    views. Returns an array of 'High Value' / 'Mid-Tier' / 'Average'.
+    """
+    spend = df['TotalSpend'].to_numpy()
+    freq = df['PurchaseFrequency'].to_numpy()
+    recency = df['LastPurchaseDays'].to_numpy()
+
+    conditions = [
+        (spend > high_spend) & (freq > high_freq) & (recency < max_recency),
+        (spend > mid_spend) & (freq > mid_freq),
+    ]
+    return np.select(conditions, ['High Value', 'Mid-Tier'], default='Average')
@@ -0,0 +1,126 @@
+import threading
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .features import apply_new_purchase, apply_new_purchase_item, refresh_customer_features
+from .models import Customer, Product, Purchase, PurchaseItem
+from .product_counters import apply_purchase_item_sales, reconcile_product_counters
+from .response_cache import bump_data_version
+
+
+# Note: bulk_create/update() bypass these signals. Bulk loaders should call
+# analytics.features.rebuild_feature_store() (or the rebuild_features command),
+# analytics.product_counters.reconcile_product_counters() and
+# analytics.response_cache.bump_data_version().
+
+def _schedule_refresh(customer_id):
+    if customer_id is not None:
+        transaction.on_commit(lambda: refresh_customer_features(customer_id))
+
+
+# Products whose deleted lines still need recounting, per thread (= connection)
+_pending = threading.local()
+
+
+def _schedule_product_recount(product_id):
+    # A cascade deletes many lines of the same products: collect them and
+    # recount each product once on commit. Every line registers the flush;
+    # the first to run takes the whole set. Ids left behind by a rolled back
+    # transaction are recounted at the next commit, which is harmless.
+    if not hasattr(_pending, 'product_ids'):
+        _pending.product_ids = set()
+    _pending.product_ids.add(product_id)
+    transaction.on_commit(_recount_pending_products)
+
+
+def _recount_pending_products():
+    product_ids = getattr(_pending, 'product_ids', None)
+    if product_ids:
+        _pending.product_ids = set()
+        reconcile_product_counters(product_ids)
+
+
+def _cascades_from_purchase(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Purchase
+
+
+@receiver(post_save, sender=Purchase)
+def purchase_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_new_purchase(instance)
+    else:
+        _schedule_refresh(instance.customer_id)
+
+
+@receiver(post_delete, sender=Purchase)
+def purchase_deleted(sender, instance, **kwargs):
+    _schedule_refresh(instance.customer_id)
+
+
+@receiver(pre_save, sender=PurchaseItem)
+def purchase_item_saving(sender, instance, raw=False, **kwargs):
+    # Remember the stored line, so an edit can take its sales off the product
+    # (and purchase) it was on before
+    if raw or instance._state.adding:
+        return
+    instance._stored_line = (
+        PurchaseItem.objects.filter(pk=instance.pk)
+        .values('purchase_id', 'product_id', 'quantity', 'price_at_purchase')
+        .first()
+    )
+
+
+@receiver(post_save, sender=PurchaseItem)
+def purchase_item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_new_purchase_item(instance, instance.purchase.customer_id, instance.product.category)
+        apply_purchase_item_sales(instance)
+        return
+
+    _schedule_refresh(instance.purchase.customer_id)
+    stored = instance.__dict__.pop('_stored_line', None)
+    if stored is None:
+        # Saved without a stored row to compare against; recount from scratch
+        product_id = instance.product_id
+        transaction.on_commit(lambda: reconcile_product_counters([product_id]))
+        return
+    apply_purchase_item_sales(PurchaseItem(**stored), sign=-1)
+    apply_purchase_item_sales(instance)
+    if stored['purchase_id'] != instance.purchase_id:
+        old_purchase = Purchase.objects.filter(pk=stored['purchase_id'])
+        _schedule_refresh(old_purchase.values_list('customer_id', flat=True).first())
+
+
+@receiver(post_delete, sender=PurchaseItem)
+def purchase_item_deleted(sender, instance, origin=None, **kwargs):
+    _schedule_product_recount(instance.product_id)
+    # Deleting a purchase refreshes its customer once (purchase_deleted)
+    if origin is not None and _cascades_from_purchase(origin):
+        return
+    customer_id = (
+        Purchase.objects.filter(pk=instance.purchase_id)
+        .values_list('customer_id', flat=True)
+        .first()
+    )
+    _schedule_refresh(customer_id)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_save, sender=PurchaseItem)
+@receiver(post_delete, sender=PurchaseItem)
+def data_changed(sender, **kwargs):
+    # Retire cached analytics responses once the change is visible to readers
+    transaction.on_commit(bump_data_version)
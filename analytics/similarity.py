@@ -0,0 +1,315 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.db.models import Max
+
+from .features import REBUILD_BATCH_SIZE
+from .model_registry import model_root
+from .models import Customer, CustomerCategoryFeature, CustomerFeatures, Purchase, PurchaseItem
+from .response_cache import bump_data_version
+
+
+# Lookalike search over per-customer vectors built from the feature store:
+# log-scaled, standardized recency / frequency / monetary values followed by
+# the customer's share of units in each product category (the data behind
+# the category preferences breakdown). Rows are L2-normalized and kept as one
+# contiguous float32 matrix, so the k nearest customers by cosine similarity
+# are a blocked matrix-vector product plus argpartition.
+#
+# The index is persisted as an npz file under the model root. Customers whose
+# features changed since it was built (new purchases / items above the id
+# watermarks, or feature rows refreshed after edits) are re-embedded in place
+# by the next refresh_similarity_index run (the command, and CSV imports),
+# using the scaling and category columns of the last full build. A new
+# category, or more changed customers than FULL_REBUILD_FRACTION of the index,
+# triggers a full build. Queries only read the saved index. Deleted customers
+# are dropped from results and from the next full build.
+
+INDEX_NAME = 'similarity'
+# Weight of the RFM block relative to the (unit-sum) category shares
+RFM_WEIGHT = 0.5
+SEARCH_BLOCK_ROWS = 65_536
+FULL_REBUILD_FRACTION = 0.2
+
+_loaded = {'key': None, 'index': None}
+_loaded_lock = threading.Lock()
+
+
+class CustomerNotIndexed(Exception):
+    pass
+
+
+def index_path():
+    return os.path.join(model_root(), INDEX_NAME, 'customers.npz')
+
+
+class SimilarityIndex:
+    def __init__(self, arrays):
+        self.customer_ids = arrays['customer_ids']
+        self.matrix = np.ascontiguousarray(arrays['matrix'], dtype=np.float32)
+        self.categories = [str(category) for category in arrays['categories']]
+        self.rfm_mean = arrays['rfm_mean']
+        self.rfm_std = arrays['rfm_std']
+        # Reference time for recency, fixed at the last full build
+        self.as_of = float(arrays['as_of'])
+        self.built_at = float(arrays['built_at'])
+        self.last_purchase_id = int(arrays['last_purchase_id'])
+        self.last_item_id = int(arrays['last_item_id'])
+
+    def to_arrays(self):
+        return {
+            'customer_ids': self.customer_ids,
+            'matrix': self.matrix,
+            'categories': np.asarray(self.categories, dtype=str),
+            'rfm_mean': self.rfm_mean,
+            'rfm_std': self.rfm_std,
+            'as_of': np.array(self.as_of),
+            'built_at': np.array(self.built_at),
+            'last_purchase_id': np.array(self.last_purchase_id),
+            'last_item_id': np.array(self.last_item_id),
+        }
+
+    def row_of(self, customer_id):
+        # customer_ids is kept sorted
+        position = int(np.searchsorted(self.customer_ids, customer_id))
+        if position < len(self.customer_ids) and self.customer_ids[position] == customer_id:
+            return position
+        return None
+
+    def search(self, customer_id, k):
+        """Returns [(customer id, cosine similarity)] for the k nearest other customers."""
+        row = self.row_of(customer_id)
+        if row is None:
+            raise CustomerNotIndexed(f'Customer {customer_id} has no purchase features to compare.')
+
+        query = self.matrix[row]
+        best_ids, best_scores = [], []
+        for start in range(0, len(self.matrix), SEARCH_BLOCK_ROWS):
+            scores = self.matrix[start:start + SEARCH_BLOCK_ROWS] @ query
+            if start <= row < start + SEARCH_BLOCK_ROWS:
+                scores[row - start] = -np.inf
+            take = min(k, len(scores))
+            top = np.argpartition(-scores, take - 1)[:take]
+            best_ids.append(self.customer_ids[start + top])
+            best_scores.append(scores[top])
+
+        ids, scores = np.concatenate(best_ids), np.concatenate(best_scores)
+        order = np.argsort(-scores, kind='stable')[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order if np.isfinite(scores[i])]
+
+
+def _rfm(frame, as_of):
+    last = pd.to_datetime(frame['last_purchase_date'], utc=True)
+    seconds = (last - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+    recency_days = ((as_of - seconds) / 86400).clip(lower=0).fillna(0)
+    return np.log1p(np.column_stack([
+        recency_days.to_numpy(dtype=np.float64),
+        frame['purchase_count'].to_numpy(dtype=np.float64),
+        frame['total_spend'].astype(float).to_numpy(dtype=np.float64),
+    ]))
+
+
+def _vectors(frame, shares, rfm_mean, rfm_std, as_of):
+    rfm = (_rfm(frame, as_of) - rfm_mean) / rfm_std
+    vectors = np.hstack([rfm * (RFM_WEIGHT / np.sqrt(rfm.shape[1])), shares]).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _load_features(customer_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """(RFM feature frame sorted by customer id, customer/category/quantity frame)"""
+    features = CustomerFeatures.objects.filter(purchase_count__gt=0)
+    categories = CustomerCategoryFeature.objects.filter(quantity__gt=0)
+    if customer_ids is None:
+        batches = [(features, categories)]
+    else:
+        customer_ids = sorted(customer_ids)
+        batches = [
+            (features.filter(customer_id__in=ids), categories.filter(customer_id__in=ids))
+            for ids in (customer_ids[i:i + batch_size] for i in range(0, len(customer_ids), batch_size))
+        ]
+
+    frames, category_rows = [], []
+    for feature_rows, category_qs in batches:
+        frames.append(pd.DataFrame.from_records(
+            feature_rows.values_list('customer_id', 'total_spend', 'purchase_count', 'last_purchase_date')
+            .iterator(chunk_size=batch_size),
+            columns=['customer_id', 'total_spend', 'purchase_count', 'last_purchase_date'],
+        ))
+        category_rows += list(
+            category_qs.values_list('customer_id', 'category', 'quantity').iterator(chunk_size=batch_size)
+        )
+
+    frame = pd.concat(frames, ignore_index=True).sort_values('customer_id', ignore_index=True)
+    return frame, pd.DataFrame(category_rows, columns=['customer_id', 'category', 'quantity'])
+
+
+def _share_matrix(frame, category_rows, categories):
+    shares = np.zeros((len(frame), len(categories)), dtype=np.float64)
+    if len(category_rows) and len(frame):
+        rows = pd.Index(frame['customer_id']).get_indexer(category_rows['customer_id'])
+        columns = pd.Index(categories).get_indexer(category_rows['category'])
+        known = (rows >= 0) & (columns >= 0)
+        np.add.at(shares, (rows[known], columns[known]), category_rows['quantity'].to_numpy()[known])
+        totals = shares.sum(axis=1, keepdims=True)
+        shares /= np.where(totals == 0, 1, totals)
+    return shares
+
+
+def _watermarks():
+    return (
+        Purchase.objects.aggregate(value=Max('id'))['value'] or 0,
+        PurchaseItem.objects.aggregate(value=Max('id'))['value'] or 0,
+    )
+
+
+def build_similarity_index(batch_size=REBUILD_BATCH_SIZE):
+    """Embed every customer with purchases and persist a fresh index."""
+    last_purchase_id, last_item_id = _watermarks()
+    started = datetime.now(timezone.utc).timestamp()
+    frame, category_rows = _load_features(batch_size=batch_size)
+
+    categories = sorted(category_rows['category'].unique().tolist()) if len(category_rows) else []
+    rfm = _rfm(frame, started) if len(frame) else np.zeros((0, 3))
+    rfm_mean = rfm.mean(axis=0) if len(rfm) else np.zeros(3)
+    rfm_std = rfm.std(axis=0) if len(rfm) else np.ones(3)
+    rfm_std = np.where(rfm_std == 0, 1, rfm_std)
+
+    index = SimilarityIndex({
+        'customer_ids': frame['customer_id'].to_numpy(dtype=np.int64),
+        'matrix': _vectors(frame, _share_matrix(frame, category_rows, categories), rfm_mean, rfm_std, started)
+        if len(frame) else np.zeros((0, 3 + len(categories)), dtype=np.float32),
+        'categories': np.asarray(categories, dtype=str),
+        'rfm_mean': rfm_mean,
+        'rfm_std': rfm_std,
+        'as_of': started,
+        'built_at': started,
+        'last_purchase_id': last_purchase_id,
+        'last_item_id': last_item_id,
+    })
+    _save(index)
+    return {'mode': 'full', 'customers': len(index.customer_ids), 'dimensions': index.matrix.shape[1]}
+
+
+def changed_customers(index):
+    """Customers whose features may differ from their indexed vector."""
+    # No DISTINCT: it steers SQLite onto a full covering-index scan instead of the id range
+    changed = set(Purchase.objects.filter(id__gt=index.last_purchase_id).values_list('customer_id', flat=True))
+    # Two index reads; joining new items to purchases can plan as a scan
+    purchase_ids = list(set(
+        PurchaseItem.objects.filter(id__gt=index.last_item_id).values_list('purchase_id', flat=True)
+    ))
+    for start in range(0, len(purchase_ids), REBUILD_BATCH_SIZE):
+        changed |= set(
+            Purchase.objects.filter(id__in=purchase_ids[start:start + REBUILD_BATCH_SIZE])
+            .values_list('customer_id', flat=True)
+        )
+    changed |= set(
+        CustomerFeatures.objects
+        .filter(updated_at__gt=datetime.fromtimestamp(index.built_at, timezone.utc))
+        .values_list('customer_id', flat=True)
+    )
+    return changed
+
+
+def refresh_similarity_index(full=False, batch_size=REBUILD_BATCH_SIZE):
+    """Re-embed changed customers in place (or rebuild). Returns a summary dict."""
+    index = None if full else _read()
+    if index is None:
+        return build_similarity_index(batch_size)
+
+    last_purchase_id, last_item_id = _watermarks()
+    started = datetime.now(timezone.utc).timestamp()
+    changed = changed_customers(index)
+    if not changed:
+        return {'mode': 'incremental', 'customers': 0, 'dimensions': index.matrix.shape[1]}
+    if len(changed) > FULL_REBUILD_FRACTION * max(len(index.customer_ids), 1):
+        return build_similarity_index(batch_size)
+
+    frame, category_rows = _load_features(changed, batch_size)
+    if len(category_rows) and not set(category_rows['category']) <= set(index.categories):
+        # A new category adds a dimension
+        return build_similarity_index(batch_size)
+
+    vectors = _vectors(frame, _share_matrix(frame, category_rows, index.categories),
+                       index.rfm_mean, index.rfm_std, index.as_of)
+    # Replace changed rows, drop customers without features, append new ones
+    keep = ~np.isin(index.customer_ids, np.fromiter(changed, dtype=np.int64))
+    customer_ids = np.concatenate([index.customer_ids[keep], frame['customer_id'].to_numpy(dtype=np.int64)])
+    matrix = np.vstack([index.matrix[keep], vectors])
+    order = np.argsort(customer_ids, kind='stable')
+
+    # A new object rather than in-place updates: other threads may be searching the old one
+    index = SimilarityIndex({
+        **index.to_arrays(),
+        'customer_ids': customer_ids[order],
+        'matrix': matrix[order],
+        'built_at': started,
+        'last_purchase_id': last_purchase_id,
+        'last_item_id': last_item_id,
+    })
+    _save(index)
+    return {'mode': 'incremental', 'customers': len(changed), 'dimensions': index.matrix.shape[1]}
+
+
+def _save(index):
+    path = index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Swap atomically so concurrent readers never see a partial file
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp.npz'
+    np.savez(tmp_path, **index.to_arrays())
+    os.replace(tmp_path, path)
+    with _loaded_lock:
+        _loaded.update(key=_file_key(path), index=index)
+    bump_data_version()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _read():
+    path = index_path()
+    try:
+        key = _file_key(path)
+    except FileNotFoundError:
+        return None
+    with _loaded_lock:
+        if _loaded['key'] != key:
+            with np.load(path, allow_pickle=False) as data:
+                _loaded.update(key=key, index=SimilarityIndex({name: data[name] for name in data.files}))
+        return _loaded['index']
+
+
+def similar_customers(customer_id, k=10):
+    """
+    The k customers most similar to `customer_id`, best first, as of the last
+    index refresh. Raises CustomerNotIndexed.
+    """
+    index = _read()
+    if index is None:
+        raise CustomerNotIndexed('The similarity index has not been built yet; run refresh_similarity_index.')
+
+    matches = index.search(customer_id, k + 5)
+    customers = Customer.objects.in_bulk([match_id for match_id, _ in matches])
+    features = CustomerFeatures.objects.in_bulk(list(customers))
+    results = []
+    for match_id, score in matches:
+        # Deleted since the last full build
+        if match_id not in customers:
+            continue
+        customer = customers[match_id]
+        feature = features.get(match_id)
+        results.append({
+            'customer_id': match_id,
+            'name': customer.name,
+            'similarity': round(score, 4),
+            'total_spend': feature.total_spend if feature else 0,
+            'purchase_count': feature.purchase_count if feature else 0,
+        })
+    return results[:k]
@@ -0,0 +1,196 @@
+import io
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Mergeable streaming summaries used by the approx=true analytics mode (see
+# analytics/approx.py). Updates are vectorized over batches of keys; state is
+# plain numpy arrays so a set of sketches persists as one compressed npz blob.
+
+# pandas' hash_array takes a 16-character key; distinct keys give
+# independent hash functions
+_HLL_KEY = 'analytics-hll-v1'
+_CMS_KEYS = ('analytics-cms-h1', 'analytics-cms-h2')
+
+
+def hash_keys(keys, hash_key):
+    """Stable 64-bit hashes of ints/strings (identical across processes)."""
+    # hash_key only applies to object arrays, so numbers are hashed as text
+    keys = pd.Series(keys, copy=False).astype(str).to_numpy(dtype=object)
+    return pd.util.hash_array(keys, hash_key=hash_key, categorize=False)
+
+
+class HyperLogLog:
+    """Distinct-count estimate; relative standard error 1.04 / sqrt(2**precision)."""
+
+    def __init__(self, precision=14, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, keys):
+        if not len(keys):
+            return
+        hashes = hash_keys(keys, _HLL_KEY)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest_bits = 64 - self.precision
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Position of the leftmost 1-bit in the remaining bits
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * math.log(m / zeros)
+        return float(raw)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class CountMinSketch:
+    """
+    Point estimates of per-key totals. An estimate never undercounts and
+    overcounts by at most epsilon * total with probability 1 - delta.
+    """
+
+    def __init__(self, width=4096, depth=5, table=None, total=0):
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int64)
+        self.total = int(total)
+
+    @property
+    def width(self):
+        return self.table.shape[1]
+
+    @property
+    def depth(self):
+        return self.table.shape[0]
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def _columns(self, keys):
+        # Kirsch-Mitzenmacher: row i hashes to h1 + i * h2
+        h1 = hash_keys(keys, _CMS_KEYS[0])
+        h2 = hash_keys(keys, _CMS_KEYS[1])
+        width = np.uint64(self.width)
+        return [((h1 + np.uint64(row) * h2) % width).astype(np.int64) for row in range(self.depth)]
+
+    def add(self, keys, counts):
+        if not len(keys):
+            return
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, columns in enumerate(self._columns(keys)):
+            np.add.at(self.table[row], columns, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, keys):
+        if not len(keys):
+            return np.zeros(0, dtype=np.int64)
+        return np.min([self.table[row][columns] for row, columns in enumerate(self._columns(keys))], axis=0)
+
+    @property
+    def max_overestimate(self):
+        return self.epsilon * self.total
+
+
+class MisraGries:
+    """
+    Heavy hitters: keeps at most `capacity` candidate keys. Every key whose
+    total exceeds total / (capacity + 1) is kept; a kept count undercounts
+    by at most `decremented`.
+    """
+
+    def __init__(self, capacity=1000, keys=None, counts=None, decremented=0):
+        self.capacity = capacity
+        self.counters = pd.Series(
+            counts if counts is not None else np.zeros(0, dtype=np.int64),
+            index=keys if keys is not None else np.zeros(0, dtype=object),
+            dtype=np.int64,
+        )
+        self.decremented = int(decremented)
+
+    def add(self, keys, counts):
+        if not len(keys):
+            return
+        batch = pd.Series(np.asarray(counts, dtype=np.int64), index=np.asarray(keys, dtype=object))
+        merged = pd.concat([self.counters, batch]).groupby(level=0, sort=False).sum()
+        if len(merged) > self.capacity:
+            # Mergeable-summaries rule: subtract the (capacity+1)-th largest count
+            threshold = int(np.partition(merged.to_numpy(), -(self.capacity + 1))[-(self.capacity + 1)])
+            merged = merged - threshold
+            merged = merged[merged > 0]
+            self.decremented += threshold
+        self.counters = merged
+
+    def top(self, limit):
+        return self.counters.sort_values(ascending=False, kind='stable').head(limit)
+
+
+class TDigest:
+    """Merging t-digest for quantiles of a value stream."""
+
+    def __init__(self, compression=400, means=None, weights=None):
+        self.compression = compression
+        self.means = means if means is not None else np.zeros(0)
+        self.weights = weights if weights is not None else np.zeros(0)
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self._merge(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _merge(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # k1 scale function: centroids shrink towards the tails
+        scale = self.compression / (2 * math.pi)
+        cumulative = np.cumsum(weights)
+        k = scale * np.arcsin(np.clip(2 * cumulative / total - 1, -1, 1))
+        # Points whose k falls in the same unit interval share a centroid;
+        # the first point of each interval is where a new centroid starts
+        group = np.floor(k - k[0] + 1e-9).astype(np.int64)
+        _, starts = np.unique(group, return_index=True)
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.means, self.weights = merged_means, merged_weights
+
+    def quantile(self, q):
+        if not len(self.means):
+            return None
+        if len(self.means) == 1:
+            return float(self.means[0])
+        # Centroid centres sit at the middle of their weight
+        centres = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.count, centres, self.means))
+
+
+def dumps(arrays):
+    """Serialize a {name: ndarray} dict to a compressed blob."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def loads(blob):
+    with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
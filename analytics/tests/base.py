@@ -0,0 +1,70 @@
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+import pandas as pd
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from ..models import Customer, Product, Purchase, PurchaseItem
+
+
+class AnalyticsTestMixin:
+    """Keeps model files, cached responses and uploads of each test in a temporary directory."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        overrides = override_settings(
+            SEGMENTATION_MODEL_ROOT=os.path.join(self.tmp, 'ml_models'),
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(self.tmp, 'cache'),
+            }},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def use_media_dir(self):
+        # Uploads are resolved against the working directory's media/
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp)
+        os.makedirs('media', exist_ok=True)
+        return os.path.join(self.tmp, 'media')
+
+    def write_upload(self, name='upload.csv', rows=30):
+        # Segmentation upload with the required RFM columns, written under media/
+        path = os.path.join(self.use_media_dir(), name)
+        pd.DataFrame({
+            'CustomerID': range(rows), 'TotalSpend': [10.0 * i for i in range(rows)],
+            'PurchaseFrequency': [i % 6 for i in range(rows)], 'LastPurchaseDays': range(rows),
+        }).to_csv(path, index=False)
+        return path
+
+    def make_customer(self, name='Customer', age=30, gender='Female'):
+        return Customer.objects.create(name=name, age=age, gender=gender)
+
+    def make_product(self, name='Product', category='Books', price='10.00'):
+        return Product.objects.create(name=name, category=category, price=Decimal(price), base_price=Decimal(price),
+                                      stock_quantity=10)
+
+    def make_purchase(self, customer, lines, days_ago=1, discount=False):
+        """Create a purchase through the ORM (signals fire); lines are (product, quantity, price)."""
+        total = sum(Decimal(price) * quantity for _, quantity, price in lines)
+        purchase = Purchase.objects.create(customer=customer, purchase_date=now() - timedelta(days=days_ago),
+                                           total_amount=total, discount_applied=discount)
+        for product, quantity, price in lines:
+            PurchaseItem.objects.create(purchase=purchase, product=product, quantity=quantity,
+                                        price_at_purchase=Decimal(price))
+        return purchase
+
+
+class AnalyticsTestCase(AnalyticsTestMixin, TestCase):
+    pass
+
+
+class AnalyticsTransactionTestCase(AnalyticsTestMixin, TransactionTestCase):
+    """For code that queries from other threads, which cannot see a TestCase's open transaction."""
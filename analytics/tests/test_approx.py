@@ -0,0 +1,106 @@
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+
+from ..approx import SalesSketches, load_sales_sketches, refresh_sketches
+from ..models import SalesSketch
+from ..sketches import CountMinSketch, HyperLogLog, MisraGries, TDigest
+from .base import AnalyticsTestCase, AnalyticsTransactionTestCase
+
+
+class SketchTests(AnalyticsTestCase):
+    def test_estimates_stay_within_their_bounds(self):
+        rng = np.random.default_rng(7)
+        keys = rng.zipf(1.3, 20_000) % 5000
+        exact = np.bincount(keys, minlength=5000)
+
+        counts = CountMinSketch(width=512, depth=4)
+        counts.add(keys, np.ones(len(keys), dtype=np.int64))
+        overestimate = counts.estimate(np.arange(5000)) - exact
+        self.assertTrue((overestimate >= 0).all())
+        self.assertGreater(np.mean(overestimate <= counts.max_overestimate), 1 - counts.delta)
+
+        distinct = HyperLogLog(precision=12)
+        distinct.add(keys)
+        self.assertAlmostEqual(distinct.estimate() / len(set(keys)), 1, delta=4 * distinct.relative_error)
+
+        heavy = MisraGries(capacity=50)
+        heavy.add(keys, np.ones(len(keys), dtype=np.int64))
+        top = heavy.top(3)
+        self.assertEqual([int(key) for key in top.index], list(np.argsort(-exact, kind='stable')[:3]))
+        self.assertTrue(all(exact[int(key)] - heavy.decremented <= count <= exact[int(key)]
+                            for key, count in top.items()))
+
+        values = rng.exponential(50, 10_000)
+        digest = TDigest()
+        digest.add(values)
+        self.assertAlmostEqual(digest.quantile(0.9), np.quantile(values, 0.9), delta=2)
+
+    def test_blob_round_trip(self):
+        sketches = SalesSketches()
+        sketches.top_categories.add(np.array(['Books', 'Toys']), np.array([3, 1]))
+        sketches.order_values.add(np.array([5.0, 7.5]))
+        restored = SalesSketches.from_blob(sketches.to_blob())
+        self.assertEqual(restored.top_categories.top(2).to_dict(), {'Books': 3, 'Toys': 1})
+        self.assertEqual(restored.order_values.quantile(0.5), sketches.order_values.quantile(0.5))
+
+
+class ApproxReadPathTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = self.make_product(name='Novel', category='Books')
+        self.toys = self.make_product(name='Kite', category='Toys')
+        for i in range(5):
+            customer = self.make_customer(name=f'C{i}', age=22 + 10 * i, gender=('Male', 'Female')[i % 2])
+            self.make_purchase(customer, [(self.books, 1 + i, '10.00'), (self.toys, 1, '4.00')], days_ago=i + 1)
+
+    def top_products(self):
+        return self.client.get(f"{reverse('top-products')}?approx=true").json()
+
+    def test_reads_never_refresh(self):
+        response = self.top_products()
+        self.assertEqual((response['top_products'], response['error_bounds']['as_of']), ([], None))
+        self.assertFalse(SalesSketch.objects.exists())
+
+        refresh_sketches()
+        sketch = SalesSketch.objects.get()
+        self.make_purchase(self.make_customer(), [(self.toys, 50, '4.00')])
+        # The sketch row's watermarks, then its blob; nothing is written
+        with self.assertNumQueries(2):
+            sketches, as_of = load_sales_sketches()
+        self.assertEqual(as_of, sketch.updated_at)
+        self.assertEqual(sketches.purchases, 5)
+        self.assertEqual(SalesSketch.objects.get().last_purchase_id, sketch.last_purchase_id)
+
+        self.assertEqual(refresh_sketches()['purchases'], 1)
+        self.assertEqual(load_sales_sketches()[0].purchases, 6)
+
+    def test_estimates_match_the_exact_answers_on_small_data(self):
+        refresh_sketches()
+        approx = self.top_products()
+        exact = self.client.get(reverse('top-products')).json()
+        self.assertTrue(approx['approximate'])
+        self.assertEqual([(row['product__id'], row['total_quantity']) for row in approx['top_products']],
+                         [(row['product__id'], row['total_quantity']) for row in exact['top_products']])
+
+        overview = self.client.get(f"{reverse('basic-analytics')}?approx=true").json()
+        self.assertEqual((overview['summary']['total_purchases'], overview['summary']['purchasing_customers']), (5, 5))
+        preferences = self.client.get(f"{reverse('category-preferences')}?approx=true").json()
+        self.assertEqual(preferences['preferences']['26–35']['Female'][0],
+                         {'product__category': 'Books', 'total_quantity': 2, 'total_revenue': 20.0})
+
+        self.assertEqual(self.client.get(f"{reverse('top-products')}?approx=true&start=2020-01-01").status_code, 400)
+
+
+class AsyncApproxTests(AnalyticsTransactionTestCase):
+    def test_async_views_serve_the_same_sketches(self):
+        product = self.make_product(category='Books')
+        for i in range(3):
+            self.make_purchase(self.make_customer(age=30 + i), [(product, 1 + i, '10.00')], days_ago=i + 1)
+        refresh_sketches()
+
+        for name, query in (('basic-analytics', '?approx=true&limit=2'), ('top-products', '?approx=true'),
+                            ('category-preferences', '?approx=true'), ('top-products', '?approx=true&end=2020-01-01')):
+            sync = self.client.get(f'{reverse(name)}{query}')
+            response = async_to_sync(self.async_client.get)(f"{reverse(f'async-{name}')}{query}")
+            self.assertEqual((response.status_code, response.json()), (sync.status_code, sync.json()), name)
@@ -0,0 +1,54 @@
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+
+from ..rollups import refresh_rollups
+from .base import AnalyticsTransactionTestCase
+
+
+class AsyncViewTests(AnalyticsTransactionTestCase):
+    """The async variants answer exactly like the sync views."""
+
+    def setUp(self):
+        super().setUp()
+        books, toys = self.make_product(name='Novel', category='Books'), self.make_product(name='Kite', category='Toys')
+        for i in range(6):
+            customer = self.make_customer(name=f'C{i}', age=20 + 7 * i, gender=('Male', 'Female', None)[i % 3])
+            self.make_purchase(customer, [(books, 1 + i, '12.00'), (toys, 1, '5.00')], days_ago=i * 3 + 1,
+                               discount=i % 2 == 0)
+        refresh_rollups(full=True)
+
+    def get_async(self, path):
+        return async_to_sync(self.async_client.get)(path)
+
+    def assertSameResponse(self, name, query=''):
+        sync = self.client.get(f'{reverse(name)}{query}')
+        response = self.get_async(f"{reverse(f'async-{name}')}{query}")
+        self.assertEqual(response.status_code, sync.status_code, query)
+        self.assertEqual(response.json(), sync.json(), query)
+        return response
+
+    def test_overview_and_top_products(self):
+        for name in ('basic-analytics', 'top-products'):
+            for query in ('', '?granularity=week&limit=1', '?source=rollup&granularity=day',
+                          '?start=2020-01-01&source=rollup'):
+                self.assertEqual(self.assertSameResponse(name, query).status_code, 200)
+
+    def test_category_preferences_and_discount_usage(self):
+        self.assertSameResponse('category-preferences')
+        self.assertSameResponse('category-preferences', '?age_buckets=18-30,31-&genders=Female,Unspecified')
+        response = self.assertSameResponse('discount-usage-analysis', '?age_buckets=18-40,41-')
+        self.assertEqual(response.json()['discount_usage_by_age_group']['18–40']['purchases_with_discount'], 2)
+
+    def test_invalid_parameters(self):
+        for name, query in (('basic-analytics', '?limit=101'), ('top-products', '?source=cache'),
+                            ('top-products', '?granularity=year'), ('category-preferences', '?age_buckets=x'),
+                            ('discount-usage-analysis', '?end=tomorrow')):
+            self.assertEqual(self.assertSameResponse(name, query).status_code, 400, name)
+
+    def test_segmentation_needs_a_trained_model(self):
+        response = self.get_async(reverse('async-customer-segmentation'))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.post(reverse('segmentation-models'))
+        response = self.assertSameResponse('customer-segmentation')
+        self.assertEqual(sum(response.json()['segment_summary'].values()), 6)
@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..authentication import USER_CACHE, UserCache
+from .base import AnalyticsTestCase
+
+
+class UserCacheTests(AnalyticsTestCase):
+    def test_entries_expire_and_least_recently_used_are_evicted(self):
+        cache = UserCache()
+        with mock.patch('analytics.authentication.time.monotonic', return_value=100):
+            cache.set('1', 'ann', timeout=10, max_size=2)
+            cache.set('2', 'bob', timeout=10, max_size=2)
+            self.assertEqual(cache.get('1'), 'ann')
+            cache.set('3', 'cy', timeout=10, max_size=2)
+            self.assertEqual((cache.get('1'), cache.get('2'), cache.get('3')), ('ann', None, 'cy'))
+        with mock.patch('analytics.authentication.time.monotonic', return_value=110):
+            self.assertIsNone(cache.get('1'))
+
+
+class CachedJWTAuthenticationTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        # The cache is per process and outlives each test's rolled back users
+        USER_CACHE.clear()
+        self.addCleanup(USER_CACHE.clear)
+        self.user = User.objects.create_user(username='ann', password='secret-pass-1', first_name='Ann')
+
+    def get_user(self):
+        token = RefreshToken.for_user(self.user).access_token
+        return self.client.get(reverse('user'), HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_repeat_requests_skip_the_user_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_user().status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.get_user()
+        self.assertEqual(response.json()['first_name'], 'Ann')
+
+    def test_saved_users_are_reloaded(self):
+        self.get_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Anne'
+            self.user.save()
+        self.assertEqual(self.get_user().json()['first_name'], 'Anne')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.get_user().status_code, 401)
+
+        user_id = self.user.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.user.pk = user_id
+        self.assertEqual(self.get_user().status_code, 401)
+
+    def test_cached_users_still_get_the_token_checks(self):
+        with mock.patch('analytics.authentication.api_settings.CHECK_REVOKE_TOKEN', True):
+            token = RefreshToken.for_user(self.user).access_token
+            auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+            self.assertEqual(self.client.get(reverse('user'), **auth).status_code, 200)
+            # A cached row read after a password change the token predates
+            cached = USER_CACHE.get(str(self.user.pk))
+            cached.password = 'changed'
+            self.assertEqual(self.client.get(reverse('user'), **auth).status_code, 401)
+
+        cached.is_active = False
+        self.assertEqual(self.get_user().status_code, 401)
+
+    @override_settings(ANALYTICS_AUTH_USER_CACHE={'TIMEOUT': 0})
+    def test_timeout_zero_disables_the_cache(self):
+        self.get_user()
+        with self.assertNumQueries(1):
+            self.get_user()
+        self.assertIsNone(USER_CACHE.get(str(self.user.pk)))
@@ -0,0 +1,58 @@
+from django.urls import reverse
+
+from ..buckets import parse_age_buckets, parse_genders
+from .base import AnalyticsTestCase
+
+
+class BucketParsingTests(AnalyticsTestCase):
+    def test_default_buckets(self):
+        self.assertEqual(parse_age_buckets(), [
+            ('18–25', 18, 25), ('26–35', 26, 35), ('36–50', 36, 50), ('51+', 51, None),
+        ])
+
+    def test_open_ended_forms(self):
+        # "51 " is what an unescaped "51+" decodes to in a query string
+        for value in ('51+', '51-', '51', '51 '):
+            self.assertEqual(parse_age_buckets(f'18-25,{value}'), [('18–25', 18, 25), ('51+', 51, None)])
+
+    def test_invalid_buckets(self):
+        for value in ('x', '25-18', '18-25,20-30', '40+,50-60', '18-25,,30'):
+            with self.assertRaises(ValueError, msg=value):
+                parse_age_buckets(value)
+
+    def test_genders(self):
+        self.assertEqual(parse_genders(' Male, Female ,'), ['Male', 'Female'])
+        with self.assertRaises(ValueError):
+            parse_genders(' , ')
+
+    def test_unescaped_plus_in_query_string(self):
+        response = self.client.get('/api/discount-usage/?age_buckets=18-25,51+')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['discount_usage_by_age_group']), ['18–25', '51+'])
+
+
+class CategoryPreferencesTests(AnalyticsTestCase):
+    def test_one_grouped_breakdown(self):
+        book, toy = self.make_product(category='Books'), self.make_product(category='Toys')
+        young, old = self.make_customer(age=20, gender='Male'), self.make_customer(age=60, gender='Female')
+        self.make_customer(age=30, gender='Male')
+        self.make_purchase(young, [(book, 2, '10.00'), (toy, 1, '4.00')])
+        self.make_purchase(old, [(toy, 5, '4.00')])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f"{reverse('category-preferences')}?age_buckets=18-25,26-35,51-")
+        self.assertEqual(response.status_code, 200)
+        preferences = response.json()['preferences']
+        self.assertEqual(preferences['18–25']['Male'], [
+            {'product__category': 'Books', 'total_quantity': 2, 'total_revenue': 20.0},
+            {'product__category': 'Toys', 'total_quantity': 1, 'total_revenue': 4.0},
+        ])
+        # Customers without purchases still show their group
+        self.assertEqual(preferences['26–35'], {'Male': []})
+        self.assertEqual(preferences['51+'], {'Female': [
+            {'product__category': 'Toys', 'total_quantity': 5, 'total_revenue': 20.0},
+        ]})
+
+    def test_invalid_buckets_are_400(self):
+        response = self.client.get(f"{reverse('category-preferences')}?age_buckets=30-20")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from ..columnar import (
+    SchemaError, columnar_dir, columnar_frame, convert_csv_to_columnar, iter_columnar_chunks, load_columnar
+)
+from ..segmentation import REQUIRED_COLUMNS
+from .base import AnalyticsTestCase
+
+
+class ColumnarUploadTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload = self.write_upload(rows=25)
+
+    def test_frame_columns_are_views_on_the_mapped_files(self):
+        convert_csv_to_columnar(self.upload, chunk_size=4)
+        columns = load_columnar(self.upload)
+        frame = columnar_frame(columns)
+
+        for col in REQUIRED_COLUMNS:
+            self.assertTrue(np.shares_memory(frame[col].to_numpy(), columns[col]), col)
+        expected = pd.read_csv(self.upload)
+        self.assertEqual(frame.to_dict('records'), expected.to_dict('records'))
+        self.assertEqual([len(chunk) for chunk in iter_columnar_chunks(columns, 10)], [10, 10, 5])
+
+    def test_string_ids_keep_their_text(self):
+        frame = pd.read_csv(self.upload)
+        frame['CustomerID'] = [f'C-{i:03d}' for i in range(len(frame))]
+        frame.to_csv(self.upload, index=False)
+
+        meta = convert_csv_to_columnar(self.upload, chunk_size=7)
+        self.assertEqual((meta['rows'], meta['dtypes']['CustomerID']), (25, '<U5'))
+        self.assertEqual(load_columnar(self.upload)['CustomerID'][24], 'C-024')
+
+    def test_rejects_empty_ids_and_missing_columns(self):
+        with open(self.upload, 'a') as f:
+            f.write(',10.0,2,3\n')
+        with self.assertRaisesMessage(SchemaError, 'Empty CustomerID on line 27.'):
+            convert_csv_to_columnar(self.upload, chunk_size=10)
+        self.assertIsNone(load_columnar(self.upload))
+
+        pd.DataFrame({'CustomerID': [1], 'TotalSpend': [2.0]}).to_csv(self.upload, index=False)
+        with self.assertRaises(SchemaError):
+            convert_csv_to_columnar(self.upload)
+
+    def test_upload_endpoint_converts_or_rejects(self):
+        with open(self.upload, 'rb') as f:
+            content = f.read()
+        response = self.client.post(reverse('upload-csv'), {'file': SimpleUploadedFile('rfm.csv', content)})
+        self.assertEqual(response.status_code, 200)
+        stored = os.path.join(self.tmp, 'media', response.json()['file_name'])
+        self.assertEqual(response.json()['rows'], 25)
+        self.assertTrue(os.path.isdir(columnar_dir(stored)))
+
+        bad = SimpleUploadedFile('bad.csv', content + b',1.0,1,1\n')
+        response = self.client.post(reverse('upload-csv'), {'file': bad})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, 'media'))),
+                         sorted(['upload.csv', os.path.basename(stored), os.path.basename(columnar_dir(stored))]))
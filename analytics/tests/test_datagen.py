@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.utils.timezone import localtime
+
+from ..models import Customer, Product, Purchase, PurchaseItem
+from ..product_counters import reconcile_product_counters
+from .base import AnalyticsTestCase
+
+
+def dataset():
+    return (
+        list(Customer.objects.order_by('id').values_list('id', 'name', 'gender', 'age', 'location')),
+        list(Product.objects.order_by('id').values_list('id', 'name', 'category', 'price', 'units_sold')),
+        list(Purchase.objects.order_by('id').values_list('id', 'customer_id', 'purchase_date', 'total_amount')),
+        list(PurchaseItem.objects.order_by('purchase_id', 'product_id', 'quantity')
+             .values_list('purchase_id', 'product_id', 'quantity', 'price_at_purchase')),
+    )
+
+
+class SeedDataTests(AnalyticsTestCase):
+    def seed(self, **options):
+        options = {'customers': 20, 'products': 8, 'purchases': 60, 'days': 30, 'seed': 7, 'batch_size': 25,
+                   **options}
+        call_command('seed_data', stdout=StringIO(), **options)
+        return dataset()
+
+    def test_seed_and_end_date_reproduce_the_data(self):
+        first = self.seed(end_date='2025-03-01')
+        self.assertEqual(self.seed(end_date='2025-03-01'), first)
+
+        days = {localtime(purchase_date).date() for _, _, purchase_date, _ in first[2]}
+        self.assertLess(max(days), date(2025, 3, 1))
+        self.assertGreaterEqual(min(days), date(2025, 3, 1) - timedelta(days=30))
+        self.assertEqual(reconcile_product_counters(dry_run=True), [])
+
+        # Customers and products do not depend on the dates
+        shifted = self.seed(end_date='2025-06-01')
+        self.assertEqual(shifted[:2], first[:2])
+        self.assertGreater(min(purchase_date for _, _, purchase_date, _ in shifted[2]).date(), max(days))
+
+    def test_batch_layout_is_part_of_the_seed(self):
+        self.assertEqual(self.seed(batch_size=25)[2], self.seed(batch_size=25)[2])
+        self.assertEqual(len(self.seed(batch_size=7)[2]), 60)
+
+    def test_bad_end_date(self):
+        with self.assertRaises(CommandError):
+            self.seed(end_date='March')
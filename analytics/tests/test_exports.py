@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils.timezone import now
+
+from ..exports import PURCHASE_ITEM_EXPORT_COLUMNS, iter_purchase_item_rows
+from .base import AnalyticsTestCase
+
+
+class PurchaseItemExportTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = self.make_product(name='Pen', category='Office')
+        self.book = self.make_product(name='Atlas', category='Books')
+        customer = self.make_customer(name='Ann', gender='Female')
+        self.make_purchase(customer, [(self.pen, 2, '1.25'), (self.book, 1, '19.99')], days_ago=10)
+        self.make_purchase(customer, [(self.pen, 5, '1.10')], days_ago=1, discount=True)
+
+    def export(self, query=''):
+        response = self.client.get(f"{reverse('purchase-item-export')}?{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_rows(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), [name for name, _ in PURCHASE_ITEM_EXPORT_COLUMNS])
+        self.assertEqual(rows[1]['product_name'], 'Atlas')
+        # Money stays exact
+        self.assertEqual(rows[1]['price_at_purchase'], '19.99')
+        self.assertEqual(rows[2]['customer_name'], 'Ann')
+        self.assertTrue(rows[2]['discount_applied'])
+
+    def test_csv_and_filters(self):
+        response, body = self.export('output=csv&category=Office')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row['product_name'], row['quantity']) for row in rows], [('Pen', '2'), ('Pen', '5')])
+
+        start = (now() - timedelta(days=3)).date().isoformat()
+        _, body = self.export(f'start={start}')
+        self.assertEqual([json.loads(line)['quantity'] for line in body.splitlines()], [5])
+
+    def test_batches_are_keyset_queries(self):
+        with self.assertNumQueries(3):
+            rows = list(iter_purchase_item_rows(batch_size=2))
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        self.assertEqual(len(rows), 3)
+
+    def test_bad_parameters(self):
+        path = reverse('purchase-item-export')
+        self.assertEqual(self.client.get(f'{path}?output=xml').status_code, 400)
+        self.assertEqual(self.client.get(f'{path}?start=yesterday').status_code, 400)
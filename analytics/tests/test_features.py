@@ -0,0 +1,77 @@
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps
+
+from ..features import rebuild_feature_store
+from ..models import CustomerCategoryFeature, CustomerFeatures
+from .base import AnalyticsTestCase
+
+
+def feature_rows():
+    return (
+        list(CustomerFeatures.objects.order_by('customer_id')
+             .values_list('customer_id', 'total_spend', 'purchase_count', 'last_purchase_date')),
+        list(CustomerCategoryFeature.objects.order_by('customer_id', 'category')
+             .values_list('customer_id', 'category', 'quantity')),
+    )
+
+
+class FeatureStoreTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_customer()
+        self.book = self.make_product(category='Books')
+        self.toy = self.make_product(category='Toys')
+
+    def categories(self):
+        return dict(CustomerCategoryFeature.objects.filter(customer=self.customer).values_list('category', 'quantity'))
+
+    def test_created_purchases_are_folded_in(self):
+        first = self.make_purchase(self.customer, [(self.book, 2, '10.00'), (self.toy, 1, '5.50')], days_ago=9)
+        self.make_purchase(self.customer, [(self.book, 1, '10.00')], days_ago=4)
+
+        features = CustomerFeatures.objects.get(customer=self.customer)
+        self.assertEqual((features.purchase_count, features.total_spend), (2, Decimal('35.50')))
+        self.assertGreater(features.last_purchase_date, first.purchase_date)
+        self.assertEqual(self.categories(), {'Books': 3, 'Toys': 1})
+
+    def test_edits_and_deletes_recompute_the_customer(self):
+        purchase = self.make_purchase(self.customer, [(self.book, 2, '10.00'), (self.toy, 1, '5.50')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item = purchase.items.get(product=self.book)
+            item.quantity = 4
+            item.save()
+        self.assertEqual(self.categories(), {'Books': 4, 'Toys': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase.items.get(product=self.toy).delete()
+        self.assertEqual(self.categories(), {'Books': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase.delete()
+        features = CustomerFeatures.objects.get(customer=self.customer)
+        self.assertEqual((features.purchase_count, features.total_spend), (0, Decimal('0')))
+        self.assertEqual(self.categories(), {})
+
+    def test_rebuild_matches_incremental_upkeep(self):
+        other = self.make_customer(name='Other')
+        self.make_purchase(self.customer, [(self.book, 2, '10.00'), (self.toy, 1, '5.50')], days_ago=3)
+        self.make_purchase(other, [(self.toy, 3, '5.50')], days_ago=1)
+        incremental = feature_rows()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rebuild_feature_store(batch_size=1), (2, 3))
+        self.assertEqual(feature_rows(), incremental)
+
+    def test_migration_backfills_existing_purchases(self):
+        self.make_purchase(self.customer, [(self.book, 2, '10.00')], days_ago=2)
+        self.make_purchase(self.customer, [(self.toy, 1, '5.50')], days_ago=1)
+        expected = feature_rows()
+        CustomerCategoryFeature.objects.all().delete()
+        CustomerFeatures.objects.all().delete()
+
+        migration = import_module('analytics.migrations.0002_customer_features')
+        migration.fill_feature_store(apps, None)
+        self.assertEqual(feature_rows(), expected)
@@ -0,0 +1,104 @@
+import csv
+import os
+from decimal import Decimal
+from unittest import mock
+
+from .. import importer
+from ..importer import import_transactions_csv
+from ..models import Customer, CustomerFeatures, Product, Purchase, PurchaseItem
+from ..product_counters import reconcile_product_counters
+from ..response_cache import get_data_version
+from ..similarity import _read as read_similarity_index
+from .base import AnalyticsTestCase
+
+
+class TransactionImportTests(AnalyticsTestCase):
+    HEADER = ['order_id', 'order_date', 'customer_id', 'customer_name', 'product_id', 'product_name', 'category',
+              'quantity', 'unit_price', 'discount_applied']
+
+    def write_csv(self, rows, name='orders.csv'):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.HEADER)
+            writer.writerows(rows)
+        return path
+
+    def rows(self, customer_name='Ann'):
+        return [
+            ['O1', '2026-01-05 10:00:00', 'C1', customer_name, 'P1', 'Pen', 'Office', '2', '1.25', 'false'],
+            ['O1', '2026-01-05 10:00:00', 'C1', customer_name, 'P2', 'Ink', 'Office', '1', '7.10', 'false'],
+            ['O2', '2026-01-06 09:30:00', 'C2', 'Bob', 'P1', 'Pen', 'Office', '3', '1.25', 'true'],
+            ['O3', 'not a date', 'C2', 'Bob', 'P1', 'Pen', 'Office', '1', '1.25', 'false'],
+            ['O4', '2026-01-07 09:30:00', 'C2', 'Bob', 'P1', 'Pen', 'Office', '-1', '1.25', 'false'],
+        ]
+
+    def test_import_and_rejected_rows(self):
+        summary = import_transactions_csv(self.write_csv(self.rows()))
+
+        self.assertEqual((summary['rows'], summary['imported_rows'], summary['rejected_rows']), (5, 3, 2))
+        self.assertEqual((summary['orders'], summary['customers'], summary['products']), (2, 2, 2))
+        self.assertEqual(Purchase.objects.get(external_id='O1').total_amount, Decimal('9.60'))
+        self.assertTrue(Purchase.objects.get(external_id='O2').discount_applied)
+        self.assertEqual(Product.objects.get(external_id='P1').units_sold, 5)
+        self.assertEqual(CustomerFeatures.objects.get(customer__external_id='C2').purchase_count, 1)
+        self.assertEqual(read_similarity_index().customer_ids.tolist(),
+                         sorted(Customer.objects.values_list('id', flat=True)))
+
+        with open(summary['rejected_report']) as f:
+            report = list(csv.DictReader(f))
+        self.assertEqual([(row['line'], row['reason']) for row in report], [
+            ('5', 'invalid order_date'), ('6', 'quantity must be a positive integer'),
+        ])
+
+    def test_reimport_is_idempotent_and_upserts(self):
+        import_transactions_csv(self.write_csv(self.rows()))
+        ids = sorted(Purchase.objects.values_list('id', flat=True))
+
+        import_transactions_csv(self.write_csv(self.rows(customer_name='Ann Lee')))
+        self.assertEqual(sorted(Purchase.objects.values_list('id', flat=True)), ids)
+        self.assertEqual(PurchaseItem.objects.count(), 3)
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertEqual(Customer.objects.get(external_id='C1').name, 'Ann Lee')
+        self.assertEqual(Purchase.objects.get(external_id='O1').total_amount, Decimal('9.60'))
+        self.assertEqual(Product.objects.get(external_id='P1').units_sold, 5)
+        self.assertEqual(reconcile_product_counters(dry_run=True), [])
+
+    def test_overlong_text_and_overflowing_totals_are_rejected(self):
+        rows = self.rows()[:3] + [
+            ['O5', '2026-01-08 09:00:00', 'C3', 'x' * 101, 'P1', 'Pen', 'Office', '1', '1.25', 'false'],
+            ['O6', '2026-01-08 09:00:00', 'C3', 'Cy', 'P3', 'Safe', 'Office', '2', '60000000', 'false'],
+            # Split across chunks: the second line pushes the order past 99999999.99
+            ['O7', '2026-01-08 09:00:00', 'C3', 'Cy', 'P3', 'Safe', 'Office', '1', '60000000', 'false'],
+            ['O7', '2026-01-08 09:00:00', 'C3', 'Cy', 'P3', 'Safe', 'Office', '1', '50000000', 'false'],
+        ]
+        summary = import_transactions_csv(self.write_csv(rows), chunk_size=6)
+
+        self.assertEqual((summary['imported_rows'], summary['rejected_rows']), (4, 3))
+        self.assertEqual(Purchase.objects.get(external_id='O7').total_amount, Decimal('60000000.00'))
+        with open(summary['rejected_report']) as f:
+            report = list(csv.DictReader(f))
+        self.assertEqual([(row['line'], row['reason']) for row in report], [
+            ('5', 'customer_name longer than 100 characters'), ('6', 'order total too large'),
+            ('8', 'order total too large'),
+        ])
+
+    def test_failed_chunk_still_refreshes_committed_chunks(self):
+        real_import_chunk = importer._import_chunk
+        calls = []
+
+        def import_chunk(*args):
+            calls.append(args)
+            if len(calls) > 1:
+                raise RuntimeError('disk full')
+            return real_import_chunk(*args)
+
+        version = get_data_version()
+        with mock.patch('analytics.importer._import_chunk', side_effect=import_chunk):
+            with self.assertRaisesMessage(RuntimeError, 'disk full'):
+                import_transactions_csv(self.write_csv(self.rows()[:3]), chunk_size=2)
+
+        self.assertEqual(PurchaseItem.objects.count(), 2)
+        self.assertEqual(Product.objects.get(external_id='P1').units_sold, 2)
+        self.assertEqual(CustomerFeatures.objects.get(customer__external_id='C1').purchase_count, 1)
+        self.assertNotEqual(get_data_version(), version)
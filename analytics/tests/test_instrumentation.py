@@ -0,0 +1,65 @@
+import re
+
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from ..instrumentation import Histogram, collect_metrics, phase, server_timing
+from ..models import Product
+from .base import AnalyticsTestCase
+
+
+class HistogramTests(AnalyticsTestCase):
+    def test_render_is_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test.', (1, 5), 'endpoint')
+        for value in (0.5, 3, 3, 9):
+            histogram.observe('a"b', value)
+        self.assertEqual(histogram.render().splitlines()[2:], [
+            'test_seconds_bucket{endpoint="a\\"b",le="1"} 1',
+            'test_seconds_bucket{endpoint="a\\"b",le="5"} 3',
+            'test_seconds_bucket{endpoint="a\\"b",le="+Inf"} 4',
+            'test_seconds_sum{endpoint="a\\"b"} 15.500000',
+            'test_seconds_count{endpoint="a\\"b"} 4',
+        ])
+
+
+class PerformanceMiddlewareTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        product = self.make_product()
+        for i in range(3):
+            self.make_purchase(self.make_customer(), [(product, 1, '10.00')], days_ago=i + 1)
+
+    def test_server_timing_counts_the_request_queries(self):
+        with collect_metrics() as metrics:
+            response = self.client.get(reverse('basic-analytics'))
+        self.assertEqual(response.status_code, 200)
+        header = response['Server-Timing']
+        self.assertIn(f'desc="{metrics.queries} queries"', header)
+        self.assertGreater(metrics.queries, 0)
+        self.assertIn('render;dur=', header)
+        self.assertTrue(re.search(r'total;dur=[\d.]+$', header), header)
+
+    def test_phases_nest_into_enclosing_collectors(self):
+        with collect_metrics() as outer:
+            with collect_metrics() as inner:
+                with phase('features'):
+                    Product.objects.count()
+                with phase('features'):
+                    pass
+        self.assertEqual((inner.queries, outer.queries), (1, 1))
+        self.assertEqual(list(inner.phases), ['features'])
+        self.assertEqual(list(outer.phases), ['features'])
+        self.assertTrue(server_timing(inner, 0.01).startswith('db;dur='))
+
+    def test_metrics_endpoint_exports_request_histograms(self):
+        self.client.get(reverse('basic-analytics'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE analytics_request_duration_seconds histogram', body)
+        self.assertRegex(body, r'analytics_request_db_queries_count\{endpoint="basic-analytics"\} [1-9]')
+        self.assertIn('analytics_phase_duration_seconds_bucket{phase="render"', body)
+
+    @override_settings(ANALYTICS_INSTRUMENTATION=False)
+    def test_can_be_disabled(self):
+        response = self.client.get(reverse('basic-analytics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,112 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.urls import reverse
+
+from .. import jobs
+from ..models import SegmentationJob
+from .base import AnalyticsTestCase
+
+
+class FakeExecutor:
+    # Stands in for the process pool: hands back futures settled by the test
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.futures = []
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool('A child process terminated abruptly.')
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+# The worker normally runs in its own process; in-process it must not close the test transaction
+@mock.patch('analytics.jobs.close_old_connections')
+class SegmentationJobTests(AnalyticsTestCase):
+    def submit(self, executor, kind=SegmentationJob.KIND_DB, params=None):
+        with mock.patch('analytics.jobs._get_executor', return_value=executor):
+            return jobs.submit_segmentation_job(kind, params or {'source': 'store'})
+
+    def status(self, job):
+        job.refresh_from_db()
+        return job.status, job.error
+
+    def test_worker_records_failures_and_results(self, close_old_connections):
+        job = SegmentationJob.objects.create(kind=SegmentationJob.KIND_DB, params={'source': 'store'})
+        self.assertEqual(job.status, SegmentationJob.STATUS_PENDING)
+        jobs.run_segmentation_job(str(job.pk))
+        status, error = self.status(job)
+        self.assertEqual(status, SegmentationJob.STATUS_FAILED)
+        self.assertIn('No valid purchase data', error)
+
+        product = self.make_product()
+        for i in range(4):
+            self.make_purchase(self.make_customer(), [(product, i + 1, '50.00')], days_ago=i + 1)
+        self.client.post(reverse('segmentation-models'))
+        job = SegmentationJob.objects.create(kind=SegmentationJob.KIND_DB, params={'source': 'purchases'})
+        jobs.run_segmentation_job(str(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, SegmentationJob.STATUS_SUCCEEDED)
+        self.assertEqual(sum(job.result['segment_summary'].values()), 4)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unexpected_errors_are_recorded(self, close_old_connections):
+        job = SegmentationJob.objects.create(kind=SegmentationJob.KIND_FILE, params={'file_path': '/missing.csv'})
+        jobs.run_segmentation_job(str(job.pk))
+        status, error = self.status(job)
+        self.assertEqual(status, SegmentationJob.STATUS_FAILED)
+        self.assertTrue(error)
+
+    def test_dead_worker_fails_the_job(self, close_old_connections):
+        executor = FakeExecutor()
+        job = self.submit(executor)
+        self.assertEqual(self.status(job)[0], SegmentationJob.STATUS_PENDING)
+
+        executor.futures[0].set_exception(BrokenProcessPool('A child process terminated abruptly.'))
+        self.assertEqual(self.status(job), (
+            SegmentationJob.STATUS_FAILED, 'BrokenProcessPool: A child process terminated abruptly.',
+        ))
+
+    def test_cancelled_and_finished_futures(self, close_old_connections):
+        executor = FakeExecutor()
+        cancelled, finished = self.submit(executor), self.submit(executor)
+        executor.futures[0].cancel()
+        SegmentationJob.objects.filter(pk=finished.pk).update(status=SegmentationJob.STATUS_SUCCEEDED)
+        executor.futures[1].set_result(None)
+
+        self.assertEqual(self.status(cancelled), (SegmentationJob.STATUS_FAILED, 'Cancelled before it started.'))
+        self.assertEqual(self.status(finished), (SegmentationJob.STATUS_SUCCEEDED, ''))
+
+    def test_broken_pool_is_replaced_once(self, close_old_connections):
+        fresh = FakeExecutor()
+        with mock.patch('analytics.jobs._get_executor', side_effect=[FakeExecutor(broken=True), fresh]), \
+                mock.patch('analytics.jobs._reset_executor') as reset:
+            job = jobs.submit_segmentation_job(SegmentationJob.KIND_DB, {'source': 'store'})
+        reset.assert_called_once()
+        self.assertEqual(len(fresh.futures), 1)
+        self.assertEqual(self.status(job)[0], SegmentationJob.STATUS_PENDING)
+
+    def test_callback_off_the_request_thread_closes_its_connection(self, close_old_connections):
+        job = SegmentationJob.objects.create(kind=SegmentationJob.KIND_DB)
+        future = Future()
+        future.set_exception(RuntimeError('boom'))
+        with mock.patch('analytics.jobs.connection') as connection:
+            jobs._fail_crashed_job(str(job.pk), threading.get_ident(), future)
+            connection.close.assert_not_called()
+            jobs._fail_crashed_job(str(job.pk), threading.get_ident() + 1, future)
+            connection.close.assert_called_once()
+        self.assertEqual(self.status(job), (SegmentationJob.STATUS_FAILED, 'RuntimeError: boom'))
+
+    def test_endpoints(self, close_old_connections):
+        with mock.patch('analytics.jobs._get_executor', return_value=FakeExecutor()):
+            response = self.client.post(reverse('segmentation-jobs'), {'kind': 'db'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job']['id']
+
+        detail = self.client.get(reverse('segmentation-job-detail', kwargs={'job_id': job_id}))
+        self.assertEqual(detail.json()['job']['status'], SegmentationJob.STATUS_PENDING)
+        self.assertEqual(self.client.post(reverse('segmentation-jobs'), {'kind': 'other'}).status_code, 400)
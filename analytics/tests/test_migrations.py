@@ -0,0 +1,25 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Customer, Product, Purchase, PurchaseItem
+
+
+class MigrationTests(TestCase):
+    def test_models_and_migrations_agree(self):
+        # Exits non-zero when a model change has no migration
+        call_command('makemigrations', 'analytics', check=True, dry_run=True, stdout=StringIO())
+
+    def test_analytics_indexes_exist(self):
+        expected = {
+            Customer: {'customer_age_gender_idx', 'customer_gender_idx', 'customer_created_idx'},
+            Product: {'product_category_idx', 'product_units_sold_idx'},
+            Purchase: {'purchase_date_idx', 'purchase_customer_date_idx', 'purchase_discount_date_idx'},
+            PurchaseItem: {'item_product_qty_price_idx'},
+        }
+        with connection.cursor() as cursor:
+            for model, names in expected.items():
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                self.assertLessEqual(names, set(constraints), model.__name__)
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from unittest import mock
+
+from ..features import refresh_customer_features
+from ..models import PurchaseItem
+from ..product_counters import reconcile_product_counters
+from .base import AnalyticsTestCase
+
+
+class ProductCounterTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_customer()
+        self.book = self.make_product(category='Books')
+        self.toy = self.make_product(category='Toys')
+
+    def counters(self, product):
+        product.refresh_from_db()
+        return product.units_sold, product.revenue
+
+    def test_created_rows_update_counters(self):
+        self.make_purchase(self.customer, [(self.book, 2, '10.00'), (self.toy, 1, '5.50')])
+        self.make_purchase(self.customer, [(self.book, 1, '10.00')])
+
+        self.assertEqual(self.counters(self.book), (3, Decimal('30.00')))
+        self.assertEqual(reconcile_product_counters(dry_run=True), [])
+
+    def test_edits_move_sales_between_products(self):
+        purchase = self.make_purchase(self.customer, [(self.book, 2, '10.00'), (self.toy, 1, '5.50')])
+        item = purchase.items.get(product=self.book)
+
+        item.quantity = 4
+        item.save()
+        self.assertEqual(self.counters(self.book), (4, Decimal('40.00')))
+
+        # Moved to another product: both are adjusted in the same transaction
+        item.product = self.toy
+        item.price_at_purchase = Decimal('6.00')
+        item.save()
+        self.assertEqual(self.counters(self.book), (0, Decimal('0.00')))
+        self.assertEqual(self.counters(self.toy), (5, Decimal('29.50')))
+        self.assertEqual(reconcile_product_counters(dry_run=True), [])
+
+    def test_deletes_are_recounted_once_on_commit(self):
+        purchase = self.make_purchase(self.customer, [(self.book, 2, '10.00'), (self.toy, 1, '5.50')])
+        self.make_purchase(self.customer, [(self.book, 1, '10.00')])
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase.items.get(product=self.toy).delete()
+        self.assertEqual(self.counters(self.toy), (0, Decimal('0.00')))
+
+        for _ in range(5):
+            PurchaseItem.objects.create(purchase=purchase, product=self.book, quantity=1,
+                                        price_at_purchase=Decimal('10.00'))
+        # The cascade recounts its products once and refreshes the customer once
+        with mock.patch('analytics.signals.reconcile_product_counters', wraps=reconcile_product_counters) as recount, \
+                mock.patch('analytics.signals.refresh_customer_features', wraps=refresh_customer_features) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                purchase.delete()
+        recount.assert_called_once_with({self.book.id})
+        refresh.assert_called_once_with(self.customer.id)
+        self.assertEqual(self.counters(self.book), (1, Decimal('10.00')))
+        self.assertEqual(reconcile_product_counters(dry_run=True), [])
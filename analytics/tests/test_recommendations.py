@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+import numpy as np
+from django.urls import reverse
+
+from ..models import Product, Purchase, PurchaseItem
+from ..recommendations import (
+    ProductNotIndexed, _read_items, bought_together, build_recommendations, current_index, refresh_recommendations
+)
+from .base import AnalyticsTestCase
+
+
+class CoPurchaseIndexTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [self.make_product(name=f'P{i}', category=('Books', 'Toys', 'Games')[i % 3])
+                         for i in range(6)]
+        self.customers = [self.make_customer(name=f'C{i}', age=20 + i) for i in range(12)]
+        for i, customer in enumerate(self.customers):
+            basket = [self.products[i % 6], self.products[(i + 1) % 6], self.products[(i * 2) % 6]]
+            self.make_purchase(customer, [(product, 1 + i % 3, '4.00') for product in basket], days_ago=i + 1)
+
+    def co_purchases(self, index):
+        return {int(product_id): index.bought_with(int(product_id)) for product_id in index.product_ids}
+
+    def test_incremental_matches_full_rebuild(self):
+        build_recommendations()
+        first = Purchase.objects.order_by('id').first()
+        newcomer = self.make_product(name='New', category='Books')
+        # A line added to an already counted purchase, a duplicate line, and a new order
+        PurchaseItem.objects.create(purchase=first, product=newcomer, quantity=1, price_at_purchase=Decimal('2.00'))
+        PurchaseItem.objects.create(purchase=first, product=self.products[0], quantity=1,
+                                    price_at_purchase=Decimal('4.00'))
+        self.make_purchase(self.customers[3], [(newcomer, 1, '2.00'), (self.products[5], 1, '4.00')])
+
+        summary = refresh_recommendations()
+        self.assertEqual(summary['mode'], 'incremental')
+        incremental = self.co_purchases(current_index())
+
+        self.assertEqual(build_recommendations()['mode'], 'full')
+        self.assertEqual(incremental, self.co_purchases(current_index()))
+        self.assertEqual(dict(incremental[newcomer.id][0]), {self.products[0].id: 1, self.products[1].id: 1,
+                                                             self.products[5].id: 1})
+
+    def test_lookups_only_read_the_saved_index(self):
+        path = reverse('product-recommendations', kwargs={'product_id': self.products[0].id})
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(self.client.get(f"{reverse('basket-recommendations')}?products=1").status_code, 404)
+
+        build_recommendations()
+        newcomer = self.make_product(name='New')
+        self.make_purchase(self.customers[0], [(newcomer, 1, '2.00'), (self.products[2], 1, '4.00')])
+        # Until the next refresh the newcomer is unknown; nothing is rebuilt on read
+        with self.assertNumQueries(0):
+            self.assertRaises(ProductNotIndexed, bought_together, newcomer.id)
+        self.assertLess(current_index().last_item_id, PurchaseItem.objects.latest('id').id)
+
+        refresh_recommendations()
+        response = self.client.get(reverse('product-recommendations', kwargs={'product_id': newcomer.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['product__id'] for row in response.json()['bought_together']], [self.products[2].id])
+        basket = self.client.get(f"{reverse('basket-recommendations')}?products={newcomer.id},{self.products[2].id}")
+        self.assertNotIn(newcomer.id, [row['product__id'] for row in basket.json()['bought_together']])
+
+    def test_deleted_partners_do_not_shorten_the_list(self):
+        build_recommendations()
+        pairs, _ = current_index().bought_with(self.products[0].id)
+        self.assertGreater(len(pairs), 2)
+        Product.objects.filter(id=pairs[0][0]).delete()
+
+        rows = bought_together(self.products[0].id, limit=2)
+        self.assertEqual([row['product__id'] for row in rows], [partner for partner, _ in pairs[1:3]])
+
+    def test_items_are_read_in_batches(self):
+        purchase_ids, product_ids, item_ids = _read_items(batch_size=7)
+        self.assertEqual(item_ids.tolist(), list(PurchaseItem.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual((purchase_ids.dtype, len(product_ids)), (np.int64, 36))
+        self.assertEqual(len(_read_items(purchase_ids=[Purchase.objects.first().id], batch_size=7)[0]), 3)
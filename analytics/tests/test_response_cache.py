@@ -0,0 +1,52 @@
+from django.core import checks
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from ..models import Customer
+from ..response_cache import bump_data_version
+from .base import AnalyticsTestCase
+
+
+class ResponseCacheTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.make_product()
+        self.make_purchase(self.make_customer(), [(self.product, 2, '10.00')])
+
+    def test_hit_after_miss_and_304_on_matching_etag(self):
+        path = reverse('top-products')
+        first = self.client.get(path)
+        self.assertEqual(first['X-Analytics-Cache'], 'MISS')
+        second = self.client.get(path)
+        self.assertEqual(second['X-Analytics-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+
+        revalidated = self.client.get(path, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_data_change_invalidates(self):
+        path = reverse('top-products')
+        first = self.client.get(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_purchase(Customer.objects.get(), [(self.product, 5, '10.00')])
+
+        after = self.client.get(path, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after['X-Analytics-Cache'], 'MISS')
+        self.assertNotEqual(after['ETag'], first['ETag'])
+        self.assertEqual(after.json()['top_products'][0]['total_quantity'], 7)
+
+        bump_data_version()
+        self.assertEqual(self.client.get(path)['X-Analytics-Cache'], 'MISS')
+
+    def test_full_table_lists_are_not_cached(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Analytics-Cache'))
+        self.assertEqual(self.client.get(f"{reverse('product-list')}?limit=5")['X-Analytics-Cache'], 'MISS')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_disabled_on_process_local_cache(self):
+        self.assertFalse(self.client.get(reverse('top-products')).has_header('X-Analytics-Cache'))
+        warnings = [message.id for message in checks.run_checks(tags=[checks.Tags.caches])]
+        self.assertIn('analytics.W001', warnings)
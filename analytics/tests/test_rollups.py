@@ -0,0 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.urls import reverse
+from django.utils.timezone import localdate
+
+from ..models import DailyCategorySales, DailyCustomerSales, DailyProductSales, PurchaseItem, RollupWatermark
+from ..rollups import ITEM_WATERMARK, PURCHASE_WATERMARK, refresh_rollups
+from .base import AnalyticsTestCase
+
+
+def rollup_rows():
+    return (
+        sorted(DailyProductSales.objects.values_list('day', 'product_id', 'quantity', 'revenue')),
+        sorted(DailyCategorySales.objects.values_list('day', 'category', 'quantity', 'revenue')),
+        sorted(DailyCustomerSales.objects.values_list('day', 'customer_id', 'purchase_count', 'total_amount')),
+    )
+
+
+class RollupTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pen = self.make_product(name='Pen', category='Office')
+        self.ink = self.make_product(name='Ink', category='Office')
+        self.atlas = self.make_product(name='Atlas', category='Books')
+        self.ann, self.bob = self.make_customer(name='Ann'), self.make_customer(name='Bob')
+        self.make_purchase(self.ann, [(self.pen, 2, '1.50'), (self.atlas, 1, '20.00')], days_ago=5)
+        self.make_purchase(self.bob, [(self.pen, 1, '1.50')], days_ago=5)
+        self.make_purchase(self.bob, [(self.ink, 4, '3.00')], days_ago=2)
+
+    def test_full_refresh(self):
+        summary = refresh_rollups(full=True)
+        self.assertEqual((summary['mode'], summary['rows']), ('full', 9))
+        day = localdate() - timedelta(days=5)
+        self.assertEqual(DailyProductSales.objects.get(day=day, product=self.pen).revenue, Decimal('4.50'))
+        self.assertEqual(DailyCategorySales.objects.get(day=day, category='Office').quantity, 3)
+        self.assertEqual(DailyCustomerSales.objects.get(day=day, customer=self.ann).total_amount, Decimal('23.00'))
+
+    def test_incremental_refresh_recomputes_touched_days(self):
+        refresh_rollups(full=True)
+        # A new day, and a line added to an already rolled-up purchase
+        self.make_purchase(self.ann, [(self.atlas, 2, '18.00')], days_ago=1)
+        old_purchase = self.bob.purchases.order_by('purchase_date').first()
+        PurchaseItem.objects.create(purchase=old_purchase, product=self.ink, quantity=1,
+                                    price_at_purchase=Decimal('3.00'))
+
+        summary = refresh_rollups()
+        self.assertEqual((summary['mode'], summary['days']), ('incremental', 2))
+        incremental = rollup_rows()
+        refresh_rollups(full=True)
+        self.assertEqual(rollup_rows(), incremental)
+
+        marks = dict(RollupWatermark.objects.values_list('name', 'last_id'))
+        self.assertEqual(marks[ITEM_WATERMARK], PurchaseItem.objects.latest('id').id)
+        self.assertEqual(marks[PURCHASE_WATERMARK], self.ann.purchases.latest('id').id)
+        self.assertEqual(refresh_rollups()['days'], 0)
+
+    def test_rollup_source_matches_live(self):
+        refresh_rollups(full=True)
+        start = (localdate() - timedelta(days=3)).isoformat()
+        for name in ('top-products', 'basic-analytics'):
+            for query in ('', f'start={start}', 'granularity=day'):
+                live = self.client.get(f'{reverse(name)}?{query}').json()
+                rollup = self.client.get(f'{reverse(name)}?{query}&source=rollup').json()
+                self.assertEqual(rollup, live, f'{name}?{query}')
+        self.assertEqual(self.client.get(f"{reverse('top-products')}?source=other").status_code, 400)
@@ -0,0 +1,102 @@
+import json
+import os
+from datetime import timedelta
+
+import pandas as pd
+from django.urls import reverse
+from django.utils.timezone import now
+
+from ..model_registry import DB_MODEL, EXTERNAL_MODEL, KEEP_VERSIONS, _versions, load_model, train_model
+from ..segmentation import extract_rfm_features
+from .base import AnalyticsTestCase
+
+
+class RFMFeatureTests(AnalyticsTestCase):
+    def test_one_grouped_query(self):
+        product = self.make_product()
+        ann, bob = self.make_customer(name='Ann'), self.make_customer(name='Bob')
+        self.make_purchase(ann, [(product, 1, '10.00')], days_ago=3)
+        self.make_purchase(ann, [(product, 2, '10.00')], days_ago=10)
+        self.make_purchase(bob, [(product, 1, '4.50')], days_ago=1)
+
+        with self.assertNumQueries(1):
+            df = extract_rfm_features(today=now().date(), source='purchases')
+
+        rows = df.set_index('CustomerID').to_dict('index')
+        self.assertEqual(rows[ann.id], {'TotalSpend': 30.0, 'PurchaseFrequency': 2, 'LastPurchaseDays': 3})
+        self.assertEqual(rows[bob.id], {'TotalSpend': 4.5, 'PurchaseFrequency': 1, 'LastPurchaseDays': 1})
+
+    def test_store_matches_purchases(self):
+        product = self.make_product()
+        for days_ago in (2, 5, 40):
+            self.make_purchase(self.make_customer(), [(product, 1, '12.00')], days_ago=days_ago)
+
+        today = (now() + timedelta(days=1)).date()
+        store = extract_rfm_features(today=today, source='store')
+        purchases = extract_rfm_features(today=today, source='purchases')
+        self.assertEqual(store.to_dict('records'), purchases.to_dict('records'))
+
+
+class UploadPathTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.use_media_dir()
+        with open('secret.csv', 'w') as f:
+            f.write('CustomerID,TotalSpend,PurchaseFrequency,LastPurchaseDays\n1,1.0,1,1\n')
+
+    def test_file_names_cannot_leave_media(self):
+        for name in ('../secret.csv', '/etc/passwd', 'sub/../../secret.csv'):
+            response = self.client.get(f"{reverse('external-customer-segmentation')}?file={name}")
+            self.assertEqual(response.status_code, 400, name)
+            response = self.client.post(reverse('segmentation-jobs'), {'kind': 'file', 'file': name})
+            self.assertEqual(response.status_code, 400, name)
+            response = self.client.post(reverse('segmentation-models'), {'file': name})
+            self.assertEqual(response.status_code, 400, name)
+
+    def test_missing_upload_is_404(self):
+        response = self.client.get(f"{reverse('external-customer-segmentation')}?file=missing.csv")
+        self.assertEqual(response.status_code, 404)
+
+
+class ModelRegistryTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload = self.write_upload()
+
+    def test_requests_never_train(self):
+        path = f"{reverse('external-customer-segmentation')}?file=upload.csv"
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(self.client.get(f'{path}&model=other').status_code, 404)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'ml_models', 'other')))
+
+        trained = self.client.post(reverse('segmentation-models'), {'file': 'upload.csv', 'model': EXTERNAL_MODEL})
+        self.assertEqual(trained.status_code, 200)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['model_version'], trained.json()['model']['version'])
+        self.assertEqual(sum(response.json()['cluster_summary'].values()), 30)
+
+    def test_database_segmentation_uses_the_trained_model(self):
+        product = self.make_product()
+        for i in range(6):
+            self.make_purchase(self.make_customer(), [(product, 1 + i, '100.00')], days_ago=i + 1)
+        path = reverse('customer-segmentation')
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+        trained = self.client.post(reverse('segmentation-models'), {'model': DB_MODEL})
+        self.assertEqual(trained.status_code, 200)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['model_version'], trained.json()['model']['version'])
+        self.assertEqual(sum(response.json()['segment_summary'].values()), 6)
+
+    def test_pruning_keeps_the_active_version(self):
+        frame = pd.read_csv(self.upload)
+        for _ in range(KEEP_VERSIONS + 2):
+            _, metadata = train_model(DB_MODEL, frame)
+        versions = _versions(DB_MODEL)
+        self.assertEqual(len(versions), KEEP_VERSIONS)
+        self.assertEqual(versions[0], metadata['version'])
+        with open(os.path.join(self.tmp, 'ml_models', DB_MODEL, 'latest.json')) as f:
+            self.assertEqual(json.load(f)['version'], metadata['version'])
+        self.assertEqual(load_model(DB_MODEL)[1]['version'], metadata['version'])
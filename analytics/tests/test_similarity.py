@@ -0,0 +1,71 @@
+import os
+
+from django.urls import reverse
+
+from ..similarity import _read as read_similarity_index
+from ..similarity import build_similarity_index, index_path, refresh_similarity_index, similar_customers
+from .base import AnalyticsTestCase
+
+
+class SimilarityIndexTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [self.make_product(name=f'P{i}', category=('Books', 'Toys', 'Games')[i % 3])
+                         for i in range(6)]
+        self.customers = [self.make_customer(name=f'C{i}', age=20 + i) for i in range(12)]
+        for i, customer in enumerate(self.customers):
+            basket = [self.products[i % 6], self.products[(i + 1) % 6], self.products[(i * 2) % 6]]
+            self.make_purchase(customer, [(product, 1 + i % 3, '4.00') for product in basket], days_ago=i + 1)
+
+    def similar(self, customer):
+        return self.client.get(reverse('similar-customers', kwargs={'customer_id': customer.id}))
+
+    def test_similarity_incremental_refresh(self):
+        build_similarity_index()
+        before = read_similarity_index()
+        changed = self.customers[0]
+        self.make_purchase(changed, [(self.products[4], 3, '4.00')])
+
+        self.assertEqual(refresh_similarity_index(), {'mode': 'incremental', 'customers': 1, 'dimensions': 6})
+        after = read_similarity_index()
+        self.assertEqual(after.customer_ids.tolist(), before.customer_ids.tolist())
+        row = after.row_of(changed.id)
+        self.assertFalse((after.matrix[row] == before.matrix[row]).all())
+        others = [index for index in range(len(after.customer_ids)) if index != row]
+        self.assertTrue((after.matrix[others] == before.matrix[others]).all())
+
+        # The same customers as a rebuild from scratch
+        self.assertEqual(refresh_similarity_index(full=True)['mode'], 'full')
+        self.assertEqual(read_similarity_index().customer_ids.tolist(), after.customer_ids.tolist())
+
+    def test_similarity_new_category_or_many_changes_rebuild(self):
+        build_similarity_index()
+        self.make_purchase(self.customers[1], [(self.make_product(category='Garden'), 1, '4.00')])
+        summary = refresh_similarity_index()
+        self.assertEqual((summary['mode'], summary['dimensions']), ('full', 7))
+
+        for customer in self.customers[:4]:
+            self.make_purchase(customer, [(self.products[0], 1, '4.00')])
+        self.assertEqual(refresh_similarity_index()['mode'], 'full')
+
+    def test_lookups_only_read_the_saved_index(self):
+        self.assertEqual(self.similar(self.customers[0]).status_code, 404)
+        self.assertFalse(os.path.exists(index_path()))
+
+        build_similarity_index()
+        built = os.stat(index_path()).st_mtime_ns
+        newcomer = self.make_customer(name='New')
+        self.make_purchase(newcomer, [(self.products[0], 1, '4.00')])
+        self.make_purchase(self.customers[0], [(self.products[3], 9, '4.00')])
+
+        # The matches and their features; no change detection or rebuild
+        with self.assertNumQueries(2):
+            matches = similar_customers(self.customers[1].id, k=3)
+        self.assertEqual(len(matches), 3)
+        self.assertEqual(os.stat(index_path()).st_mtime_ns, built)
+        self.assertEqual(self.similar(newcomer).status_code, 404)
+
+        refresh_similarity_index()
+        response = self.similar(newcomer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['similar_customers']), 10)
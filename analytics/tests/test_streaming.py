@@ -0,0 +1,45 @@
+from django.urls import reverse
+
+from ..model_registry import EXTERNAL_MODEL, load_model, train_model_streaming
+from ..pipelines import (
+    SegmentationError, _run_file_segmentation, file_chunks, run_file_segmentation_streaming, train_file_model
+)
+from .base import AnalyticsTestCase
+
+
+class StreamingSegmentationTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload = self.write_upload(rows=50)
+        self.pipeline, self.model_meta = train_file_model(self.upload, stream=False)
+
+    def test_chunked_run_matches_in_memory_run(self):
+        in_memory = _run_file_segmentation(self.upload, self.pipeline, self.model_meta, stream=False)
+        streamed = run_file_segmentation_streaming(self.upload, chunk_size=7)
+
+        self.assertEqual(streamed['segment_summary'], in_memory['segment_summary'])
+        self.assertEqual(streamed['cluster_summary'], in_memory['cluster_summary'])
+        self.assertEqual(streamed['preview'], in_memory['preview'])
+        self.assertEqual(streamed['model_version'], self.model_meta['version'])
+
+    def test_mini_batch_training(self):
+        # Chunks smaller than n_clusters are carried into the next partial_fit
+        _, metadata = train_model_streaming('streamed', file_chunks(self.upload, chunk_size=2), n_clusters=3)
+        self.assertEqual((metadata['n_samples'], metadata['n_clusters']), (50, 3))
+        pipeline, _ = load_model('streamed')
+        self.assertEqual(len(pipeline[-1].cluster_centers_), 3)
+
+        _, metadata = train_file_model(self.upload, stream=True)
+        self.assertEqual(load_model(EXTERNAL_MODEL)[1]['version'], metadata['version'])
+
+    def test_bad_values_fail_the_stream(self):
+        with open(self.upload, 'a') as f:
+            f.write('99,12.5,,4\n')
+        with self.assertRaises(SegmentationError) as raised:
+            run_file_segmentation_streaming(self.upload, chunk_size=10)
+        self.assertEqual(raised.exception.status, 400)
+
+    def test_stream_parameter(self):
+        response = self.client.get(f"{reverse('external-customer-segmentation')}?file=upload.csv&stream=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(response.json()['cluster_summary'].values()), 50)
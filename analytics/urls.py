@@ -1,10 +1,18 @@
 # analytics/urls.py
 from django.urls import path
+from . import async_views
 from .views import (
     # AI analytics views
     UploadCSVView, 
+    ImportTransactionsView,
     ExternalCustomerSegmentationView, 
     CustomerSegmentationView,
+    SimilarCustomersView,
+    ProductRecommendationsView,
+    BasketRecommendationsView,
+    SegmentationModelView,
+    SegmentationJobView,
+    SegmentationJobDetailView,
     TopProductsView,
     DiscountUsageAnalysisView,
     PurchaseCategoryPreferencesView,
@@ -13,13 +21,22 @@ from .views import (
     CustomerListView,
     ProductListView,
     PurchaseListView,
-    PurchaseItemListView
+    PurchaseItemListView,
+    PurchaseItemExportView,
+    MetricsView
 )
 
 urlpatterns = [
     path('upload/', UploadCSVView.as_view(), name='upload-csv'),
+    path('import/transactions/', ImportTransactionsView.as_view(), name='import-transactions'),
     path('segment-customers-external/', ExternalCustomerSegmentationView.as_view(), name='external-customer-segmentation'),
     path('segment-customers/', CustomerSegmentationView.as_view(), name='customer-segmentation'),
+    path('customers/<int:customer_id>/similar/', SimilarCustomersView.as_view(), name='similar-customers'),
+    path('products/<int:product_id>/bought-together/', ProductRecommendationsView.as_view(), name='product-recommendations'),
+    path('recommendations/bought-together/', BasketRecommendationsView.as_view(), name='basket-recommendations'),
+    path('segmentation-models/', SegmentationModelView.as_view(), name='segmentation-models'),
+    path('segmentation-jobs/', SegmentationJobView.as_view(), name='segmentation-jobs'),
+    path('segmentation-jobs/<uuid:job_id>/', SegmentationJobDetailView.as_view(), name='segmentation-job-detail'),
     path('top-products/', TopProductsView.as_view(), name='top-products'),
     path('discount-usage/', DiscountUsageAnalysisView.as_view(), name='discount-usage-analysis'),
     path('category-preferences/', PurchaseCategoryPreferencesView.as_view(), name='category-preferences'),
@@ -33,4 +50,19 @@ urlpatterns += [
     path('purchases/', PurchaseListView.as_view(), name='purchase-list'),
     path('purchase-items/', PurchaseItemListView.as_view(), name='purchase-item-list'),
     path('basic-analytics/', BasicAnalyticsOverview.as_view(), name='basic-analytics'),
+    path('export/purchase-items/', PurchaseItemExportView.as_view(), name='purchase-item-export'),
+]
+
+# operational endpoints
+urlpatterns += [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+]
+
+# async variants (run concurrently under ASGI)
+urlpatterns += [
+    path('async/basic-analytics/', async_views.basic_analytics_overview, name='async-basic-analytics'),
+    path('async/top-products/', async_views.top_products, name='async-top-products'),
+    path('async/category-preferences/', async_views.category_preferences, name='async-category-preferences'),
+    path('async/discount-usage/', async_views.discount_usage, name='async-discount-usage-analysis'),
+    path('async/segment-customers/', async_views.customer_segmentation, name='async-customer-segmentation'),
 ]
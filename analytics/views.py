@@ -3,103 +3,102 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
-from datetime import datetime
-from django.utils.timezone import now
-import pandas as pd
-from sklearn.cluster import KMeans
+from django.http import HttpResponse, StreamingHttpResponse
+import hashlib
 import os
 import uuid
-import time
 
-from .models import Customer, Purchase, PurchaseItem, Product
-from django.db.models import Count, Sum, Q
+from .models import Customer, Purchase, PurchaseItem, Product, SegmentationJob
+from .segmentation import extract_rfm_features
+from .model_registry import DB_MODEL, EXTERNAL_MODEL, list_models, train_model
+from .pipelines import (
+    SegmentationError, parse_stream_param, run_db_segmentation, run_file_segmentation, train_file_model
+)
+from .jobs import submit_segmentation_job
+from .columnar import SchemaError, convert_csv_to_columnar
+from .buckets import parse_age_buckets, parse_genders
+from .query_params import (
+    MAX_TOP_LIMIT, date_range_lookup, parse_date_range, parse_flag, parse_id_list, parse_limit, parse_source,
+    parse_window
+)
+from .pagination import Column, TableListView, format_datetime, format_float
+from .exports import iter_purchase_item_rows, stream_csv, stream_ndjson
+from .approx import APPROX_WINDOW_ERROR, approx_category_preferences, approx_overview, approx_top_products
+from .similarity import CustomerNotIndexed, similar_customers
+from .recommendations import TOP_K, ProductNotIndexed, bought_together, bought_together_with_basket
+from .rollups import overview_from_rollups, top_products_from_rollups
+from .response_cache import cache_response
+from .instrumentation import render_metrics
+from .importer import import_transactions_csv
+from .queries import (
+    category_preferences_query, customer_groups_query, discount_usage_by_group, discount_usage_query,
+    overview_from_parts, overview_queries, overview_response, preferences_by_group, top_product_series_query,
+    top_products_query
+)
+
+
+# Upper bound for ?products on basket recommendations
+MAX_BASKET_SIZE = 50
+
+
+def media_file_path(file_name):
+    # Uploads live directly under media/; None for names that would escape it
+    media_root = os.path.realpath(os.path.join(os.getcwd(), 'media'))
+    file_path = os.path.realpath(os.path.join(media_root, file_name))
+    if os.path.dirname(file_path) != media_root:
+        return None
+    return file_path
 
 
 # -------------------------- AI Analytic functions  -------------------
 
 class PurchaseCategoryPreferencesView(APIView):
+    @cache_response
     def get(self, request, *args, **kwargs):
         try:
-            # Define age groups
-            age_groups = {
-                '18–25': Q(age__gte=18, age__lte=25),
-                '26–35': Q(age__gte=26, age__lte=35),
-                '36–50': Q(age__gte=36, age__lte=50),
-                '51+': Q(age__gte=51),
-                # 'Unknown': Q(age__isnull=True),
-            }
-
-            response_data = {}
-
-            for age_label, age_filter in age_groups.items():
-                age_group_data = {}
-                # gender_groups = ['Male', 'Female', 'Non-binary', 'Other', None]
-                gender_groups = ['Male', 'Female', None]
-
-                for gender in gender_groups:
-                    gender_filter = Q(gender=gender) if gender else Q(gender__isnull=True)
-                    customers = Customer.objects.filter(age_filter & gender_filter)
-
-                    if not customers.exists():
-                        continue
-
-                    purchases = Purchase.objects.filter(customer__in=customers)
-                    items = PurchaseItem.objects.filter(purchase__in=purchases)
-
-                    category_stats = (
-                        items.values('product__category')
-                        .annotate(
-                            total_quantity=Sum('quantity'),
-                            total_revenue=Sum('price_at_purchase')
-                        )
-                        .order_by('-total_quantity')
-                    )
-
-                    gender_label = gender if gender else 'Unspecified'
-                    age_group_data[gender_label] = list(category_stats)
-
-                response_data[age_label] = age_group_data
-
-            return Response({
+            # Bucket definitions, e.g. ?age_buckets=18-25,26-35,51-&genders=Male,Female,Unspecified
+            try:
+                age_groups = parse_age_buckets(request.query_params.get('age_buckets'))
+                gender_groups = parse_genders(request.query_params.get('genders'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+            # ?approx=true estimates the breakdown from the sales sketches (analytics/approx.py)
+            approx = parse_flag(request.query_params.get('approx'))
+
+            customer_groups = customer_groups_query(age_groups, gender_groups)
+            if approx:
+                grouped, error_bounds = approx_category_preferences(age_groups, gender_groups)
+            else:
+                grouped = category_preferences_query(age_groups, gender_groups)
+
+            data = {
                 'message': 'Category preferences by age and gender retrieved successfully.',
-                'preferences': response_data
-            })
+                'preferences': preferences_by_group(customer_groups, grouped, age_groups, gender_groups)
+            }
+            if approx:
+                data['approximate'] = True
+                data['error_bounds'] = error_bounds
+            return Response(data)
 
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
 
 class DiscountUsageAnalysisView(APIView):
+    @cache_response
     def get(self, request, *args, **kwargs):
         try:
-            # Age group buckets
-            age_groups = {
-                '18–25': Q(age__gte=18, age__lte=25),
-                '26–35': Q(age__gte=26, age__lte=35),
-                '36–50': Q(age__gte=36, age__lte=50),
-                '51+': Q(age__gte=51),
-                # 'Unknown': Q(age__isnull=True),
-            }
-
-            result = {}
-            for label, age_filter in age_groups.items():
-                customers = Customer.objects.filter(age_filter)
-                purchases = Purchase.objects.filter(customer__in=customers)
-
-                with_discount = purchases.filter(discount_applied=True)
-                without_discount = purchases.filter(discount_applied=False)
-
-                result[label] = {
-                    'total_customers': customers.count(),
-                    'purchases_with_discount': with_discount.count(),
-                    'revenue_with_discount': with_discount.aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
-                    'purchases_without_discount': without_discount.count(),
-                    'revenue_without_discount': without_discount.aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
-                }
-            
+            # Optional ?age_buckets=18-25,26-35,51- and ?start=/end= (YYYY-MM-DD) on purchase_date
+            try:
+                age_groups = parse_age_buckets(request.query_params.get('age_buckets'))
+                start, end = parse_date_range(request.query_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+
+            rows = discount_usage_query(age_groups, start, end)
             return Response({
                 'message': 'Discount usage analysis completed.',
-                'discount_usage_by_age_group': result
+                'discount_usage_by_age_group': discount_usage_by_group(rows, age_groups)
             })
 
         except Exception as e:
@@ -107,20 +106,51 @@ class DiscountUsageAnalysisView(APIView):
 
 
 class TopProductsView(APIView):
+    @cache_response
     def get(self, request, *args, **kwargs):
         try:
-            # Aggregate quantity and revenue per product
-            top_products = (
-                PurchaseItem.objects
-                .values('product__id', 'product__name', 'product__category')
-                .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('price_at_purchase'))
-                .order_by('-total_quantity')[:10]
-            )
+            # Optional window and trend: ?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week|month&limit=10
+            try:
+                start, end, granularity, limit = parse_window(request.query_params, default_limit=10)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+
+            # ?approx=true estimates all-time totals from the sales sketches (analytics/approx.py)
+            if parse_flag(request.query_params.get('approx')):
+                if start or end or granularity:
+                    return Response({'error': APPROX_WINDOW_ERROR}, status=400)
+                top_products, error_bounds = approx_top_products(limit)
+                return Response({
+                    'message': 'Top products retrieved successfully.',
+                    'top_products': top_products,
+                    'approximate': True,
+                    'error_bounds': error_bounds
+                })
 
-            return Response({
+            # ?source=rollup answers from the daily rollups (as fresh as the last refresh_rollups run)
+            try:
+                source = parse_source(request.query_params.get('source'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+
+            if source == 'rollup':
+                top_products, series = top_products_from_rollups(limit, start, end, granularity)
+            else:
+                # Aggregate quantity and revenue per product
+                top_products = list(top_products_query(start, end, limit))
+                series = None
+                if granularity:
+                    product_ids = [row['product__id'] for row in top_products]
+                    series = list(top_product_series_query(product_ids, granularity, start, end))
+
+            data = {
                 'message': 'Top products retrieved successfully.',
-                'top_products': list(top_products)
-            })
+                'top_products': top_products
+            }
+            if granularity:
+                data['granularity'] = granularity
+                data['series'] = series
+            return Response(data)
 
         except Exception as e:
             return Response({'error': str(e)}, status=500)
@@ -132,152 +162,208 @@ class ExternalCustomerSegmentationView(APIView):
         if not file_name:
             return Response({'error': 'Missing "file" query parameter.'}, status=400)
 
-        file_path = os.path.join(os.getcwd(), 'media', file_name)
+        file_path = media_file_path(file_name)
+        if file_path is None:
+            return Response({'error': 'Invalid "file" parameter.'}, status=400)
         if not os.path.exists(file_path):
             return Response({'error': f'File "{file_name}" not found.'}, status=404)
 
         try:
-            df = pd.read_csv(file_path)
-            required_columns = ['CustomerID', 'TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays']
-            if not all(col in df.columns for col in required_columns):
-                return Response({'error': f'Missing required columns: {required_columns}'}, status=400)
+            result = run_file_segmentation(
+                file_path,
+                request.query_params.get('model', EXTERNAL_MODEL),
+                stream=parse_stream_param(request.query_params.get('stream')),
+            )
 
-            features = df[['TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays']]
-            kmeans = KMeans(n_clusters=3, random_state=42)
-            df['Segment'] = kmeans.fit_predict(features)
+            return Response({
+                'message': 'Customer segmentation and labeling successful.',
+                **result
+            })
 
-            # Calculate means per segment
-            segment_means = df.groupby('Segment')[['TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays']].mean()
-            labeled_segments = {}
+        except SegmentationError as e:
+            return Response({'error': str(e)}, status=e.status)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
 
-            # Sort segments based on TotalSpend and Frequency
-            for segment_id in segment_means.index:
-                spend = segment_means.loc[segment_id, 'TotalSpend']
-                freq = segment_means.loc[segment_id, 'PurchaseFrequency']
-                recency = segment_means.loc[segment_id, 'LastPurchaseDays']
 
-                # Heuristic labeling
-                if spend > 800 and freq > 7 and recency < 15:
-                    label = 'High Value'
-                elif spend > 500 and freq > 4:
-                    label = 'Mid-Tier'
-                else:
-                    label = 'Average'
+class CustomerSegmentationView(APIView):
+    @cache_response
+    def get(self, request, *args, **kwargs):
+        try:
+            # Read the precomputed feature store (or one grouped aggregate over Purchase)
+            result = run_db_segmentation(request.query_params.get('source', 'store'))
 
-                labeled_segments[segment_id] = label
+            return Response({
+                'message': 'Customer segmentation from database successful.',
+                **result
+            })
 
-           # This line of code is replaced with the following block of code
-            # - because it's using default clustering by kmeans
-            # df['SegmentLabel'] = df['Segment'].map(labeled_segments)
+        except SegmentationError as e:
+            return Response({'error': str(e)}, status=e.status)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
 
-            #  ----- + The new code block +------------
-            def label_row(row):
-                if row['TotalSpend'] > 800 and row['PurchaseFrequency'] > 5 and row['LastPurchaseDays'] < 15:
-                    return 'High Value'
-                elif row['TotalSpend'] > 500 and row['PurchaseFrequency'] > 3:
-                    return 'Mid-Tier'
-                else:
-                    return 'Average'
 
-            df['SegmentLabel'] = df.apply(label_row, axis=1)
-            #  ----- / The new code block /------------
+class SimilarCustomersView(APIView):
+    @cache_response
+    def get(self, request, customer_id, *args, **kwargs):
+        try:
+            # Lookalikes by RFM and category mix from the vector index (analytics/similarity.py); ?limit=10
+            try:
+                limit = parse_limit(request.query_params.get('limit'), default=10, maximum=MAX_TOP_LIMIT)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
 
+            if not Customer.objects.filter(pk=customer_id).exists():
+                return Response({'error': f'Customer {customer_id} not found.'}, status=404)
+
+            return Response({
+                'message': 'Similar customers retrieved successfully.',
+                'customer_id': customer_id,
+                'similar_customers': similar_customers(customer_id, limit)
+            })
+
+        except CustomerNotIndexed as e:
+            return Response({'error': str(e)}, status=404)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
 
-            preview = df[['CustomerID', 'TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays', 'SegmentLabel']].head(10).to_dict(orient='records')
 
-            # Summary: count of labeled segments
-            label_counts = df['SegmentLabel'].value_counts().to_dict()
+class ProductRecommendationsView(APIView):
+    @cache_response
+    def get(self, request, product_id, *args, **kwargs):
+        try:
+            # "Bought together" from the co-purchase index (analytics/recommendations.py); ?limit=10
+            try:
+                limit = parse_limit(request.query_params.get('limit'), default=10, maximum=TOP_K)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
 
-            time.sleep(2)  # Delay for 2 seconds
+            if not Product.objects.filter(pk=product_id).exists():
+                return Response({'error': f'Product {product_id} not found.'}, status=404)
 
             return Response({
-                'message': 'Customer segmentation and labeling successful.',
-                'segment_summary': label_counts,
-                'preview': preview
+                'message': 'Product recommendations retrieved successfully.',
+                'product_id': product_id,
+                'bought_together': bought_together(product_id, limit)
             })
 
+        except ProductNotIndexed as e:
+            return Response({'error': str(e)}, status=404)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
 
-class CustomerSegmentationView(APIView):
+class BasketRecommendationsView(APIView):
+    @cache_response
     def get(self, request, *args, **kwargs):
         try:
-            today = now().date()
-            customers = Customer.objects.all()
-
-            data = []
-            for customer in customers:
-                purchases = Purchase.objects.filter(customer=customer)
-
-                if not purchases.exists():
-                    continue  # Skip customers with no purchases
-
-                total_spend = sum(p.total_amount for p in purchases)
-                frequency = purchases.count()
-                last_purchase_date = purchases.order_by('-purchase_date').first().purchase_date.date()
-                recency = (today - last_purchase_date).days
-
-                data.append({
-                    'CustomerID': customer.id,
-                    'TotalSpend': total_spend,
-                    'PurchaseFrequency': frequency,
-                    'LastPurchaseDays': recency
-                })
+            # Products bought with any of ?products=12,40 (scores summed over the basket); ?limit=10
+            try:
+                product_ids = parse_id_list(request.query_params.get('products'), 'products', maximum=MAX_BASKET_SIZE)
+                limit = parse_limit(request.query_params.get('limit'), default=10, maximum=TOP_K)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
 
-            if not data:
-                return Response({'error': 'No valid purchase data available.'}, status=404)
+            return Response({
+                'message': 'Basket recommendations retrieved successfully.',
+                'products': product_ids,
+                'bought_together': bought_together_with_basket(product_ids, limit)
+            })
 
-            df = pd.DataFrame(data)
-            features = df[['TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays']]
-            kmeans = KMeans(n_clusters=3, random_state=42)
-            df['Segment'] = kmeans.fit_predict(features)
+        except ProductNotIndexed as e:
+            return Response({'error': str(e)}, status=404)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
 
-            # Label segments
-            segment_means = df.groupby('Segment')[['TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays']].mean()
-            labeled_segments = {}
 
-            for segment_id in segment_means.index:
-                spend = segment_means.loc[segment_id, 'TotalSpend']
-                freq = segment_means.loc[segment_id, 'PurchaseFrequency']
-                recency = segment_means.loc[segment_id, 'LastPurchaseDays']
+class SegmentationJobView(APIView):
+    def post(self, request, *args, **kwargs):
+        # Queue a segmentation run on the local worker pool and return at once
+        kind = request.data.get('kind', SegmentationJob.KIND_DB)
+        params = {}
+
+        if kind == SegmentationJob.KIND_DB:
+            params['source'] = request.data.get('source', 'store')
+            if params['source'] not in ('store', 'purchases'):
+                return Response({'error': 'Invalid "source" parameter. Use "store" or "purchases".'}, status=400)
+        elif kind == SegmentationJob.KIND_FILE:
+            file_name = request.data.get('file')
+            if not file_name:
+                return Response({'error': 'Missing "file" parameter.'}, status=400)
+
+            file_path = media_file_path(file_name)
+            if file_path is None:
+                return Response({'error': 'Invalid "file" parameter.'}, status=400)
+            if not os.path.exists(file_path):
+                return Response({'error': f'File "{file_name}" not found.'}, status=404)
+
+            params['file_path'] = file_path
+            params['model_name'] = request.data.get('model', EXTERNAL_MODEL)
+            params['stream'] = parse_stream_param(request.data.get('stream'))
+        else:
+            return Response({'error': 'Invalid "kind". Use "db" or "file".'}, status=400)
 
-                if spend > 800 and freq > 5 and recency < 15:
-                    label = 'High Value'
-                elif spend > 500 and freq > 3:
-                    label = 'Mid-Tier'
-                else:
-                    label = 'Average'
+        try:
+            job = submit_segmentation_job(kind, params)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
 
-                labeled_segments[segment_id] = label
+        return Response({
+            'message': 'Segmentation job submitted.',
+            'job': job.as_dict()
+        }, status=202)
 
-            # This line of code is replaced with the following block of code
-            # - because it's using default clustering by kmeans
-            # df['SegmentLabel'] = df['Segment'].map(labeled_segments)
 
-            #  ----- + The new code block +------------
-            def label_row(row):
-                if row['TotalSpend'] > 800 and row['PurchaseFrequency'] > 3 and row['LastPurchaseDays'] < 15:
-                    return 'High Value'
-                elif row['TotalSpend'] > 500 and row['PurchaseFrequency'] > 2:
-                    return 'Mid-Tier'
-                else:
-                    return 'Average'
+class SegmentationJobDetailView(APIView):
+    def get(self, request, job_id, *args, **kwargs):
+        job = SegmentationJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({'error': f'Job "{job_id}" not found.'}, status=404)
 
-            df['SegmentLabel'] = df.apply(label_row, axis=1)
-            #  ----- / The new code block /------------
+        return Response({'job': job.as_dict(include_result=True)})
 
-            preview = df[['CustomerID', 'TotalSpend', 'PurchaseFrequency', 'LastPurchaseDays', 'SegmentLabel']].head(10).to_dict(orient='records')
-            label_counts = df['SegmentLabel'].value_counts().to_dict()
 
-            time.sleep(2)  # Delay for 2 seconds
+class SegmentationModelView(APIView):
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'message': 'Segmentation models retrieved successfully.',
+            'models': list_models()
+        })
+
+    def post(self, request, *args, **kwargs):
+        # Explicit (re)training: the segmentation GETs only run predict
+        model_name = request.data.get('model', DB_MODEL)
+        file_name = request.data.get('file')
+
+        try:
+            if file_name:
+                file_path = media_file_path(file_name)
+                if file_path is None:
+                    return Response({'error': 'Invalid "file" parameter.'}, status=400)
+                if not os.path.exists(file_path):
+                    return Response({'error': f'File "{file_name}" not found.'}, status=404)
+
+                # Memory-mapped columnar copy (or typed chunks) instead of parsing the whole CSV
+                _, model_meta = train_file_model(
+                    file_path, model_name, stream=parse_stream_param(request.data.get('stream'))
+                )
+            else:
+                df = extract_rfm_features()
+                if df.empty:
+                    return Response({'error': 'No training data available.'}, status=404)
+
+                _, model_meta = train_model(model_name, df)
 
             return Response({
-                'message': 'Customer segmentation from database successful.',
-                'segment_summary': label_counts,
-                'preview': preview
+                'message': 'Segmentation model trained successfully.',
+                'model': model_meta
             })
 
+        except SegmentationError as e:
+            return Response({'error': str(e)}, status=e.status)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
@@ -298,108 +384,195 @@ class UploadCSVView(APIView):
         unique_filename = f"{uuid.uuid4().hex}{file_ext}"
         file_path = os.path.join(media_root, unique_filename)
 
+        content_hash = hashlib.sha256()
         with open(file_path, 'wb+') as destination:
             for chunk in file_obj.chunks():
                 destination.write(chunk)
+                content_hash.update(chunk)
+
+        # Validate the schema once and keep a typed, memory-mappable copy
+        # so later analyses of this upload skip CSV parsing
+        try:
+            columnar_meta = convert_csv_to_columnar(file_path, content_hash=content_hash.hexdigest())
+        except SchemaError as e:
+            os.remove(file_path)
+            return Response({'error': str(e)}, status=400)
+        except Exception as e:
+            os.remove(file_path)
+            return Response({'error': str(e)}, status=500)
 
         return Response({
             'message': 'File uploaded successfully.',
-            'file_name': unique_filename
+            'file_name': unique_filename,
+            'rows': columnar_meta['rows']
+        })
+
+
+class ImportTransactionsView(APIView):
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        # Synchronous; use the import_transactions command for very large files
+        file_obj = request.FILES.get('file')
+        if not file_obj or not file_obj.name.endswith('.csv'):
+            return Response({'error': 'Please upload a valid CSV file.'}, status=400)
+
+        import_root = os.path.join(os.getcwd(), 'media', 'imports')
+        os.makedirs(import_root, exist_ok=True)
+        file_name = f"{uuid.uuid4().hex}.csv"
+        file_path = os.path.join(import_root, file_name)
+        with open(file_path, 'wb+') as destination:
+            for chunk in file_obj.chunks():
+                destination.write(chunk)
+
+        try:
+            summary = import_transactions_csv(file_path)
+        except SchemaError as e:
+            os.remove(file_path)
+            return Response({'error': str(e)}, status=400)
+        except Exception as e:
+            os.remove(file_path)
+            return Response({'error': str(e)}, status=500)
+
+        report = summary.pop('rejected_report')
+        return Response({
+            'message': 'Transactions imported successfully.',
+            'file_name': f'imports/{file_name}',
+            'rejected_report': f'imports/{os.path.basename(report)}' if report else None,
+            **summary
         })
 
 
 # ------------------- Non-AI | direct tables' data for frontend  -------------------
 
 class BasicAnalyticsOverview(APIView):
+    @cache_response
     def get(self, request, *args, **kwargs):
         try:
-            total_customers = Customer.objects.count()
-            total_products = Product.objects.count()
-            total_purchases = Purchase.objects.count()
-            total_revenue = Purchase.objects.aggregate(total=Sum('total_amount'))['total'] or 0
-
-            top_categories = (
-                PurchaseItem.objects
-                .values('product__category')
-                .annotate(quantity_sold=Sum('quantity'))
-                .order_by('-quantity_sold')[:5]
-            )
-
-            top_customers = (
-                Purchase.objects
-                .values('customer__name')
-                .annotate(total_spent=Sum('total_amount'))
-                .order_by('-total_spent')[:5]
-            )
+            # Optional window and trend: ?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week|month&limit=5
+            try:
+                start, end, granularity, limit = parse_window(request.query_params, default_limit=5)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+
+            # ?approx=true: all-time summary from the sales sketches (analytics/approx.py)
+            if parse_flag(request.query_params.get('approx')):
+                if start or end or granularity:
+                    return Response({'error': APPROX_WINDOW_ERROR}, status=400)
+                return Response(approx_overview(limit))
+
+            try:
+                source = parse_source(request.query_params.get('source'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+
+            if source == 'rollup':
+                overview = {
+                    **overview_from_rollups(limit, start, end, granularity),
+                    'total_customers': Customer.objects.count(),
+                    'total_products': Product.objects.count(),
+                }
+            else:
+                parts = {name: query() for name, query in overview_queries(start, end, limit, granularity).items()}
+                overview = overview_from_parts(parts)
 
-            return Response({
-                'summary': {
-                    'total_customers': total_customers,
-                    'total_products': total_products,
-                    'total_purchases': total_purchases,
-                    'total_revenue': float(total_revenue)
-                },
-                'top_categories': list(top_categories),
-                'top_customers': list(top_customers)
-            })
+            return Response(overview_response(overview, granularity))
 
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
-class CustomerListView(APIView):
-    def get(self, request, *args, **kwargs):
-        customers = Customer.objects.all().values(
-            'id', 'name', 'gender', 'age', 'location', 'created_at'
-        )
-        data = [
-            {
-                **customer,
-                'created_at': customer['created_at'].strftime('%Y-%m-%d %H:%M')
-            } for customer in customers
-        ]
-        return Response(data)
-
-class ProductListView(APIView):
-    def get(self, request, *args, **kwargs):
-        products = Product.objects.all().values(
-            'id', 'name', 'category', 'price', 'base_price', 'stock_quantity'
-        )
-        return Response(list(products))
-
-class PurchaseListView(APIView):
+class MetricsView(APIView):
+    # Prometheus text exposition of the per-process request histograms
     def get(self, request, *args, **kwargs):
-        purchases = Purchase.objects.select_related('customer').all()
-
-        data = [
-            {
-                'id': purchase.id,
-                'customer': purchase.customer.name or f"Customer {purchase.customer.id}",
-                'purchase_date': purchase.purchase_date.strftime('%Y-%m-%d %H:%M'),
-                'total_amount': float(purchase.total_amount),
-                'discount_applied': purchase.discount_applied
-            }
-            for purchase in purchases
-        ]
-        return Response(data)
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class CustomerListView(TableListView):
+    date_field = 'created_at'
+    columns = {
+        'id': Column('id'),
+        'name': Column('name'),
+        'gender': Column('gender'),
+        'age': Column('age'),
+        'location': Column('location'),
+        'created_at': Column('created_at', format=format_datetime),
+    }
+
+    def get_queryset(self):
+        return Customer.objects.all()
+
+class ProductListView(TableListView):
+    columns = {
+        'id': Column('id'),
+        'name': Column('name'),
+        'category': Column('category'),
+        'price': Column('price', format=format_float),
+        'base_price': Column('base_price', format=format_float),
+        'stock_quantity': Column('stock_quantity'),
+    }
+
+    def get_queryset(self):
+        return Product.objects.all()
+
+class PurchaseListView(TableListView):
+    date_field = 'purchase_date'
+    columns = {
+        'id': Column('id'),
+        'customer': Column('customer__name', 'customer_id', format=lambda name, customer_id: name or f"Customer {customer_id}"),
+        'purchase_date': Column('purchase_date', format=format_datetime),
+        'total_amount': Column('total_amount', format=format_float),
+        'discount_applied': Column('discount_applied'),
+    }
+
+    def get_queryset(self):
+        return Purchase.objects.all()
     
-class PurchaseItemListView(APIView):
+class PurchaseItemListView(TableListView):
+    date_field = 'purchase__purchase_date'
+    # Every column is read through joins in the same query (no per-row lookups)
+    columns = {
+        'id': Column('id'),
+        'purchase_id': Column('purchase_id'),
+        'product_name': Column('product__name'),
+        'category': Column('product__category'),
+        'quantity': Column('quantity'),
+        'price_at_purchase': Column('price_at_purchase', format=format_float),
+        'purchase_date': Column('purchase__purchase_date', format=format_datetime),
+        'customer': Column(
+            'purchase__customer__name', 'purchase__customer_id',
+            format=lambda name, customer_id: name or f"Customer {customer_id}"
+        ),
+    }
+
+    def get_queryset(self):
+        return PurchaseItem.objects.all()
+
+
+class PurchaseItemExportView(APIView):
+    # Bulk export for warehouse syncs: ?output=ndjson|csv&start=&end=&category=A,B
+    # ("output" rather than "format", which DRF reserves for renderer selection)
     def get(self, request, *args, **kwargs):
-        items = PurchaseItem.objects.select_related('purchase', 'product').all()
-
-        data = [
-            {
-                'id': item.id,
-                'purchase_id': item.purchase.id,
-                'product_name': item.product.name,
-                'category': item.product.category,
-                'quantity': item.quantity,
-                'price_at_purchase': float(item.price_at_purchase),
-                'purchase_date': item.purchase.purchase_date.strftime('%Y-%m-%d %H:%M'),
-                'customer': item.purchase.customer.name or f"Customer {item.purchase.customer.id}"
-            }
-            for item in items
-        ]
-        return Response(data)
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response({'error': 'Invalid "output". Use "ndjson" or "csv".'}, status=400)
+
+        try:
+            start, end = parse_date_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        filters = date_range_lookup('purchase__purchase_date', start, end)
+        categories = [c.strip() for c in request.query_params.get('category', '').split(',') if c.strip()]
+        if categories:
+            filters['product__category__in'] = categories
+
+        rows = iter_purchase_item_rows(filters)
+        if output == 'csv':
+            response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="purchase_items.{output}"'
+        return response
 
 
 # ------------------ not applicable codes - reserved just in case ------------------
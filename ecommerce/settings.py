@@ -19,6 +19,35 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Fitted segmentation models (joblib files) managed by analytics/model_registry.py
+SEGMENTATION_MODEL_ROOT = os.path.join(BASE_DIR, 'ml_models')
+
+# Worker processes per web process for background segmentation jobs
+SEGMENTATION_JOB_WORKERS = config('SEGMENTATION_JOB_WORKERS', default=2, cast=int)
+
+# Uploaded CSVs at least this large (bytes) are segmented chunk by chunk
+SEGMENTATION_STREAM_THRESHOLD = config('SEGMENTATION_STREAM_THRESHOLD', default=100 * 1024 * 1024, cast=int)
+
+# External segmentation results keyed by file content hash + model version.
+# BACKEND is 'memory' (per-process LRU of MAX_ENTRIES) or 'django' (CACHES[CACHE_ALIAS])
+SEGMENTATION_RESULT_CACHE = {
+    'BACKEND': config('SEGMENTATION_RESULT_CACHE_BACKEND', default='memory'),
+    'MAX_ENTRIES': 128,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
+# Per-request SQL/phase timings (Server-Timing header + /api/metrics/)
+ANALYTICS_INSTRUMENTATION = config('ANALYTICS_INSTRUMENTATION', default=True, cast=bool)
+
+# Cached analytics GET responses, invalidated by a data-version counter
+# (see analytics/response_cache.py). Stored in CACHES[CACHE_ALIAS].
+ANALYTICS_RESPONSE_CACHE = {
+    'ENABLED': config('ANALYTICS_RESPONSE_CACHE', default=True, cast=bool),
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -46,6 +75,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers every other middleware
+    'analytics.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,10 +125,26 @@ DATABASES = {
         'PASSWORD': '93mysqlmain',
         'HOST': 'localhost',
         'PORT': '3306',
+        # Persistent connections: the async views run their queries on pooled
+        # executor threads, which would otherwise connect once per query
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Shared by every process on the host (web workers, job workers, management
+# commands), so a data-version bump from any of them retires cached analytics
+# responses everywhere. Point it at Redis for multi-host deployments, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -119,10 +166,17 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'analytics.authentication.CachedJWTAuthentication',
     )
 }
 
+# Users resolved by CachedJWTAuthentication are reused for TIMEOUT seconds
+# (see analytics/authentication.py)
+ANALYTICS_AUTH_USER_CACHE = {
+    'TIMEOUT': config('AUTH_USER_CACHE_TIMEOUT', default=60, cast=int),
+    'MAX_SIZE': 10_000,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/